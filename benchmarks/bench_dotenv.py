@@ -0,0 +1,110 @@
+"""
+Throughput benchmark of `execenv.dotenv.parse`, reported in MB/s.
+
+Run with `poetry run python benchmarks/bench_dotenv.py`.
+"""
+
+import time
+import timeit
+from typing import Callable, Dict, Sequence
+
+import click
+
+from execenv.dotenv import parse
+
+# Number of lines of each corpus
+SIZES = (10, 1_000, 100_000, 1_000_000)
+
+
+def typical(lines: int) -> str:
+    return "\n".join(
+        (
+            f"KEY_{i}=value_{i}",
+            f'KEY_{i}="double quoted {i}\\nwith newline"',
+            f"# comment {i}",
+            f"export KEY_{i}='single quoted {i}' # trailing comment",
+        )[i % 4]
+        for i in range(lines)
+    )
+
+
+def multiline(lines: int) -> str:
+    return "\n".join(
+        f'KEY_{i}="line 1\nline 2\nline 3"' for i in range(max(lines // 3, 1))
+    )
+
+
+def crlf(lines: int) -> str:
+    return typical(lines).replace("\n", "\r\n")
+
+
+def blank_lines(lines: int) -> str:
+    # Quadratic for the regex based parser
+    return " \n" * lines + "x"
+
+
+def unterminated_quotes(lines: int) -> str:
+    return "\n".join(f'KEY_{i}="unterminated {i}' for i in range(lines))
+
+
+CORPORA: Dict[str, Callable[[int], str]] = {
+    "typical": typical,
+    "multiline": multiline,
+    "crlf": crlf,
+    "blank-lines": blank_lines,
+    "unterminated-quotes": unterminated_quotes,
+}
+
+
+def measure(src: str, repeat: int) -> float:
+    """
+    Best time of `repeat` runs to parse `src` in seconds. Small corpora are parsed many times
+    in each run to get above timer resolution.
+    """
+    timer = timeit.Timer(lambda: parse(src), timer=time.perf_counter)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(sizes: Sequence[int], repeat: int) -> Dict[str, Dict]:
+    """
+    Run the benchmark on each corpus of each size.
+
+    Returns:
+        Dict[str, Dict]: Results keyed by `dotenv.<corpus>.<lines>`, see `benchmarks/run.py`.
+    """
+    results = {}
+    for lines in sizes:
+        for name, generate in CORPORA.items():
+            src = generate(lines)
+            size = len(src.encode())
+            best = measure(src, repeat)
+            results[f"dotenv.{name}.{lines}"] = {
+                "value": size / 1e6 / best,
+                "unit": "MB/s",
+                "better": "higher",
+            }
+            click.echo(
+                f"{name:<20} {lines:>9} lines {size / 1e6:8.2f} MB {size / 1e6 / best:8.2f} MB/s",
+                err=True,
+            )
+    return results
+
+
+@click.command()
+@click.option(
+    "-n",
+    "--lines",
+    type=int,
+    multiple=True,
+    default=SIZES,
+    show_default=True,
+    help="Lines per corpus, can be given multiple times.",
+)
+@click.option("-r", "--repeat", type=int, default=3, help="Best of N runs.")
+def main(lines: Sequence[int], repeat: int):
+    run(lines, repeat)
+
+
+if __name__ == "__main__":
+    main()
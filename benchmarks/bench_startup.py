@@ -0,0 +1,149 @@
+"""
+Latency benchmark of starting `execenv`, reported in milliseconds (median of runs):
+
+- `startup.python`: `python -c pass`, the floor of everything below.
+- `startup.import`: importing the CLI.
+- `startup.cold`: `execenv -f <1000 lines .env> -- true` with an empty cache of parsed .env files.
+- `startup.warm`: the same with the cache populated.
+- `startup.server`: the same served by `execenv --server` (not on Windows).
+- `overhead.true`: `execenv -- true` minus running `true` directly.
+
+Run with `poetry run python benchmarks/bench_startup.py`.
+"""
+
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional
+
+import click
+from bench_dotenv import typical
+
+# Run the same way as the `execenv` script does, regardless of where it is installed
+EXECENV = [sys.executable, "-c", "from execenv.client import main; main()"]
+
+TRUE = [shutil.which("true") or sys.executable] + (
+    [] if shutil.which("true") else ["-c", ""]
+)
+
+
+def measure(
+    args: List[str], env: Mapping[str, str], runs: int, fresh_dir: Optional[Path] = None
+) -> float:
+    """
+    Median wall time of `runs` runs of a command in milliseconds.
+
+    Args:
+        fresh_dir (Optional[Path]): If given, each run gets an empty cache directory created in it.
+    """
+    times = []
+    for i in range(runs):
+        run_env = dict(env)
+        if fresh_dir is not None:
+            run_env["EXECENV_CACHE_DIR"] = str(fresh_dir / str(i))
+
+        start = time.perf_counter()
+        subprocess.run(args, env=run_env, stdout=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def start_server(env: Dict[str, str]) -> Optional[subprocess.Popen]:
+    if sys.platform == "win32":
+        return None
+
+    server = subprocess.Popen(
+        [*EXECENV, "--server"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 10
+    while not Path(env["EXECENV_SOCKET"]).exists():
+        if server.poll() is not None or time.monotonic() > deadline:
+            server.kill()
+            return None
+        time.sleep(0.05)
+    return server
+
+
+def run(runs: int) -> Dict[str, Dict]:
+    """
+    Run the benchmark.
+
+    Returns:
+        Dict[str, Dict]: Results keyed by `startup.<case>` and `overhead.true`, see `benchmarks/run.py`.
+    """
+    timings: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as temp:
+        temp_dir = Path(temp)
+        env_file = temp_dir / "bench.env"
+        env_file.write_text(typical(1_000))
+        config_file = temp_dir / "config.env"
+
+        env = dict(os.environ)
+        env.update(
+            {
+                "EXECENV_CACHE_DIR": str(temp_dir / "cache"),
+                "EXECENV_NO_SERVER": "1",
+                "EXECENV_SOCKET": str(temp_dir / "server.sock"),
+                # Skip setup of shell completion
+                "SHELL": "",
+            }
+        )
+        env.pop("EXECENV_PROFILE", None)
+        env.pop("EXECENV_PROFILE_TRACE", None)
+
+        args = [
+            *EXECENV,
+            "--config",
+            str(config_file),
+            "-f",
+            str(env_file),
+            "--",
+            *TRUE,
+        ]
+
+        timings["startup.python"] = measure([sys.executable, "-c", "pass"], env, runs)
+        timings["startup.import"] = measure(
+            [sys.executable, "-c", "import execenv.cli"], env, runs
+        )
+        timings["startup.cold"] = measure(args, env, runs, temp_dir / "fresh")
+        timings["startup.warm"] = measure(args, env, runs)
+
+        server = start_server(env)
+        if server is not None:
+            try:
+                served_env = dict(env)
+                del served_env["EXECENV_NO_SERVER"]
+                timings["startup.server"] = measure(args, served_env, runs)
+            finally:
+                server.terminate()
+                server.wait()
+
+        timings["overhead.true"] = measure(
+            [*EXECENV, "--config", str(config_file), "--", *TRUE], env, runs
+        ) - measure(TRUE, env, runs)
+
+    for key, value in timings.items():
+        click.echo(f"{key:<20} {value:8.2f} ms", err=True)
+
+    return {
+        key: {"value": value, "unit": "ms", "better": "lower"}
+        for key, value in timings.items()
+    }
+
+
+@click.command()
+@click.option("-r", "--runs", type=int, default=20, help="Median of N runs.")
+def main(runs: int):
+    run(runs)
+
+
+if __name__ == "__main__":
+    main()
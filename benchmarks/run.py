@@ -0,0 +1,131 @@
+"""
+Run all benchmarks, write their results as JSON and optionally compare them against a baseline.
+
+Each result is keyed by name and has `value`, `unit` and `better` (`higher` or `lower`).
+A result is a regression if it is worse than the baseline by more than the tolerance (relative).
+
+```shell
+# Store a baseline
+poetry run python benchmarks/run.py -o baseline.json
+
+# Compare against it later, failing on regressions
+poetry run python benchmarks/run.py -o results.json --baseline baseline.json --tolerance 0.1
+```
+"""
+
+import json
+import platform
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import bench_dotenv
+import bench_startup
+import click
+
+from execenv import __version__
+
+
+def compare(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float
+) -> List[str]:
+    """
+    Compare results against a baseline, showing the change of each one present in both.
+
+    Returns:
+        List[str]: Names of regressed results.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        before, after = baseline[name]["value"], result["value"]
+        change = (after - before) / before if before else 0.0
+        worse = -change if result["better"] == "higher" else change
+        regressed = worse > tolerance
+        if regressed:
+            regressions.append(name)
+
+        click.echo(
+            f"{name:<40} {before:10.2f} -> {after:10.2f} {result['unit']:<5} {change:+7.1%}"
+            + (click.style("  REGRESSION", fg="red") if regressed else "")
+        )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=Path),  # type: ignore
+    help="File to write results to as JSON.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),  # type: ignore
+    help="Results of an earlier run to compare against. Exits with 1 on regressions.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=0.1,
+    show_default=True,
+    help="Relative change allowed before a result is considered a regression.",
+)
+@click.option(
+    "--suite",
+    type=click.Choice(["dotenv", "startup"]),
+    multiple=True,
+    default=("dotenv", "startup"),
+    help="Suites to run, can be given multiple times. All of them by default.",
+)
+@click.option(
+    "-n",
+    "--lines",
+    type=int,
+    multiple=True,
+    default=bench_dotenv.SIZES,
+    help="Lines per corpus of the dotenv suite, can be given multiple times.",
+)
+@click.option("-r", "--runs", type=int, default=20, help="Runs of the startup suite.")
+def main(
+    output: Optional[Path],
+    baseline: Optional[Path],
+    tolerance: float,
+    suite: Sequence[str],
+    lines: Sequence[int],
+    runs: int,
+):
+    results: Dict[str, Dict] = {}
+    if "dotenv" in suite:
+        results.update(bench_dotenv.run(lines, 3))
+    if "startup" in suite:
+        results.update(bench_startup.run(runs))
+
+    if output is not None:
+        report = {
+            "meta": {
+                "execenv": __version__,
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+            },
+            "results": results,
+        }
+        output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if baseline is not None:
+        regressions = compare(
+            results, json.loads(baseline.read_text())["results"], tolerance
+        )
+        if regressions:
+            click.secho(
+                f"{len(regressions)} regression(s) beyond {tolerance:.0%}: {', '.join(regressions)}",
+                fg="red",
+                err=True,
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,603 @@
+import os
+import re
+import subprocess
+import sys
+from functools import lru_cache
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
+
+from execenv import __version__
+from execenv.cache import EnvCache
+from execenv.interpolate import expand as expand_arg
+from execenv.interpolate import interpolate
+from execenv.source import SourcedScript
+
+if TYPE_CHECKING:
+    from execenv.artifact import Artifact, CompiledEnv
+
+Command = Union[str, Sequence[str]]
+
+
+def append_to_env(env: Dict[str, str], key: str, value: str, separator: str):
+    if key in env:
+        env[key] += separator + value
+    else:
+        env[key] = value
+
+
+def get_shell_env_varref_format(var: str, escaped: bool = False) -> str:
+    # `sys.platform` is used instead of `platform.system()` to avoid importing `platform`
+    system = sys.platform
+    if system.startswith("linux") or system == "darwin":
+        varref_format = f"${var}" if not escaped else f"\\${var}"
+    elif system == "win32":
+        varref_format = f"%{var}%" if not escaped else f"%^{var}%"
+    else:
+        raise NotImplementedError(f"Unsupported platform: {system}")
+    return varref_format
+
+
+@lru_cache(maxsize=None)
+def _env_varref_pattern(prefix: str) -> "re.Pattern[str]":
+    return re.compile(rf"\b{prefix}([A-Za-z_][A-Za-z0-9_]*)\b")
+
+
+def convert_env_varref(prefix: str, value: str) -> str:
+    # Most arguments have no references
+    if prefix not in value:
+        return value
+    return _env_varref_pattern(prefix).sub(get_shell_env_varref_format(r"\1"), value)
+
+
+def expand_args(
+    args: Sequence[str], env: Mapping[str, str], prefix: Optional[str] = None
+) -> List[str]:
+    """
+    Expand references to variables in arguments of a command against `env`, without a shell:
+    `$VAR`, `${VAR}`, `${VAR:-default}` and `${VAR-default}` (see `execenv.interpolate.expand`),
+    and `<prefix>VAR` if `prefix` is given.
+    """
+    if prefix:
+        # Converted to `${VAR}`, so that all references are expanded in the same pass
+        pattern = _env_varref_pattern(prefix)
+        args = [pattern.sub(r"${\1}", arg) if prefix in arg else arg for arg in args]
+    return [expand_arg(arg, env) for arg in args]
+
+
+class _HostReads(Mapping[str, str]):
+    """
+    Environment merged so far, recording variables of the current environment (not `written` by layers)
+    that interpolation reads into `reads`, with their values or `None` if unset.
+    """
+
+    def __init__(
+        self,
+        env: Mapping[str, str],
+        written: Set[str],
+        reads: Dict[str, Optional[str]],
+    ) -> None:
+        self.env = env
+        self.written = written
+        self.reads = reads
+
+    def __getitem__(self, key: str) -> str:
+        if key not in self.written:
+            self.reads.setdefault(key, os.environ.get(key))
+        return self.env[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.env)
+
+    def __len__(self) -> int:
+        return len(self.env)
+
+
+def _written_keys(kind: str, value: Any) -> Iterable[str]:
+    # Variables a merged layer set, removed or appended to
+    if kind == "set":
+        return value.keys()
+    if kind == "source":
+        return [*value.diff.changed, *value.diff.removed]
+    if kind == "compiled":
+        return [*value.changed, *value.removed, *(key for key, _, _ in value.appends)]
+    if kind == "append":
+        return [value[0]]
+    return []
+
+
+class Environment:
+    """
+    Builder of the environment to run commands with, made of layers applied in order.
+
+    It starts from the current environment, and follows the same rules as the `execenv` CLI:
+
+    ```python
+    env = (
+        Environment()
+        .clear()                       # -c / --clear
+        .load_compiled("env.bin")      # -F / --artifact
+        .source("activate.sh")         # --source
+        .load_file(".env")             # -f / --file
+        .set("KEY", "VAL")             # -e / --env
+        .append("PATH", "/opt/bin")    # -a / --append-env
+    )
+    ```
+
+    References like `${VAR}` and `${VAR:-default}` in values are expanded when building if `interpolate`,
+    see `execenv.interpolate`.
+
+    Layers are only recorded when added, and merged into a dict once on first use. Copies share layers
+    and the merged result of them, so that layers added to a copy are applied on top of it without merging
+    the shared ones again.
+    """
+
+    _layers: List[Tuple[str, str, Any]]
+    _built: Optional[Tuple[int, Dict[str, str]]]
+    cache: EnvCache
+    interpolate: bool
+
+    def __init__(
+        self, cache: Optional[EnvCache] = None, interpolate: bool = False
+    ) -> None:
+        """
+        Args:
+            cache (Optional[EnvCache]): Cache of parsed .env files. A cache configured by environment variables
+                (the same as the CLI uses) by default.
+            interpolate (bool): Expand references to variables in values. Values are kept as they are by default,
+                as with the CLI.
+        """
+        self._layers = [("base", "os", None)]
+        self._built = None
+        # Variables of the current environment read by interpolation, only recorded by `compile`
+        self._reads: Optional[Dict[str, Optional[str]]] = None
+        self.cache = cache or EnvCache.from_environ(__version__)
+        self.interpolate = interpolate
+
+    def _add(self, kind: str, source: str, value: Any) -> "Environment":
+        self._layers.append((kind, source, value))
+        return self
+
+    def clear(self) -> "Environment":
+        """
+        Drop the current environment and all layers added so far.
+        """
+        self._layers.clear()
+        self._built = None
+        return self
+
+    def load_file(
+        self,
+        file: Union[str, "os.PathLike[str]", IO[str]],
+        source: Optional[str] = None,
+    ) -> "Environment":
+        """
+        Load K-V pairs from a .env file, given by path or as an opened file.
+
+        The file is parsed right away, so that errors are raised here and streams like stdin are read in order.
+
+        Args:
+            source (Optional[str]): Name of the layer shown by `sources`. Path of the file by default.
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file) as f:
+                return self._add("set", source or os.fspath(file), self.cache.load(f))
+        return self._add(
+            "set", source or str(getattr(file, "name", "file")), self.cache.load(file)
+        )
+
+    def source(
+        self,
+        script: Union[str, "os.PathLike[str]"],
+        args: Sequence[str] = (),
+        source: Optional[str] = None,
+    ) -> "Environment":
+        """
+        Apply changes a shell script makes to the environment when sourced, e.g. an activation script of a toolchain.
+
+        The script is sourced in the environment merged so far when building, and the changes are cached
+        so that it is not sourced again until the script or its inputs change, see `execenv.source.source_script`.
+
+        Args:
+            args (Sequence[str]): Arguments passed to the script.
+            source (Optional[str]): Name of the layer shown by `sources`. Path of the script by default.
+        """
+        return self._add(
+            "source",
+            source or os.fspath(script),
+            SourcedScript(os.fspath(script), args),
+        )
+
+    def load_compiled(
+        self,
+        artifact: Union[str, "os.PathLike[str]", "Artifact"],
+        source: Optional[str] = None,
+    ) -> "Environment":
+        """
+        Apply an artifact compiled by `compile` and `execenv.artifact.write_artifact`, given by path or as read
+        by `execenv.artifact.read_artifact`, without parsing anything.
+
+        If the artifact is stale or of another format version, the layers it was compiled from are added instead,
+        as long as its inputs exist.
+        If it was compiled from a cleared environment, the environment and all layers added so far are dropped,
+        as `clear` does.
+
+        Args:
+            source (Optional[str]): Name of the layer shown by `sources`. Path of the artifact by default.
+
+        Raises:
+            execenv.artifact.ArtifactError: If the artifact can not be read, is corrupted, or is stale
+                with inputs missing.
+        """
+        from execenv.artifact import ArtifactError, read_artifact
+
+        if isinstance(artifact, (str, os.PathLike)):
+            artifact = read_artifact(artifact)
+        source = source or artifact.path
+
+        if artifact.clear:
+            self.clear()
+        if artifact.compiled is not None:
+            return self._add("compiled", source, artifact.compiled)
+
+        recipe = artifact.recipe
+        for path in [*(script for script, _ in recipe.sources), *recipe.files]:
+            if not os.path.exists(path):
+                raise ArtifactError(
+                    f"{artifact.path} is stale ({artifact.stale}) and can not be built from its inputs, as {path} is missing"
+                )
+        for script, args in recipe.sources:
+            self.source(script, args)
+        for path in recipe.files:
+            self.load_file(path)
+        self.update(recipe.env, source=source)
+        for key, value, separator in recipe.append:
+            self.append(key, value, separator, source=source)
+        return self
+
+    def set(self, key: str, value: str, source: str = "set") -> "Environment":
+        """
+        Set variable to given value.
+        """
+        return self._add("set", source, {key: value})
+
+    def update(self, env: Mapping[str, str], source: str = "set") -> "Environment":
+        """
+        Set variables to given values.
+        """
+        return self._add("set", source, dict(env))
+
+    def append(
+        self,
+        key: str,
+        value: str,
+        separator: str = os.pathsep,
+        source: str = "append",
+    ) -> "Environment":
+        """
+        Append value to variable with separator, or set it if not present.
+        """
+        return self._add("append", source, (key, value, separator))
+
+    def copy(self) -> "Environment":
+        """
+        Copy the builder, so that layers can be added to each copy independently.
+        """
+        env = Environment(self.cache, self.interpolate)
+        env._layers = self._layers.copy()
+        env._built = self._built
+        return env
+
+    def build(self) -> Dict[str, str]:
+        """
+        Get the merged environment. The returned dict should not be modified.
+
+        Raises:
+            execenv.interpolate.InterpolationError: If variables reference each other in a cycle.
+            execenv.source.SourceError: If a script fails to be sourced.
+        """
+        if self._built is not None and self._built[0] == len(self._layers):
+            return self._built[1]
+
+        # Continue from layers merged before, possibly shared with other copies and thus copied first
+        if self._built is not None:
+            merged, env = self._built[0], self._built[1].copy()
+        else:
+            merged, env = 0, {}
+
+        written: Set[str] = set()
+        for kind, _, value in self._layers[merged:]:
+            below: Mapping[str, str] = env
+            if self._reads is not None:
+                below = _HostReads(env, written, self._reads)
+
+            if kind == "base":
+                env.update(os.environ)
+            elif kind == "set":
+                env.update(interpolate(value, below) if self.interpolate else value)
+            elif kind == "source":
+                value.apply(env, self.cache)
+            elif kind == "compiled":
+                value.apply(env)
+            else:
+                key, appended, separator = value
+                if self.interpolate:
+                    appended = interpolate({key: appended}, below)[key]
+                append_to_env(env, key, appended, separator)
+
+            if self._reads is not None:
+                written.update(_written_keys(kind, value))
+
+        self._built = (len(self._layers), env)
+        return env
+
+    def sources(self) -> Dict[str, str]:
+        """
+        Get the layers each variable of the merged environment comes from, e.g. `os`, path of a .env file,
+        or `os + append` for a variable appended to.
+
+        Only names of variables are gone through, so it is cheap even for large environments.
+        """
+        sources: Dict[str, str] = {}
+        for kind, source, value in self._layers:
+            if kind == "base":
+                sources.update(dict.fromkeys(os.environ, source))
+            elif kind == "set":
+                sources.update(dict.fromkeys(value, source))
+            elif kind == "source":
+                # Only known once built
+                if value.diff is not None:
+                    sources.update(dict.fromkeys(value.diff.changed, source))
+                    for key in value.diff.removed:
+                        sources.pop(key, None)
+            elif kind == "compiled":
+                sources.update(dict.fromkeys(value.changed, source))
+                for key in value.removed:
+                    sources.pop(key, None)
+                for key, _, _ in value.appends:
+                    sources[key] = (
+                        f"{sources[key]} + {source}" if key in sources else source
+                    )
+            else:
+                key = value[0]
+                sources[key] = (
+                    f"{sources[key]} + {source}" if key in sources else source
+                )
+        return sources
+
+    def compile(self) -> "CompiledEnv":
+        """
+        Resolve layers into changes to the environment they start from (the current one, or nothing if cleared),
+        to be written by `execenv.artifact.write_artifact` and applied again by `load_compiled` without parsing.
+
+        Variables set by layers are recorded with their values even if the current environment has the same ones.
+        Variables of the current environment read by interpolation are recorded in `host`, so that the artifact
+        is stale once they differ.
+        Appends at the end to variables only coming from the current environment are kept as appends,
+        so that they are applied to the environment the artifact is loaded into, as `append` does.
+
+        Raises:
+            execenv.interpolate.InterpolationError: If variables reference each other in a cycle.
+            execenv.source.SourceError: If a script fails to be sourced.
+        """
+        from execenv.artifact import CompiledEnv
+
+        end = len(self._layers)
+        while end > 0 and self._layers[end - 1][0] == "append":
+            end -= 1
+
+        resolved = Environment(self.cache, self.interpolate)
+        resolved._layers = self._layers[:end]
+        from_current = resolved._layers[:1] == [("base", "os", None)]
+        if from_current:
+            resolved._reads = {}
+        env = dict(resolved.build())
+
+        before = os.environ if from_current else {}
+        # Variables written by layers are kept whatever their value here, as the environment the artifact is
+        # loaded into may differ; the current one only tells which variables are removed
+        base_sources = {
+            source for kind, source, _ in resolved._layers if kind == "base"
+        }
+        written = {
+            key
+            for key, source in resolved.sources().items()
+            if source not in base_sources
+        }
+        compiled = CompiledEnv(
+            changed={
+                key: value
+                for key, value in env.items()
+                if key in written or before.get(key) != value
+            },
+            removed=[key for key in before if key not in env],
+            host=resolved._reads or {},
+        )
+
+        for _, _, (key, value, separator) in self._layers[end:]:
+            if self.interpolate:
+                below = _HostReads(env, written, compiled.host) if from_current else env
+                value = interpolate({key: value}, below)[key]
+            append_to_env(env, key, value, separator)
+
+            if key in compiled.changed:
+                append_to_env(compiled.changed, key, value, separator)
+            elif key in compiled.removed:
+                compiled.removed.remove(key)
+                compiled.changed[key] = value
+            elif before:
+                compiled.appends.append((key, value, separator))
+            else:
+                compiled.changed[key] = value
+        return compiled
+
+
+def command_line(command: Sequence[str], shell_strict: bool = False) -> str:
+    """
+    Join arguments into a command line for shell, with `shlex.join` if `shell_strict` or `subprocess.list2cmdline` otherwise.
+    """
+    if shell_strict:
+        import shlex
+
+        return shlex.join(command)
+    return subprocess.list2cmdline(command)
+
+
+def _prepare(
+    command: Command,
+    env: Union[Environment, Mapping[str, str], None],
+    shell: bool,
+    shell_strict: bool,
+    env_varref_prefix: Optional[str],
+    expand: bool,
+) -> Tuple[Union[str, List[str]], Optional[Mapping[str, str]]]:
+    args = [command] if isinstance(command, str) else list(command)
+
+    if isinstance(env, Environment):
+        env = env.build()
+
+    if expand:
+        args = expand_args(args, os.environ if env is None else env, env_varref_prefix)
+    elif env_varref_prefix:
+        args = [convert_env_varref(env_varref_prefix, arg) for arg in args]
+
+    if shell:
+        return (
+            args[0] if isinstance(command, str) else command_line(args, shell_strict)
+        ), env
+    return args, env
+
+
+def run(
+    command: Command,
+    env: Union[Environment, Mapping[str, str], None] = None,
+    *,
+    cwd: Optional[str] = None,
+    shell: bool = False,
+    shell_strict: bool = False,
+    env_varref_prefix: Optional[str] = None,
+    expand: bool = False,
+    **kwargs: Any,
+) -> subprocess.CompletedProcess:
+    """
+    Run command with given environment and wait for it, like the `execenv` CLI does.
+
+    Args:
+        command (Command): Arguments of command, or a command line if `shell`.
+        env (Union[Environment, Mapping[str, str], None]): Environment to run with. The current one by default.
+        cwd (Optional[str]): Current working directory.
+        shell (bool): Use shell to run the command. Arguments are joined into a command line.
+        shell_strict (bool): Use `shlex.join` instead of `subprocess.list2cmdline` to join arguments.
+        env_varref_prefix (Optional[str]): Prefix of environment variable references in arguments
+            to convert to the platform-dependent format, e.g. `EXECENV_`.
+        expand (bool): Expand references to variables in arguments against the environment, instead of
+            leaving them to a shell, see `expand_args`. References with `env_varref_prefix` are expanded as well.
+        **kwargs: Passed to `subprocess.run`, e.g. `capture_output`, `text`, `check`.
+    """
+    args, run_env = _prepare(
+        command, env, shell, shell_strict, env_varref_prefix, expand
+    )
+    return subprocess.run(args, env=run_env, cwd=cwd, shell=shell, **kwargs)
+
+
+def popen(
+    command: Command,
+    env: Union[Environment, Mapping[str, str], None] = None,
+    *,
+    cwd: Optional[str] = None,
+    shell: bool = False,
+    shell_strict: bool = False,
+    env_varref_prefix: Optional[str] = None,
+    expand: bool = False,
+    **kwargs: Any,
+) -> subprocess.Popen:
+    """
+    Start command with given environment without waiting for it.
+
+    Args:
+        **kwargs: Passed to `subprocess.Popen`, e.g. `stdout`, `stderr`.
+
+        See `run` for the rest.
+    """
+    args, run_env = _prepare(
+        command, env, shell, shell_strict, env_varref_prefix, expand
+    )
+    return subprocess.Popen(args, env=run_env, cwd=cwd, shell=shell, **kwargs)
+
+
+async def arun(
+    command: Command,
+    env: Union[Environment, Mapping[str, str], None] = None,
+    *,
+    cwd: Optional[str] = None,
+    shell: bool = False,
+    shell_strict: bool = False,
+    env_varref_prefix: Optional[str] = None,
+    expand: bool = False,
+    input: Optional[bytes] = None,
+    capture_output: bool = False,
+    check: bool = False,
+    **kwargs: Any,
+) -> subprocess.CompletedProcess:
+    """
+    Asynchronous version of `run`, based on `asyncio.create_subprocess_exec` (or `create_subprocess_shell` if `shell`).
+
+    Output is captured as bytes if `capture_output`.
+
+    Args:
+        input (Optional[bytes]): Data sent to stdin of the command.
+        capture_output (bool): Capture stdout and stderr.
+        check (bool): Raise `subprocess.CalledProcessError` if the command exits with non-zero code.
+        **kwargs: Passed to `asyncio.create_subprocess_exec`, e.g. `stdout`, `stderr`.
+
+        See `run` for the rest.
+    """
+    import asyncio
+
+    args, run_env = _prepare(
+        command, env, shell, shell_strict, env_varref_prefix, expand
+    )
+
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+
+    if shell:
+        process = await asyncio.create_subprocess_shell(
+            cast(str, args), env=run_env, cwd=cwd, **kwargs
+        )
+    else:
+        process = await asyncio.create_subprocess_exec(
+            *args, env=run_env, cwd=cwd, **kwargs
+        )
+
+    try:
+        stdout, stderr = await process.communicate(input)
+    except BaseException:
+        # Cancelled, e.g. by a timeout
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    result = subprocess.CompletedProcess(
+        args, cast(int, process.returncode), stdout, stderr
+    )
+    if check:
+        result.check_returncode()
+    return result
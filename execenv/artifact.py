@@ -0,0 +1,276 @@
+import os
+import struct
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+from execenv.api import append_to_env
+
+# `hashlib` and `json` are imported lazily, as loading a fresh artifact needs neither
+
+# Layout of an artifact:
+#
+#   magic, CRC-32 of the rest, length of recipe | recipe (JSON) | format version | compiled environment
+#
+# Everything up to the end of the recipe stays the same across format versions, so that artifacts of other
+# versions can still be built from their inputs. The recipe is only parsed then.
+#
+# The compiled environment is a byte of flags followed by sections of strings joined by NUL (which can not be part
+# of environment variables): inputs (path, size, modification time and SHA-256 of each), pairs of variables set,
+# variables removed, triples of appends, and variables of the environment at build time read by interpolation:
+# pairs of those set, and those unset.
+MAGIC = b"EXEA"
+FORMAT_VERSION = 2
+
+PREFIX = struct.Struct("<4sII")
+VERSION = struct.Struct("<B")
+FLAGS = struct.Struct("<B")
+LENGTH = struct.Struct("<I")
+
+FLAG_CLEAR = 0x1
+
+
+class ArtifactError(Exception):
+    pass
+
+
+@dataclass
+class CompiledEnv:
+    """
+    Changes resolved layers make to the environment they start from, see `execenv.api.Environment.compile`.
+
+    Appends in `appends` are to variables only coming from that environment, so they are applied again
+    to the environment the artifact is loaded into. `host` has variables of that environment references
+    were resolved against (`None` if unset), which the environment loaded into should have as well.
+    """
+
+    changed: Dict[str, str] = field(default_factory=dict)
+    removed: List[str] = field(default_factory=list)
+    appends: List[Tuple[str, str, str]] = field(default_factory=list)
+    host: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    def apply(self, env: Dict[str, str]):
+        env.update(self.changed)
+        for key in self.removed:
+            env.pop(key, None)
+        for key, value, separator in self.appends:
+            append_to_env(env, key, value, separator)
+
+
+@dataclass
+class Recipe:
+    """
+    Inputs an artifact is compiled from, to build the environment from them instead if the artifact is stale.
+
+    Paths should be absolute, so that the artifact can be loaded from any directory.
+    """
+
+    clear: bool = False
+    sources: List[Tuple[str, List[str]]] = field(default_factory=list)
+    files: List[str] = field(default_factory=list)
+    env: Dict[str, str] = field(default_factory=dict)
+    append: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+@dataclass
+class Artifact:
+    """
+    Artifact read by `read_artifact`. `compiled` is `None` if it can not be used as is, with the reason in `stale`.
+    """
+
+    path: str
+    clear: bool
+    compiled: Optional[CompiledEnv]
+    stale: Optional[str]
+    recipe_data: bytes = field(repr=False)
+
+    @property
+    def recipe(self) -> Recipe:
+        """
+        Parse the recipe, only needed if the artifact is stale.
+
+        Raises:
+            ArtifactError: If the recipe is not valid.
+        """
+        import json
+
+        try:
+            fields = json.loads(self.recipe_data)
+            return Recipe(
+                clear=bool(fields["clear"]),
+                sources=[(script, list(args)) for script, args in fields["sources"]],
+                files=list(fields["files"]),
+                env=dict(fields["env"]),
+                append=[tuple(append) for append in fields["append"]],  # type: ignore
+            )
+        except (ValueError, KeyError, TypeError) as e:
+            raise ArtifactError(f"{self.path} is not a valid artifact ({e})")
+
+
+def _hash(path: str) -> str:
+    import hashlib
+
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _changed_input(inputs: List[str]) -> Optional[str]:
+    # Files are only hashed if their size or modification time changed, e.g. when copied.
+    # Inputs that do not exist are not taken as changed, so that an artifact can be shipped without its inputs.
+    for path, size, mtime_ns, digest in zip(
+        inputs[::4], inputs[1::4], inputs[2::4], inputs[3::4]
+    ):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if (str(st.st_size), str(st.st_mtime_ns)) != (size, mtime_ns) and _hash(
+            path
+        ) != digest:
+            return path
+    return None
+
+
+def _pack(items: List[str]) -> bytes:
+    data = "\0".join(items).encode("utf-8", "surrogatepass")
+    return LENGTH.pack(len(data)) + data
+
+
+def write_artifact(
+    path: Union[str, "os.PathLike[str]"], recipe: Recipe, compiled: CompiledEnv
+):
+    """
+    Write an artifact atomically, recording size, modification time and hash of scripts and files of `recipe`,
+    so that it is known to be stale once they change, or once variables in `compiled.host` do.
+
+    Raises:
+        OSError: If an input can not be read, or the artifact can not be written.
+    """
+    import json
+
+    inputs = []
+    for input_path in [*(script for script, _ in recipe.sources), *recipe.files]:
+        st = os.stat(input_path)
+        inputs += [input_path, str(st.st_size), str(st.st_mtime_ns), _hash(input_path)]
+
+    recipe_data = json.dumps(
+        {
+            "clear": recipe.clear,
+            "sources": recipe.sources,
+            "files": recipe.files,
+            "env": recipe.env,
+            "append": recipe.append,
+        }
+    ).encode()
+    body = b"".join(
+        (
+            recipe_data,
+            VERSION.pack(FORMAT_VERSION),
+            FLAGS.pack(FLAG_CLEAR if recipe.clear else 0),
+            _pack(inputs),
+            _pack([item for pair in compiled.changed.items() for item in pair]),
+            _pack(compiled.removed),
+            _pack([item for append in compiled.appends for item in append]),
+            _pack(
+                [
+                    item
+                    for key, value in compiled.host.items()
+                    if value is not None
+                    for item in (key, value)
+                ]
+            ),
+            _pack([key for key, value in compiled.host.items() if value is None]),
+        )
+    )
+
+    path = os.fspath(path)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(PREFIX.pack(MAGIC, zlib.crc32(body), len(recipe_data)) + body)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _unpack(data: bytes, offset: int) -> Tuple[List[str], int]:
+    (length,) = LENGTH.unpack_from(data, offset)
+    offset += LENGTH.size
+    if offset + length > len(data):
+        raise ValueError("Truncated section")
+    items = data[offset : offset + length].decode("utf-8", "surrogatepass")
+    return items.split("\0") if items else [], offset + length
+
+
+def read_artifact(path: Union[str, "os.PathLike[str]"]) -> Artifact:
+    """
+    Read an artifact written by `write_artifact` with a single read, and check whether it can be used as is:
+    it is stale if any of its inputs or variables of the current environment it read changed,
+    and incompatible if of another format version.
+
+    Raises:
+        ArtifactError: If the artifact can not be read, or is corrupted.
+    """
+    path = os.fspath(path)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise ArtifactError(f"Failed to open {path} ({e.strerror})")
+
+    try:
+        magic, checksum, recipe_length = PREFIX.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an artifact")
+        if zlib.crc32(memoryview(data)[PREFIX.size :]) != checksum:
+            raise ValueError("checksum mismatch")
+
+        offset = PREFIX.size + recipe_length
+        recipe_data = data[PREFIX.size : offset]
+        (version,) = VERSION.unpack_from(data, offset)
+        if version != FORMAT_VERSION:
+            artifact = Artifact(
+                path,
+                False,
+                None,
+                f"format version {version}, expected {FORMAT_VERSION}",
+                recipe_data,
+            )
+            artifact.clear = artifact.recipe.clear
+            return artifact
+
+        offset += VERSION.size
+        (flags,) = FLAGS.unpack_from(data, offset)
+        offset += FLAGS.size
+        inputs, offset = _unpack(data, offset)
+        pairs, offset = _unpack(data, offset)
+        removed, offset = _unpack(data, offset)
+        appends, offset = _unpack(data, offset)
+        host_set, offset = _unpack(data, offset)
+        host_unset, offset = _unpack(data, offset)
+        if offset != len(data):
+            raise ValueError("trailing data")
+    except (struct.error, ValueError) as e:
+        raise ArtifactError(f"{path} is not a valid artifact ({e})")
+
+    clear = bool(flags & FLAG_CLEAR)
+    host: Dict[str, Optional[str]] = dict(zip(host_set[::2], host_set[1::2]))
+    host.update(dict.fromkeys(host_unset))
+    changed = _changed_input(inputs) or next(
+        (f"${key}" for key, value in host.items() if os.environ.get(key) != value),
+        None,
+    )
+    if changed is not None:
+        return Artifact(path, clear, None, f"{changed} changed", recipe_data)
+
+    compiled = CompiledEnv(
+        dict(zip(pairs[::2], pairs[1::2])),
+        removed,
+        list(zip(appends[::3], appends[1::3], appends[2::3])),
+        host,
+    )
+    return Artifact(path, clear, compiled, None, recipe_data)
@@ -0,0 +1,265 @@
+import json
+import shlex
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import IO, Dict, List, Optional, Union
+
+import click
+
+from execenv.api import popen
+from execenv.pipeline import exit_status
+
+OUTPUT_MODES = ("prefix", "grouped")
+
+
+@dataclass
+class BatchCommand:
+    """
+    Command in a batch manifest, or a variant of command in matrix mode.
+
+    `env` overrides the environment shared by all commands if given. `terminated` is set for commands
+    terminated by execenv after another one failed with `--fail-fast`.
+    """
+
+    name: str
+    args: List[str]
+    env: Optional[Dict[str, str]] = None
+    returncode: Optional[int] = None
+    duration: Optional[float] = None
+    terminated: bool = False
+
+    @property
+    def display(self) -> str:
+        return shlex.join(self.args)
+
+
+def parse_manifest_line(line: str, line_number: int) -> Optional[BatchCommand]:
+    """
+    Parse a line of batch manifest. Commands are named after their line number unless a name is given.
+
+    A line is either a command line split with shell-like syntax, or a JSON value being one of:
+
+    - an array of arguments;
+    - a string, parsed as a command line;
+    - an object with `command` (array or string) and optional `name`.
+
+    Empty lines and lines starting with `#` are skipped.
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    name = str(line_number)
+    command: Union[str, List[str]] = line
+    if line[0] in '[{"':
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise click.BadParameter(f"Invalid JSON in line {line_number} ({e})")
+
+        if isinstance(value, dict):
+            name = str(value.get("name", name))
+            value = value.get("command")
+        if (
+            isinstance(value, list)
+            and value
+            and all(isinstance(arg, str) for arg in value)
+        ):
+            command = value
+        elif isinstance(value, str) and value:
+            command = value
+        else:
+            raise click.BadParameter(
+                f"Command in line {line_number} should be a non-empty string or array of strings"
+            )
+
+    if isinstance(command, str):
+        command = shlex.split(command)
+        if not command:
+            return None
+
+    return BatchCommand(name=name, args=command)
+
+
+def read_manifest(file: IO[str]) -> List[BatchCommand]:
+    """
+    Read commands from a batch manifest, see `parse_manifest_line` for the format.
+    """
+    commands: List[BatchCommand] = []
+    for line_number, line in enumerate(file, 1):
+        command = parse_manifest_line(line, line_number)
+        if command is not None:
+            commands.append(command)
+    return commands
+
+
+class _Output:
+    """
+    Writes output of commands running in parallel without interleaving.
+
+    In `prefix` mode every line is written as a whole with the command name as prefix as soon as it is read,
+    while in `grouped` mode the whole output of a command is written at once after it exits.
+    """
+
+    def __init__(self, mode: str) -> None:
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.streams = {
+            "stdout": click.get_binary_stream("stdout"),
+            "stderr": click.get_binary_stream("stderr"),
+        }
+
+    def write(self, stream: str, data: bytes):
+        with self.lock:
+            self.streams[stream].write(data)
+            self.streams[stream].flush()
+
+    def pipe(self, command: BatchCommand, stream: str, pipe: IO[bytes]) -> List[bytes]:
+        """
+        Forward output of a command from pipe until EOF.
+
+        Returns:
+            List[bytes]: Lines held back to be written as a group.
+        """
+        prefix = f"[{command.name}] ".encode()
+        lines: List[bytes] = []
+        for line in pipe:
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            if self.mode == "prefix":
+                self.write(stream, prefix + line)
+            else:
+                lines.append(line)
+        return lines
+
+
+def run_batch(
+    commands: List[BatchCommand],
+    env: Dict[str, str],
+    cwd: Optional[str],
+    shell: bool,
+    shell_strict: bool,
+    jobs: int,
+    output: str,
+    fail_fast: bool,
+) -> int:
+    """
+    Run commands with at most `jobs` of them at the same time, with `env` unless a command has its own.
+
+    With `fail_fast`, commands not started yet are skipped and running ones are terminated after the first failure.
+
+    Returns:
+        int: Exit code of the first failed command in manifest order (`128 + N` if killed by signal `N`),
+            or 0 if all succeeded. Commands terminated because of `fail_fast` are not taken as failed.
+    """
+    writer = _Output(output)
+    failed = threading.Event()
+    running: Dict[int, subprocess.Popen] = {}
+    running_lock = threading.Lock()
+
+    def run(index: int, command: BatchCommand):
+        with running_lock:
+            if fail_fast and failed.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                process = popen(
+                    command.args,
+                    env if command.env is None else command.env,
+                    cwd=cwd,
+                    shell=shell,
+                    shell_strict=shell_strict,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+            except OSError as e:
+                writer.write(
+                    "stderr",
+                    f"[{command.name}] Error: Failed to execute {command.args[0]} ({e.strerror})\n".encode(),
+                )
+                command.returncode = 127 if isinstance(e, FileNotFoundError) else 126
+                command.duration = time.perf_counter() - started
+                if fail_fast:
+                    failed.set()
+                return
+            running[index] = process
+
+        grouped: Dict[str, List[bytes]] = {}
+        reader = threading.Thread(
+            target=lambda: grouped.__setitem__(
+                "stdout",
+                writer.pipe(command, "stdout", process.stdout),  # type: ignore
+            )
+        )
+        reader.start()
+        grouped["stderr"] = writer.pipe(command, "stderr", process.stderr)  # type: ignore
+        reader.join()
+        command.returncode = exit_status(process.wait())
+        command.duration = time.perf_counter() - started
+
+        with running_lock:
+            del running[index]
+            if command.returncode != 0 and fail_fast and not failed.is_set():
+                failed.set()
+                for other_index, other in running.items():
+                    commands[other_index].terminated = True
+                    other.terminate()
+
+        if output == "grouped":
+            with writer.lock:
+                header = f"===== [{command.name}] {command.display} =====\n".encode()
+                writer.streams["stdout"].write(header)
+                writer.streams["stdout"].write(b"".join(grouped["stdout"]))
+                writer.streams["stdout"].flush()
+                writer.streams["stderr"].write(b"".join(grouped["stderr"]))
+                writer.streams["stderr"].flush()
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for future in [
+            executor.submit(run, index, command)
+            for index, command in enumerate(commands)
+        ]:
+            future.result()
+
+    show_summary(commands)
+
+    for command in commands:
+        if command.returncode and not command.terminated:
+            return command.returncode
+    return 0
+
+
+def show_summary(commands: List[BatchCommand]):
+    """
+    Show a table of exit code and wall time of each command on stderr.
+    """
+    name_width = max((len(command.name) for command in commands), default=0) + 2
+    failed = skipped = terminated = 0
+
+    click.echo("", err=True)
+    for command in commands:
+        if command.returncode is None:
+            skipped += 1
+            status = click.style("skipped".ljust(8), fg="yellow")
+        elif command.returncode == 0:
+            status = click.style("exit 0".ljust(8), fg="green")
+        elif command.terminated:
+            terminated += 1
+            status = click.style("terminated", fg="yellow")
+        else:
+            failed += 1
+            status = click.style(f"exit {command.returncode}".ljust(8), fg="red")
+        duration = "" if command.duration is None else f"{command.duration:.2f}s"
+        click.echo(
+            f"{f'[{command.name}]'.ljust(name_width)} {status} {duration.rjust(9)}  {command.display}",
+            err=True,
+        )
+    click.echo(
+        f"Ran {len(commands) - skipped} of {len(commands)} commands, {failed} failed"
+        + (f", {terminated} terminated." if terminated else "."),
+        err=True,
+    )
@@ -0,0 +1,274 @@
+import os
+import stat
+import struct
+import sys
+import threading
+import zlib
+from pathlib import Path
+from typing import IO, Dict, Optional, Tuple
+
+from execenv.dotenv import iter_parse
+
+DEFAULT_ENV_CACHE_SIZE = 16 * 1024 * 1024
+
+# Number of parsed files kept in memory if enabled, see `EnvCache.memory`
+MEMORY_CACHE_SIZE = 256
+
+
+def get_cache_dir() -> Path:
+    """
+    Get the directory where execenv keeps its persistent caches.
+
+    `EXECENV_CACHE_DIR` takes precedence, then the platform-dependent user cache directory is used
+    (`$XDG_CACHE_HOME/execenv` or `~/.cache/execenv` on Linux / macOS, `%LOCALAPPDATA%\\execenv\\Cache` on Windows).
+
+    The directory is not created here.
+    """
+    cache_dir = os.getenv("EXECENV_CACHE_DIR")
+    if cache_dir:
+        return Path(cache_dir)
+
+    if sys.platform == "win32":
+        base = os.getenv("LOCALAPPDATA")
+        if base:
+            return Path(base) / "execenv" / "Cache"
+
+    base = os.getenv("XDG_CACHE_HOME")
+    return (Path(base) if base else Path.home() / ".cache") / "execenv"
+
+
+def evict_lru(directory: Path, max_size: int, suffix: str):
+    """
+    Remove least recently used (by modification time) files with given suffix in a directory,
+    until their total size fits in `max_size`.
+    """
+    entries = []
+    total = 0
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.endswith(suffix):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+    except OSError:
+        return
+
+    if total <= max_size:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.unlink(path)
+        except OSError:
+            # Might be removed by another process already
+            pass
+        total -= size
+        if total <= max_size:
+            break
+
+
+class EnvCache:
+    """
+    Persistent cache of parsed .env files.
+
+    Each entry is a compact binary file under `<cache dir>/env`, keyed by path and validated against
+    size, modification time, device and inode of the source file. Entries are written to a temporary file
+    and atomically moved into place, so concurrent execenv processes never see partial ones. Least recently used
+    entries are evicted when the total size exceeds `max_size`.
+
+    Long-running processes can also keep parsed files in memory, shared by all instances, by setting `memory` to a dict.
+
+    Files can be loaded from multiple threads at the same time.
+    """
+
+    MAGIC = b"EXEV"
+    FORMAT_VERSION = 1
+
+    # magic, format version, size, mtime_ns, dev, ino
+    HEADER = struct.Struct("<4sBQqQQ")
+    LENGTH = struct.Struct("<I")
+
+    enabled: bool
+    directory: Path
+    max_size: int
+    version: str
+    hits: int
+    misses: int
+
+    # Key and parsed result of each path, if enabled
+    memory: Optional[Dict[str, Tuple[bytes, Dict[str, str]]]] = None
+
+    # Guards counters and `memory`
+    _lock = threading.Lock()
+
+    def __init__(
+        self,
+        directory: Optional[Path] = None,
+        max_size: int = DEFAULT_ENV_CACHE_SIZE,
+        version: str = "",
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.directory = directory or get_cache_dir() / "env"
+        self.max_size = max_size
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_environ(cls, version: str = "") -> "EnvCache":
+        """
+        Create cache configured by `EXECENV_NO_CACHE` and `EXECENV_CACHE_SIZE` (in bytes).
+        """
+        return cls(
+            max_size=int(os.getenv("EXECENV_CACHE_SIZE", DEFAULT_ENV_CACHE_SIZE)),
+            version=version,
+            enabled=not os.getenv("EXECENV_NO_CACHE", ""),
+        )
+
+    def _entry_path(self, path: str) -> Path:
+        return self.directory / f"{zlib.crc32(os.fsencode(path)):08x}.bin"
+
+    def _key(self, path: str, st: os.stat_result) -> bytes:
+        header = self.HEADER.pack(
+            self.MAGIC,
+            self.FORMAT_VERSION,
+            st.st_size,
+            st.st_mtime_ns,
+            st.st_dev,
+            st.st_ino,
+        )
+        return header + self._pack_str(self.version) + self._pack_str(path)
+
+    def _pack_str(self, value: str) -> bytes:
+        data = value.encode("utf-8", "surrogatepass")
+        return self.LENGTH.pack(len(data)) + data
+
+    def get(self, path: str, st: os.stat_result) -> Optional[Dict[str, str]]:
+        entry_path = self._entry_path(path)
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        key = self._key(path, st)
+        if not data.startswith(key):
+            return None
+
+        try:
+            env: Dict[str, str] = {}
+            offset = len(key)
+            (count,) = self.LENGTH.unpack_from(data, offset)
+            offset += self.LENGTH.size
+            for _ in range(count):
+                pair = []
+                for _ in range(2):
+                    (length,) = self.LENGTH.unpack_from(data, offset)
+                    offset += self.LENGTH.size
+                    pair.append(
+                        data[offset : offset + length].decode("utf-8", "surrogatepass")
+                    )
+                    offset += length
+                env[pair[0]] = pair[1]
+            if offset != len(data):
+                return None
+        except (struct.error, UnicodeDecodeError):
+            return None
+
+        # Mark as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        return env
+
+    def put(self, path: str, st: os.stat_result, env: Dict[str, str]):
+        chunks = [self._key(path, st), self.LENGTH.pack(len(env))]
+        for key, value in env.items():
+            chunks.append(self._pack_str(key))
+            chunks.append(self._pack_str(value))
+
+        entry_path = self._entry_path(path)
+        temp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                f.write(b"".join(chunks))
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # Failing to cache only means parsing again next time
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return
+
+        self.evict()
+
+    def evict(self):
+        """
+        Remove least recently used entries until the total size fits in `max_size`.
+        """
+        evict_lru(self.directory, self.max_size, ".bin")
+
+    def load(self, file: IO[str]) -> Dict[str, str]:
+        """
+        Parse an opened .env file, using cached result if the file has not changed.
+
+        Only regular files with a real path are cached. Others (e.g. stdin, pipes) are always parsed, as a stream.
+        """
+        if not self.enabled:
+            return dict(iter_parse(file))
+
+        try:
+            name = file.name
+            st = os.fstat(file.fileno())
+        except (AttributeError, OSError, ValueError):
+            return dict(iter_parse(file))
+
+        if (
+            not isinstance(name, str)
+            or name.startswith("<")
+            or not stat.S_ISREG(st.st_mode)
+        ):
+            return dict(iter_parse(file))
+
+        path = os.path.abspath(name)
+        memory = EnvCache.memory
+        if memory is not None:
+            key = self._key(path, st)
+            remembered = memory.get(path)
+            if remembered is not None and remembered[0] == key:
+                with self._lock:
+                    self.hits += 1
+                return dict(remembered[1])
+
+        env = self.get(path, st)
+        if env is not None:
+            with self._lock:
+                self.hits += 1
+        else:
+            with self._lock:
+                self.misses += 1
+            env = dict(iter_parse(file))
+            self.put(path, st, env)
+
+        if memory is not None:
+            with self._lock:
+                memory.pop(path, None)
+                if len(memory) >= MEMORY_CACHE_SIZE:
+                    del memory[next(iter(memory))]
+                memory[path] = (key, env)
+            return dict(env)
+        return env
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
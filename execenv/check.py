@@ -0,0 +1,327 @@
+import bisect
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from execenv.cache import evict_lru
+from execenv.dotenv import QUOTES, _Tokenizer
+
+FORMAT_VERSION = 1
+
+# Number of files from which they are checked by a pool of processes instead of one by one
+PARALLEL_THRESHOLD = 64
+
+# Directories skipped when scanning, besides hidden ones
+SKIPPED_DIRS = ("node_modules", "__pycache__")
+
+ERROR = "error"
+WARNING = "warning"
+NOTE = "note"
+
+
+@dataclass
+class Problem:
+    path: str
+    line: int
+    severity: str
+    code: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.path}:{self.line}: {self.severity}: {self.message} [{self.code}]"
+
+
+def is_env_file_name(name: str) -> bool:
+    """
+    Whether a file found by scanning directories is a .env file: `.env`, `.env.*` or `*.env`.
+    """
+    return name == ".env" or name.startswith(".env.") or name.endswith(".env")
+
+
+def find_env_files(values: Iterable[str]) -> List[List[str]]:
+    """
+    Find .env files to check, grouped into stacks of files applied on top of each other, in order:
+
+    - a file: stacked with other files given directly, in the order given;
+    - a glob pattern: files it matches, sorted, as a stack of their own, unless a file of that very name exists;
+    - a directory: .env files found recursively (skipping hidden directories), each directory a stack of its own,
+      of files `-f DIR` would load (`*.env`, sorted) followed by the others on their own.
+
+    Raises:
+        ValueError: If a glob pattern matches nothing.
+    """
+    import glob
+
+    stacks: List[List[str]] = []
+    files: List[str] = []
+    for value in values:
+        if os.path.isdir(value):
+            for root, dirs, names in os.walk(value):
+                dirs[:] = sorted(
+                    name
+                    for name in dirs
+                    if not name.startswith(".") and name not in SKIPPED_DIRS
+                )
+                layered = sorted(
+                    name
+                    for name in names
+                    if name.endswith(".env") and not name.startswith(".")
+                )
+                if layered:
+                    stacks.append([os.path.join(root, name) for name in layered])
+                stacks.extend(
+                    [os.path.join(root, name)]
+                    for name in sorted(names)
+                    if is_env_file_name(name) and name not in layered
+                )
+        elif not os.path.exists(value) and glob.has_magic(value):
+            paths = sorted(path for path in glob.glob(value) if os.path.isfile(path))
+            if not paths:
+                raise ValueError(f"No .env file matches {value}")
+            stacks.append(paths)
+        else:
+            files.append(value)
+
+    if files:
+        stacks.insert(0, files)
+    return stacks
+
+
+def check_source(src: str) -> Dict[str, Any]:
+    """
+    Check content of a .env file for lines not parsed as K-V pairs (which `execenv` would silently skip),
+    quoting problems and duplicate keys.
+
+    Returns:
+        Dict[str, Any]: `keys` as pairs of key and line number, and `problems` as tuples of line number, severity,
+            code and message, JSON-serializable to be cached.
+    """
+    src = src.replace("\r\n", "\n").replace("\r", "\n")
+    line_starts = [0]
+    line_starts.extend(i + 1 for i, c in enumerate(src) if c == "\n")
+
+    def line_of(pos: int) -> int:
+        return bisect.bisect_right(line_starts, pos)
+
+    tokenizer = _Tokenizer(src)
+    tokenizer.spans = []
+    keys: List[Tuple[str, int]] = []
+    problems: List[Tuple[int, str, str, str]] = []
+    first_lines: Dict[str, int] = {}
+    covered = bytearray(len(line_starts) + 1)
+
+    for (key, value), (start, end) in zip(tokenizer, tokenizer.spans):
+        line = line_of(start)
+        for covered_line in range(line, line_of(end) + 1):
+            covered[covered_line] = 1
+        keys.append((key, line))
+
+        if key in first_lines:
+            problems.append(
+                (
+                    line,
+                    WARNING,
+                    "duplicate-key",
+                    f"{key} is already set in line {first_lines[key]}, which is overridden",
+                )
+            )
+        else:
+            first_lines[key] = line
+
+        stripped = value.strip()
+        if stripped[:1] in tuple(QUOTES):
+            if len(stripped) < 2 or stripped[-1] != stripped[0]:
+                problems.append(
+                    (
+                        line,
+                        WARNING,
+                        "unterminated-quote",
+                        f"Value of {key} starts with {stripped[0]} but is not closed on its own, so it is taken as is with the quote",
+                    )
+                )
+        elif stripped:
+            # An unquoted value ends at the first "#", taken as a comment even without whitespace before it
+            line_end = src.find("\n", start)
+            text = src[start : line_end if line_end != -1 else None]
+            hash_pos = text.find("#")
+            if hash_pos > 0 and not text[hash_pos - 1].isspace():
+                problems.append(
+                    (
+                        line,
+                        WARNING,
+                        "truncated-value",
+                        f'Unquoted value of {key} is cut at "#", quote it to keep the rest',
+                    )
+                )
+
+    for index, line_start in enumerate(line_starts):
+        line = index + 1
+        if covered[line]:
+            continue
+        end = src.find("\n", line_start)
+        text = src[line_start : end if end != -1 else None].strip()
+        if text and not text.startswith("#"):
+            problems.append(
+                (
+                    line,
+                    ERROR,
+                    "unparsed-line",
+                    f"Line is not a K-V pair and is skipped: {text[:40]!r}",
+                )
+            )
+
+    problems.sort()
+    return {"keys": keys, "problems": problems}
+
+
+def _cache_key(data: bytes, version: str) -> str:
+    import hashlib
+
+    digest = hashlib.sha256(f"{FORMAT_VERSION}\0{version}\0".encode())
+    digest.update(data)
+    return digest.hexdigest()
+
+
+def check_file(
+    path: str, cache_dir: Optional[str] = None, version: str = ""
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Check a .env file by path, see `check_source`. Results are cached in `cache_dir` if given, keyed by content hash,
+    so that unchanged files are not checked again.
+
+    Returns:
+        Tuple[Dict[str, Any], bool]: Result as `check_source` returns, and whether it is from cache.
+    """
+    import json
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        return {
+            "keys": [],
+            "problems": [(0, ERROR, "unreadable", f"Failed to open ({e.strerror})")],
+        }, False
+
+    entry_path = None
+    if cache_dir is not None:
+        entry_path = Path(cache_dir) / f"{_cache_key(data, version)}.json"
+        try:
+            with open(entry_path, encoding="utf-8") as f:
+                result = json.load(f)
+            # Mark as recently used
+            os.utime(entry_path)
+            return result, True
+        except (OSError, ValueError):
+            pass
+
+    try:
+        result = check_source(data.decode())
+    except UnicodeDecodeError as e:
+        result = {
+            "keys": [],
+            "problems": [(0, ERROR, "unreadable", f"Not valid UTF-8 ({e.reason})")],
+        }
+
+    if entry_path is not None:
+        temp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # Failing to cache only means checking again next time
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    return result, False
+
+
+@dataclass
+class CheckReport:
+    files: int
+    cached: int
+    problems: List[Problem]
+
+    def count(self, severity: str) -> int:
+        return sum(problem.severity == severity for problem in self.problems)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "cached": self.cached,
+            "errors": self.count(ERROR),
+            "warnings": self.count(WARNING),
+            "notes": self.count(NOTE),
+            "problems": [asdict(problem) for problem in self.problems],
+        }
+
+
+def check_env_files(
+    stacks: List[List[str]],
+    jobs: Optional[int] = None,
+    cache_dir: Optional[Path] = None,
+    max_cache_size: int = 0,
+    version: str = "",
+) -> CheckReport:
+    """
+    Check stacks of .env files found by `find_env_files`, by a pool of `jobs` processes (number of CPUs by default)
+    if there are many of them. Besides problems of each file, keys overridden by later files of the same stack
+    are noted.
+    """
+    paths = list(dict.fromkeys(path for stack in stacks for path in stack))
+    cache = str(cache_dir) if cache_dir is not None else None
+    jobs = jobs or os.cpu_count() or 1
+
+    results: Dict[str, Tuple[Dict[str, Any], bool]] = {}
+    if jobs > 1 and len(paths) >= PARALLEL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        with ProcessPoolExecutor(jobs) as executor:
+            checked = executor.map(
+                partial(check_file, cache_dir=cache, version=version),
+                paths,
+                chunksize=max(1, len(paths) // (jobs * 4)),
+            )
+            results = dict(zip(paths, checked))
+    else:
+        for path in paths:
+            results[path] = check_file(path, cache, version)
+
+    if cache_dir is not None and max_cache_size:
+        evict_lru(cache_dir, max_cache_size, ".json")
+
+    problems = [
+        Problem(path, *problem)
+        for path in paths
+        for problem in results[path][0]["problems"]
+    ]
+    for stack in stacks:
+        if len(stack) < 2:
+            continue
+        defined: Dict[str, Tuple[str, int]] = {}
+        for path in stack:
+            for key, line in results[path][0]["keys"]:
+                if key in defined and defined[key][0] != path:
+                    problems.append(
+                        Problem(
+                            path,
+                            line,
+                            NOTE,
+                            "overridden-key",
+                            f"{key} overrides the value from {defined[key][0]}:{defined[key][1]}",
+                        )
+                    )
+                defined[key] = (path, line)
+
+    problems.sort(key=lambda problem: (problem.path, problem.line))
+    return CheckReport(
+        files=len(paths),
+        cached=sum(cached for _, cached in results.values()),
+        problems=problems,
+    )
@@ -0,0 +1,1418 @@
+import os
+import subprocess
+import sys
+import time
+from io import TextIOWrapper
+from pathlib import Path
+from textwrap import dedent, indent
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+)
+
+# `rich_click`, `auto_click_auto` and `importlib.metadata` are imported lazily
+# so that the plain "set env and run" path stays cheap to start
+import click
+from click import Context, Option, Parameter
+
+from execenv import __version__
+from execenv.api import (
+    Environment,
+    append_to_env,
+    command_line,
+    convert_env_varref,
+    expand_args,
+    popen,
+)
+from execenv.artifact import Artifact, ArtifactError, Recipe, read_artifact
+from execenv.cache import EnvCache
+from execenv.completion import (
+    disable_completion,
+    enable_completion,
+    update_key_index,
+)
+from execenv.config import DEFAULT_CONFIG
+from execenv.files import expand_env_paths, load_env_files
+from execenv.interpolate import InterpolationError
+from execenv.output import Tee, has_fileno
+from execenv.profile import Profiler, mark_imported
+from execenv.source import SourceError
+from execenv.usage import ResourceUsage, children_usage, children_usage_since, wait
+from execenv.utils import LazyRichCommand, add_flags_callback, add_help_callback
+from execenv.verbose import VerboseInfo
+
+if TYPE_CHECKING:
+    from execenv.batch import BatchCommand
+
+mark_imported()
+
+
+def is_test_mode():
+    return bool(os.getenv("EXECENV_TEST", ""))
+
+
+def _no_traceback_excepthook(
+    exctype: Type[BaseException],
+    value: BaseException,
+    traceback: Optional[TracebackType],
+    /,
+):
+    pass
+
+
+def package_summary() -> str:
+    from importlib.metadata import metadata
+
+    return metadata(__package__)["Summary"]
+
+
+def completion_callback(
+    ctx: Context,
+    param: Union[Option, Parameter] = None,  # type: ignore
+    value: Any = None,  # type: ignore
+):
+    if not is_test_mode():
+        enable_completion(cast(str, ctx.command.name))
+
+
+def get_env_cache(ctx: Context) -> EnvCache:
+    """
+    Get the persistent cache of parsed .env files shared by callbacks of current invocation.
+    """
+    if "execenv.env_cache" not in ctx.meta:
+        ctx.meta["execenv.env_cache"] = EnvCache.from_environ(__version__)
+    return ctx.meta["execenv.env_cache"]
+
+
+def get_profiler(ctx: Context) -> Profiler:
+    """
+    Get the timings of phases of current invocation, shown with `--profile`.
+    """
+    if "execenv.profiler" not in ctx.meta:
+        ctx.meta["execenv.profiler"] = Profiler()
+    return ctx.meta["execenv.profiler"]
+
+
+def load_config(ctx: Context, path: Path) -> Dict[str, str]:
+    """
+    Load config file on top of the default config, creating the file with default config if it does not exist.
+    """
+    config = DEFAULT_CONFIG.copy()
+
+    # Load config file
+    with get_profiler(ctx).phase("config"):
+        if path.exists():
+            try:
+                with open(path) as f:
+                    config.update(get_env_cache(ctx).load(f))
+            except Exception as e:
+                click.secho(f"Warning: Failed to load .execenv.env ({e})", fg="yellow")
+                pass
+        else:
+            path.write_text("\n".join(f"{k}={v}" for k, v in config.items()))
+
+    return config
+
+
+def config_callback(ctx: Context, param: Union[Option, Parameter], value: Path):
+    # Kept for "--watch"
+    ctx.meta["execenv.config_path"] = value
+    ctx.default_map = load_config(ctx, value)
+
+
+def cwd_callback(ctx: Context, param: Union[Option, Parameter], value: str):
+    return os.path.abspath(value) if value else None
+
+
+def env_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[Tuple[str, str]]
+):
+    env = {}
+    for value in values:
+        var_name, var_val = value
+        env[var_name] = var_val
+    return env
+
+
+def append_env_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[Tuple[str, str]]
+):
+    env: Dict[str, str] = {}
+    for value in values:
+        var_name, var_val = value
+        append_to_env(
+            env, var_name, var_val, cast(str, ctx.params.get("append_separator"))
+        )
+    return env
+
+
+def env_file_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[str, ...]
+) -> List[Tuple[str, Dict[str, str]]]:
+    if not values:
+        return []
+
+    env_cache = get_env_cache(ctx)
+
+    # Each file is a layer of its own, named after the file,
+    # so that references in it resolve to files before it
+    with get_profiler(ctx).phase("parse_env_files"):
+        try:
+            names = [
+                name for value in values for name in expand_env_paths(os.fspath(value))
+            ]
+        except ValueError as e:
+            raise click.BadParameter(str(e))
+
+        # Files are loaded together, stdin in its place afterwards
+        paths = [name for name in names if name != "-"]
+        misses = env_cache.misses
+        try:
+            loaded = dict(zip(paths, load_env_files(paths, env_cache)))
+            if "-" in names:
+                loaded["-"] = env_cache.load(click.get_text_stream("stdin"))
+        except OSError as e:
+            raise click.BadParameter(f"Failed to open {e.filename} ({e.strerror})")
+        except Exception:
+            raise click.BadParameter(".env file must be valid")
+
+        # For static completion scripts, see `execenv-completion`.
+        # Keys of files only change if some file was parsed again instead of loaded from cache
+        if env_cache.enabled and paths and env_cache.misses > misses:
+            update_key_index(
+                {os.path.abspath(path): loaded[path].keys() for path in paths}
+            )
+
+    return [("<stdin>" if name == "-" else name, loaded[name]) for name in names]
+
+
+def artifact_callback(
+    ctx: Context, param: Union[Option, Parameter], value: Optional[str]
+) -> Optional[Artifact]:
+    if value is None:
+        return None
+
+    with get_profiler(ctx).phase("load_artifact"):
+        try:
+            artifact = read_artifact(value)
+        except ArtifactError as e:
+            raise click.BadParameter(str(e))
+
+    if artifact.stale is not None:
+        click.secho(
+            f"Warning: {value} is stale ({artifact.stale}), building environment from its inputs instead",
+            fg="yellow",
+            err=True,
+        )
+    return artifact
+
+
+def source_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[str, ...]
+) -> List[Tuple[str, List[str]]]:
+    """
+    Split each value into path of the script to source and its arguments.
+    """
+    if not values:
+        return []
+
+    import shlex
+
+    scripts = []
+    for value in values:
+        script, *args = shlex.split(value) or [""]
+        if not os.path.isfile(script):
+            raise click.BadParameter(f"Script {script!r} does not exist")
+        scripts.append((script, args))
+    return scripts
+
+
+def pipe_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[str, ...]
+) -> List[List[str]]:
+    """
+    Split each stage of a pipeline into its arguments.
+    """
+    if not values:
+        return []
+
+    import shlex
+
+    stages = []
+    for value in values:
+        args = shlex.split(value)
+        if not args:
+            raise click.BadParameter("Stage of pipeline can not be empty")
+        stages.append(args)
+    return stages
+
+
+def matrix_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[str, ...]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Load each .env file given directly or matched by a glob pattern as a variant, named after its path.
+    """
+    variants: Dict[str, Dict[str, str]] = {}
+    if not values:
+        return variants
+
+    import glob
+
+    env_cache = get_env_cache(ctx)
+    with get_profiler(ctx).phase("parse_matrix"):
+        for value in values:
+            paths = sorted(glob.glob(value)) if glob.has_magic(value) else [value]
+            if not paths:
+                raise click.BadParameter(f"No .env file matches {value}")
+
+            for path in paths:
+                if path in variants:
+                    continue
+                try:
+                    with open(path) as f:
+                        variants[path] = env_cache.load(f)
+                except OSError as e:
+                    raise click.BadParameter(f"Failed to open {path} ({e.strerror})")
+                except Exception:
+                    raise click.BadParameter(".env file must be valid")
+
+    return variants
+
+
+def show_profile(profiler: Profiler, profile: bool, profile_trace: Optional[Path]):
+    """
+    Show the summary of timings on stderr if `profile`, and write them to `profile_trace` if given.
+    """
+    if profile:
+        click.echo(f"{__package__} profile:", err=True)
+        click.echo(profiler.summary(), err=True)
+    if profile_trace:
+        try:
+            profiler.write_trace(profile_trace)
+        except OSError as e:
+            click.secho(
+                f"Warning: Failed to write profile trace ({e.strerror})",
+                fg="yellow",
+                err=True,
+            )
+
+
+def show_usage(
+    usage: ResourceUsage,
+    command: List[str],
+    returncode: int,
+    time_: bool,
+    time_file: Optional[Path],
+):
+    """
+    Show resources used by the command on stderr if `time_`, and append them to `time_file` as a JSON line if given.
+    """
+    if time_:
+        click.echo(f"{__package__} time:", err=True)
+        click.echo(usage.summary(), err=True)
+    if time_file:
+        import json
+
+        record = {"command": command, "exit_code": returncode, **usage.to_dict()}
+        try:
+            with open(time_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            click.secho(
+                f"Warning: Failed to write resource usage ({e.strerror})",
+                fg="yellow",
+                err=True,
+            )
+
+
+def variant_callback(
+    ctx: Context, param: Union[Option, Parameter], values: Tuple[str, ...]
+) -> Dict[str, Dict[str, str]]:
+    """
+    Parse each variant given as `KEY=VAL` pairs separated by spaces, named after the value itself.
+    """
+    variants: Dict[str, Dict[str, str]] = {}
+    if not values:
+        return variants
+
+    import shlex
+
+    for value in values:
+        variant = {}
+        for pair in shlex.split(value):
+            key, sep, val = pair.partition("=")
+            if not sep or not key:
+                raise click.BadParameter(
+                    f'Variant should be "KEY=VAL" pairs separated by spaces, got "{pair}"'
+                )
+            variant[key] = val
+        variants[value] = variant
+    return variants
+
+
+def exec_command(
+    command: Union[str, Tuple[str, ...]],
+    env: Dict[str, str],
+    cwd: Optional[str],
+    shell: bool,
+):
+    """
+    Replace current process with the command. Never returns.
+
+    Exits with 127 if the command is not found, or 126 if it can not be executed, like POSIX shells do.
+    """
+    if shell:
+        # Same shell as `subprocess` uses with `shell=True`
+        args = ["/bin/sh", "-c", cast(str, command)]
+    else:
+        args = list(command)
+
+    # Output not flushed yet would be lost
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+    try:
+        if cwd:
+            os.chdir(cwd)
+        os.execvpe(args[0], args, env)
+    except OSError as e:
+        click.secho(
+            f"Error: Failed to execute {args[0]} ({e.strerror})", fg="red", err=True
+        )
+        exit(127 if isinstance(e, FileNotFoundError) else 126)
+
+
+@add_help_callback(completion_callback)
+@add_flags_callback("--version", callback=completion_callback)
+@click.command(cls=LazyRichCommand, help_factory=package_summary, no_args_is_help=True)  # type: ignore
+@click.argument("command", type=str, nargs=-1)
+@click.option(
+    "--config",
+    type=click.Path(dir_okay=False, path_type=Path),  # type: ignore
+    default=Path.home() / ".execenv.env",
+    callback=config_callback,
+    is_eager=True,
+    expose_value=False,
+    help='.env config file for execenv. "~/.execenv.env" by default.',
+)
+@click.option(
+    "-c",
+    "--clear",
+    is_flag=True,
+    default=False,
+    help="Clear the current environment. False by default.",
+)
+@click.option(
+    "-s",
+    "--shell",
+    is_flag=True,
+    default=False,
+    help="Use shell to run the command. False by default.",
+)
+@click.option(
+    "--shell-strict",
+    is_flag=True,
+    default=False,
+    help='Use "shlex.join" to get better shell compatibility and security. False by default.',
+)
+@click.option(
+    "--pipe",
+    multiple=True,
+    type=str,
+    callback=pipe_callback,
+    help='Pipe output of COMMAND to given command line (split with shell-like syntax, e.g. "grep -v DEBUG"), without a shell. Can be given multiple times to build a pipeline, all stages run with the same environment. Exits with the status of the last stage that failed, as "pipefail" of shells. Not valid with "-s" / "--shell", "--exec", "--batch", "-m" / "--matrix", "--repeat" or "--watch".',
+)
+@click.option(
+    "--exec",
+    "exec_",
+    is_flag=True,
+    default=False,
+    help='Replace execenv with the command via "os.execvpe" instead of running it as a child process, so that no extra process stays alive. Not supported on Windows, where the command is run as a child process. False by default.',
+)
+@click.option(
+    "--server",
+    is_flag=True,
+    default=False,
+    help='Run as a server on a Unix socket ("EXECENV_SOCKET", or "server.sock" in cache directory) until interrupted. Later calls of execenv are run by the server while it is running, skipping startup of Python. Not supported on Windows. False by default.',
+)
+@click.option(
+    "--env-varref-prefix",
+    type=str,
+    help='Prefix for environment variable references. "EXECENV_" by default.',
+)
+@click.option(
+    "--expand",
+    is_flag=True,
+    default=False,
+    help='Expand references to variables in arguments of COMMAND (and of "--pipe" stages or "--batch" commands) in execenv, against the environment the command runs with: "$VAR", "${VAR}", "${VAR:-default}" (default if unset or empty), "${VAR-default}" (default if unset) and those with "--env-varref-prefix". "\\$" is a literal "$". Commands using references then need no "-s" / "--shell". False by default.',
+)
+@click.option(
+    "-e",
+    "--env",
+    multiple=True,
+    type=(str, str),
+    callback=env_callback,
+    help='Set environment variable to given value. Should be in the format of "NAME val".',
+)
+@click.option(
+    "-a",
+    "--append-env",
+    multiple=True,
+    type=(str, str),
+    callback=append_env_callback,
+    help='Append given value to environment variable rather than replacing it. If not present, it will be set. Might be useful for PATH-like variables. Should be in the format of "NAME val".',
+)
+@click.option(
+    "--append-separator",
+    type=str,
+    help='Separator to use when appending to environment variable. Only valid with "-a" / "--append-env". "os.pathsep" by default, which is platform-dependent.',
+)
+@click.option(
+    "-F",
+    "--artifact",
+    type=click.Path(dir_okay=False),
+    callback=artifact_callback,
+    help='Artifact compiled with "--compile" to load the environment from, without parsing anything. Applied after "-c" / "--clear" and before other layers. If any of its inputs changed, or it is of another format version, the environment is built from its inputs instead.',
+)
+@click.option(
+    "--compile",
+    "compile_",
+    type=click.Path(dir_okay=False),
+    help='Compile the environment ("-c" / "--clear", "--source", "-f" / "--file", "-e" / "--env" and "-a" / "--append-env") into an artifact at given path for "-F" / "--artifact", instead of running COMMAND.',
+)
+@click.option(
+    "--source",
+    multiple=True,
+    type=str,
+    callback=source_callback,
+    help='Shell script to source, optionally followed by its arguments (e.g. "setvars.sh intel64"), applying the changes it makes to the environment before ".env" files. The changes are cached, so the script is only run again when it, its arguments or the environment it is sourced in change.',
+)
+@click.option(
+    "-f",
+    "--file",
+    multiple=True,
+    type=click.Path(allow_dash=True),
+    callback=env_file_callback,
+    help='.env file with environment variable pairs ("-" for stdin), or a directory or glob pattern of them. Files in a directory ("*.env") or matched by a pattern are applied in sorted order, each of them as a file given on its own.',
+)
+@click.option(
+    "-m",
+    "--matrix",
+    multiple=True,
+    type=str,
+    callback=matrix_callback,
+    help='.env file, or glob pattern of them, to run the command with as a variant. Each file is a variant of its own, on top of the environment shared by all variants. Variants are run at the same time, see "-j" / "--jobs".',
+)
+@click.option(
+    "--batch",
+    type=click.File("r"),
+    help='Run commands listed in given manifest file ("-" for stdin) instead of COMMAND, all under the same environment. Each line is either a command line or a JSON value (array of arguments, or object with "command" and optional "name"). Empty lines and lines starting with "#" are skipped.',
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    help='Maximum number of commands to run at the same time. Only valid with "--batch" or "-m" / "--matrix". 1 by default.',
+)
+@click.option(
+    "--output",
+    type=click.Choice(["prefix", "grouped"]),
+    default="prefix",
+    help='How to show output of commands. Only valid with "--batch" or "-m" / "--matrix". "prefix" writes each line prefixed with command name as soon as it is read, "grouped" writes all output of a command at once after it exits. "prefix" by default.',
+)
+@click.option(
+    "--fail-fast/--keep-going",
+    default=False,
+    help='Whether to skip pending commands and terminate running ones after the first failure. Only valid with "--batch" or "-m" / "--matrix". "--keep-going" by default.',
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    help='Benchmark the command instead: run it given times with the environment built once, and show min, median, p95, max and standard deviation of wall time. Output of the command is discarded. With "-m" / "--matrix" or "--variant", each variant is benchmarked and compared side by side. Not valid with "--exec", "--batch", "--time" or options of output.',
+)
+@click.option(
+    "--warmup",
+    type=click.IntRange(min=0),
+    default=0,
+    help='Runs before those timed by "--repeat", e.g. to warm up caches. 0 by default.',
+)
+@click.option(
+    "--variant",
+    multiple=True,
+    type=str,
+    callback=variant_callback,
+    help='Variables to benchmark the command with as a variant, in the format of "KEY=VAL KEY2=VAL2", on top of "-e" / "--env". Can be given multiple times to compare variants. Only valid with "--repeat".',
+)
+@click.option(
+    "--interpolate/--no-interpolate",
+    default=False,
+    help='Whether to expand references to other variables in values of .env files, "-e" / "--env" and "-a" / "--append-env", in form of "${VAR}", "${VAR:-default}" (default if unset or empty) or "${VAR-default}" (default if unset). "\\${" is a literal "${". "--no-interpolate" by default, keeping values as they are.',
+)
+@click.option(
+    "--log-file",
+    type=click.File("wb"),
+    help='Also write output of the command to given file. Not valid with "--exec", "--batch" or "-m" / "--matrix".',
+)
+@click.option(
+    "--timestamps",
+    is_flag=True,
+    default=False,
+    help='Prefix each line of output with the time it is read. Not valid with "--exec", "--batch" or "-m" / "--matrix". False by default.',
+)
+@click.option(
+    "--line-prefix",
+    type=str,
+    help='Prefix each line of output with given text. Not valid with "--exec", "--batch" or "-m" / "--matrix".',
+)
+@click.option(
+    "--tail-on-failure",
+    type=click.IntRange(min=0),
+    default=0,
+    help='Show the last given KiB of output again on stderr if the command fails, e.g. to find the error in long CI logs. Not valid with "--exec", "--batch" or "-m" / "--matrix". 0 (disabled) by default.',
+)
+@click.option(
+    "--time",
+    "time_",
+    is_flag=True,
+    default=False,
+    help='Show resources used by the command on stderr when it exits: wall time, user and system CPU time, max RSS, page faults and context switches. With "--batch" or "-m" / "--matrix", totals of all commands (max RSS is the peak of them). Only wall time is available on Windows. Not valid with "--exec". False by default.',
+)
+@click.option(
+    "--time-file",
+    type=click.Path(dir_okay=False, path_type=Path),  # type: ignore
+    help='Append resources used by the command (see "--time") to given file as a line of JSON. Not valid with "--exec".',
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    envvar="EXECENV_PROFILE",
+    help='Show how long each phase of execenv takes on stderr, e.g. imports, loading config, parsing .env files, merging environment, spawning and waiting for the command. Can also be enabled with "EXECENV_PROFILE=1". False by default.',
+)
+@click.option(
+    "--profile-trace",
+    type=click.Path(dir_okay=True, path_type=Path),  # type: ignore
+    envvar="EXECENV_PROFILE_TRACE",
+    help='Write timings of phases to given file in Chrome trace event format. If it is a directory, a file named after PID and time is created in it, so that traces of many invocations can be collected. Can also be set with "EXECENV_PROFILE_TRACE".',
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    default=False,
+    help='Keep running: restart the command whenever a "-f" / "--file" or the config file changes in a way that changes the environment. Not valid with "--exec", "--batch", "-m" / "--matrix", "--repeat" or "--time". False by default.',
+)
+@click.option(
+    "--watch-grace",
+    type=click.FloatRange(min=0),
+    default=5.0,
+    help='Seconds to wait for the command to exit after terminating it on restart, before killing it. Only valid with "--watch". 5 by default.',
+)
+@click.option(
+    "-C",
+    "--cwd",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+    callback=cwd_callback,
+    help="Current working directory.",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Run with verbose mode. Log out necessary info.",
+)
+@click.version_option(
+    None, "--version", "-V", prog_name=__package__, message="%(prog)s v%(version)s"
+)
+@click.help_option("-h", "--help")
+def execenv(
+    command: Tuple[str, ...],
+    env: Dict[str, str],
+    append_env: Dict[str, str],
+    append_separator: str,
+    env_varref_prefix: str,
+    expand: bool,
+    clear: bool,
+    cwd: Optional[str],
+    verbose: Optional[int],
+    artifact: Optional[Artifact],
+    compile_: Optional[str],
+    source: List[Tuple[str, List[str]]],
+    file: List[Tuple[str, Dict[str, str]]],
+    interpolate: bool,
+    shell: bool,
+    shell_strict: bool,
+    pipe: List[List[str]],
+    exec_: bool,
+    server: bool,
+    matrix: Dict[str, Dict[str, str]],
+    batch: Optional[TextIOWrapper],
+    jobs: int,
+    output: str,
+    fail_fast: bool,
+    repeat: Optional[int],
+    warmup: int,
+    variant: Dict[str, Dict[str, str]],
+    log_file: Optional[BinaryIO],
+    timestamps: bool,
+    line_prefix: Optional[str],
+    tail_on_failure: int,
+    time_: bool,
+    time_file: Optional[Path],
+    profile: bool,
+    profile_trace: Optional[Path],
+    watch: bool,
+    watch_grace: float,
+):
+    if not is_test_mode():
+        enable_completion(cast(str, execenv.name))
+
+    if server:
+        if command:
+            raise click.UsageError('COMMAND can not be used with "--server".')
+
+        from execenv.client import get_socket_path
+        from execenv.server import serve
+
+        serve(get_socket_path())
+        return
+
+    if batch is not None:
+        if command:
+            raise click.UsageError('COMMAND can not be used with "--batch".')
+        if exec_:
+            raise click.UsageError('"--exec" can not be used with "--batch".')
+        if matrix:
+            raise click.UsageError('"-m" / "--matrix" can not be used with "--batch".')
+        if compile_ is not None:
+            raise click.UsageError('"--compile" can not be used with "--batch".')
+    elif compile_ is not None:
+        if command:
+            raise click.UsageError('COMMAND can not be used with "--compile".')
+        if artifact is not None:
+            raise click.UsageError(
+                '"-F" / "--artifact" can not be used with "--compile".'
+            )
+        if matrix or watch or repeat is not None:
+            raise click.UsageError(
+                '"--compile" can not be used with "-m" / "--matrix", "--watch" or "--repeat".'
+            )
+        if any(name == "<stdin>" for name, _ in file):
+            raise click.UsageError('"--compile" can not be used with "-f -".')
+    elif not command:
+        raise click.UsageError("Missing argument 'COMMAND...'.")
+    elif matrix and exec_:
+        raise click.UsageError('"--exec" can not be used with "-m" / "--matrix".')
+
+    # Output of the command is piped through execenv for these
+    tee_options = bool(log_file or timestamps or line_prefix or tail_on_failure)
+    if tee_options and (exec_ or batch is not None or matrix):
+        raise click.UsageError(
+            '"--log-file", "--timestamps", "--line-prefix" and "--tail-on-failure" can not be used with "--exec", "--batch" or "-m" / "--matrix".'
+        )
+
+    # The command is waited for to get resources it used
+    timed = time_ or time_file is not None
+    if timed and exec_:
+        raise click.UsageError(
+            '"--time" and "--time-file" can not be used with "--exec".'
+        )
+
+    if repeat is None:
+        if warmup or variant:
+            raise click.UsageError(
+                '"--warmup" and "--variant" are only valid with "--repeat".'
+            )
+    elif exec_ or batch is not None or tee_options or timed:
+        raise click.UsageError(
+            '"--repeat" can not be used with "--exec", "--batch", "--time" or options of output.'
+        )
+    elif variant and matrix:
+        raise click.UsageError('"--variant" can not be used with "-m" / "--matrix".')
+
+    if watch and (exec_ or batch is not None or matrix or repeat is not None or timed):
+        raise click.UsageError(
+            '"--watch" can not be used with "--exec", "--batch", "-m" / "--matrix", "--repeat" or "--time".'
+        )
+
+    if pipe and (
+        shell
+        or exec_
+        or batch is not None
+        or matrix
+        or repeat is not None
+        or watch
+        or compile_ is not None
+    ):
+        raise click.UsageError(
+            '"--pipe" can not be used with "-s" / "--shell", "--exec", "--batch", "-m" / "--matrix", "--repeat", "--watch" or "--compile".'
+        )
+
+    if (
+        batch is None
+        and not pipe
+        and not matrix
+        and not tee_options
+        and not timed
+        and repeat is None
+        and not watch
+    ):
+        # Workers of server replace themselves with the command, so that signals and exit status reach the client as is
+        ctx_obj = click.get_current_context().obj
+        exec_ = exec_ or (isinstance(ctx_obj, dict) and ctx_obj.get("exec", False))
+
+    profiler = get_profiler(click.get_current_context())
+    raw_command = command
+    try:
+
+        def resolve_args(
+            args: Sequence[str], target_env: Mapping[str, str]
+        ) -> List[str]:
+            # Expand env references against the environment to run with, or convert them to platform-dependent format
+            if expand:
+                return expand_args(args, target_env, env_varref_prefix)
+            return [convert_env_varref(env_varref_prefix, arg) for arg in args]
+
+        if not expand:
+            with profiler.phase("convert_env_varref"):
+                command = tuple(resolve_args(command, os.environ))
+
+        # Verbose info
+        verbose_info = VerboseInfo(
+            dict(click.get_current_context().params, command=command, exec_=exec_),
+            verbose,
+        )
+        verbose_info.add(
+            "env_cache", get_env_cache(click.get_current_context()).stats, 2, lazy=True
+        )
+
+        # Construct merged environment
+        def base_environment() -> Environment:
+            environment = Environment(
+                get_env_cache(click.get_current_context()), interpolate
+            )
+            if clear:
+                environment.clear()
+            if artifact is not None:
+                environment.load_compiled(artifact)
+            for script, script_args in source:
+                environment.source(script, script_args)
+            for name, env_from_file in file:
+                environment.update(env_from_file, source=name)
+            return environment
+
+        env_base = base_environment()
+
+        def with_shared_layers(
+            environment: Environment,
+            extra: Optional[Tuple[str, Dict[str, str]]] = None,
+        ) -> Environment:
+            environment.update(env, source="-e")
+            if extra is not None:
+                environment.update(extra[1], source=extra[0])
+            for key, value in append_env.items():
+                environment.append(key, value, append_separator, source="-a")
+            return environment
+
+        with profiler.phase("merge_env"):
+            if matrix or variant:
+                # Merged once, so that variants only apply their own layers on top of it
+                env_base.build()
+
+            env_builder = with_shared_layers(env_base.copy())
+            env_merged = env_builder.build()
+        if expand:
+            with profiler.phase("expand_args"):
+                command = tuple(resolve_args(raw_command, env_merged))
+        verbose_info.add("env_merged", env_merged, 2)
+        verbose_info.add("env_sources", env_builder.sources, 2, lazy=True)
+
+        if compile_ is not None:
+            from execenv.artifact import write_artifact
+
+            verbose_info.show()
+            recipe = Recipe(
+                clear=clear,
+                sources=[
+                    (os.path.abspath(script), script_args)
+                    for script, script_args in source
+                ],
+                files=[os.path.abspath(name) for name, _ in file],
+                env=env,
+                append=[
+                    (key, value, append_separator) for key, value in append_env.items()
+                ],
+            )
+            with profiler.phase("compile"):
+                try:
+                    write_artifact(compile_, recipe, env_builder.compile())
+                except OSError as e:
+                    raise click.ClickException(
+                        f"Failed to write {compile_} ({e.strerror})"
+                    )
+            return
+
+        if batch is not None:
+            from execenv.batch import read_manifest, run_batch
+
+            commands = read_manifest(batch)
+            for batch_command in commands:
+                batch_command.args = resolve_args(batch_command.args, env_merged)
+            verbose_info.add("batch_commands", commands, 1)
+            verbose_info.show()
+
+            snapshot = children_usage() if timed else None
+            with profiler.phase("run"):
+                returncode = run_batch(
+                    commands,
+                    env_merged,
+                    cwd,
+                    shell,
+                    shell_strict,
+                    jobs,
+                    output,
+                    fail_fast,
+                )
+            if snapshot is not None:
+                show_usage(
+                    children_usage_since(snapshot),
+                    [batch.name],
+                    returncode,
+                    time_,
+                    time_file,
+                )
+            exit(returncode)
+
+        def matrix_variants() -> List["BatchCommand"]:
+            # Each variant is laid on top of the shared .env files, below `-e` and `-a`
+            from execenv.batch import BatchCommand
+
+            variants = []
+            with profiler.phase("merge_matrix"):
+                for name, variant_env in matrix.items():
+                    built = with_shared_layers(
+                        env_base.copy().update(variant_env, source=name)
+                    ).build()
+                    variants.append(
+                        BatchCommand(
+                            name=name, args=resolve_args(raw_command, built), env=built
+                        )
+                    )
+            return variants
+
+        if repeat is not None:
+            from execenv.batch import BatchCommand
+            from execenv.repeat import run_repeated
+
+            if matrix:
+                variants = matrix_variants()
+            elif variant:
+                # Each variant is laid on top of `-e`, below `-a`
+                variants = []
+                with profiler.phase("merge_matrix"):
+                    for name, variant_env in variant.items():
+                        built = with_shared_layers(
+                            env_base.copy(), (name, variant_env)
+                        ).build()
+                        variants.append(
+                            BatchCommand(
+                                name=name,
+                                args=resolve_args(raw_command, built),
+                                env=built,
+                            )
+                        )
+            else:
+                variants = [
+                    BatchCommand(name=command_line(command, True), args=list(command))
+                ]
+            verbose_info.add("repeat_variants", [v.name for v in variants], 1)
+            verbose_info.show()
+
+            with profiler.phase("run"):
+                returncode = run_repeated(
+                    variants, env_merged, cwd, shell, shell_strict, repeat, warmup
+                )
+            exit(returncode)
+
+        if matrix:
+            from execenv.batch import run_batch
+
+            variants = matrix_variants()
+            verbose_info.add("matrix_variants", list(matrix), 1)
+            verbose_info.show()
+
+            snapshot = children_usage() if timed else None
+            with profiler.phase("run"):
+                returncode = run_batch(
+                    variants,
+                    env_merged,
+                    cwd,
+                    shell,
+                    shell_strict,
+                    jobs,
+                    output,
+                    fail_fast,
+                )
+            if snapshot is not None:
+                show_usage(
+                    children_usage_since(snapshot),
+                    list(command),
+                    returncode,
+                    time_,
+                    time_file,
+                )
+            exit(returncode)
+
+        # Actual command running
+        command_str = command_line(command, shell_strict)
+        verbose_info.add("actual_command", command_str, 1)
+        if pipe:
+            stages = [
+                list(command),
+                *(resolve_args(stage, env_merged) for stage in pipe),
+            ]
+            verbose_info.add("pipeline", stages, 1)
+
+        verbose_info.show()
+
+        if exec_ and sys.platform != "win32":
+            # Nothing runs after the command replaces execenv
+            show_profile(profiler, profile, profile_trace)
+            profile, profile_trace = False, None
+            exec_command(command_str if shell else command, env_merged, cwd, shell)
+
+        # Output is streamed through execenv if asked to, or if stdout and stderr can not be inherited,
+        # e.g. when replaced by tests
+        tee = None
+        if tee_options or not all(
+            has_fileno(click.get_binary_stream(name)) for name in ("stdout", "stderr")
+        ):
+            tee = Tee(log_file, timestamps, line_prefix, tail_on_failure * 1024)
+
+        if pipe:
+            from execenv.pipeline import start_pipeline, wait_pipeline
+
+            snapshot = children_usage() if timed else None
+            with profiler.phase("spawn"):
+                try:
+                    processes = start_pipeline(
+                        stages, env_merged, cwd, capture=tee is not None
+                    )
+                except OSError as e:
+                    click.secho(
+                        f"Error: Failed to execute {e.filename} ({e.strerror})",
+                        fg="red",
+                        err=True,
+                    )
+                    exit(127 if isinstance(e, FileNotFoundError) else 126)
+            with profiler.phase("wait"):
+                returncode, _ = wait_pipeline(processes, tee)
+
+            if tee is not None and returncode != 0 and tee.tail():
+                click.secho(
+                    f"\nLast {tail_on_failure} KiB of output (exit {returncode}):",
+                    fg="red",
+                    err=True,
+                )
+                stderr = click.get_binary_stream("stderr")
+                stderr.write(tee.tail())
+                stderr.flush()
+
+            if snapshot is not None:
+                show_usage(
+                    children_usage_since(snapshot),
+                    list(command),
+                    returncode,
+                    time_,
+                    time_file,
+                )
+            exit(returncode)
+
+        if watch:
+            from click.core import ParameterSource  # type: ignore
+
+            from execenv.watch import run_watched
+
+            ctx = click.get_current_context()
+            config_path: Path = ctx.meta["execenv.config_path"]
+
+            # Only files given by path can be watched, not e.g. stdin
+            watched = [name for name, _ in file if os.path.isfile(name)]
+            if artifact is not None:
+                watched.append(artifact.path)
+            if config_path.is_file():
+                watched.append(str(config_path))
+
+            def start() -> subprocess.Popen:
+                return popen(
+                    command_str if shell else command,
+                    env_merged,
+                    cwd=cwd,
+                    shell=shell,
+                    stdout=subprocess.PIPE if tee else None,
+                    stderr=subprocess.PIPE if tee else None,
+                )
+
+            def reload(changed: Set[str]) -> bool:
+                nonlocal command, command_str, env_merged
+                nonlocal env_varref_prefix, append_separator, artifact
+                try:
+                    if artifact is not None and artifact.path in changed:
+                        artifact = read_artifact(artifact.path)
+
+                    # Only changed files are parsed again
+                    for index, (name, _) in enumerate(file):
+                        if name in changed:
+                            with open(name) as f:
+                                file[index] = (name, get_env_cache(ctx).load(f))
+
+                    # Settings given explicitly are not overridden by config
+                    if str(config_path) in changed:
+                        config = load_config(ctx, config_path)
+                        if (
+                            ctx.get_parameter_source("env_varref_prefix")  # type: ignore
+                            is ParameterSource.DEFAULT_MAP
+                        ):
+                            env_varref_prefix = config["env_varref_prefix"]
+                        if (
+                            ctx.get_parameter_source("append_separator")  # type: ignore
+                            is ParameterSource.DEFAULT_MAP
+                        ):
+                            append_separator = config["append_separator"]
+
+                    reloaded_env = with_shared_layers(base_environment()).build()
+                    reloaded_command = tuple(resolve_args(raw_command, reloaded_env))
+                except Exception as e:
+                    click.secho(
+                        f"Error: Failed to reload ({e}), the command is kept running",
+                        fg="red",
+                        err=True,
+                    )
+                    return False
+
+                # Touched, or changed without effect on the environment
+                if reloaded_env == env_merged and reloaded_command == command:
+                    return False
+
+                command, env_merged = reloaded_command, reloaded_env
+                command_str = command_line(command, shell_strict)
+                return True
+
+            with profiler.phase("run"):
+                run_watched(start, reload, watched, watch_grace, tee)
+            return
+
+        started = time.perf_counter()
+        with profiler.phase("spawn"):
+            process = popen(
+                command_str if shell else command,
+                env_merged,
+                cwd=cwd,
+                shell=shell,
+                stdout=subprocess.PIPE if tee else None,
+                stderr=subprocess.PIPE if tee else None,
+            )
+        with process, profiler.phase("wait"):
+            try:
+                if tee is not None:
+                    tee.stream(process.stdout, process.stderr)
+                usage = wait(process, started) if timed else None
+                process.wait()
+            except BaseException:
+                # The same as `subprocess.run` does, e.g. on Ctrl-C
+                process.kill()
+                raise
+
+        if tee is not None and process.returncode != 0 and tee.tail():
+            click.secho(
+                f"\nLast {tail_on_failure} KiB of output (exit {process.returncode}):",
+                fg="red",
+                err=True,
+            )
+            stderr = click.get_binary_stream("stderr")
+            stderr.write(tee.tail())
+            stderr.flush()
+
+        if usage is not None:
+            show_usage(usage, list(command), process.returncode, time_, time_file)
+
+        exit(process.returncode)
+
+    except (InterpolationError, SourceError, ArtifactError) as e:
+        raise click.ClickException(str(e))
+
+    except KeyboardInterrupt:
+        # Prevent default traceback
+        if sys.excepthook is sys.__excepthook__:
+            sys.excepthook = _no_traceback_excepthook
+        raise
+
+    finally:
+        show_profile(profiler, profile, profile_trace)
+
+
+def clink_completion(command: click.Command, completions_path: Path):
+    flags: List[str] = []
+    descriptions: List[str] = []
+
+    for param in command.params:
+        if not isinstance(param, Option):
+            continue
+
+        opts = tuple(map(lambda opt: f"'{opt}'", param.opts))
+        flags += opts
+        if param.help:
+            for opt in opts:
+                descriptions.append(f"[{opt}] = '{param.help}'")
+
+    flags_str = ", ".join(flags)
+    description_str = ",\n".join(descriptions)
+    description_str_indented = indent(
+        description_str,
+        " " * 12,
+        lambda line: not description_str.startswith(line),
+    )
+
+    script = dedent(f"""\
+        local matcher = clink.argmatcher('{command.name}')
+        matcher:addflags({flags_str})
+
+        local function adddescriptions_helper(matcher, ...)
+            if matcher and matcher.adddescriptions then
+                matcher:adddescriptions(...)
+            end
+        end
+
+        adddescriptions_helper(matcher, {{
+            {description_str_indented}
+        }})
+    """)
+
+    save_completion_script(completions_path / f"{command.name}.lua", script)
+
+
+def save_completion_script(file_path: Path, script: str):
+    if file_path.exists():
+        click.confirm(
+            f"File {file_path.name} already exists. Overwrite?",
+            abort=True,
+            default=False,
+            prompt_suffix=" ",
+        )
+        click.echo()
+
+    with open(file_path, "w") as f:
+        f.write(script)
+
+    click.echo(
+        f"Completion script saved to {click.style(str(file_path), fg='yellow', bold=True)}."
+    )
+
+
+@add_help_callback(completion_callback)
+@add_flags_callback("--version", callback=completion_callback)
+@click.command(
+    cls=LazyRichCommand,
+    help="Command to manually setup tab completion for execenv.",
+    no_args_is_help=True,
+)
+@click.option(
+    "-s",
+    "--shell",
+    type=click.Choice(["clink", "bash", "zsh", "fish"]),
+    help="Shell to generate tab completion scripts for. Scripts for Bash, Zsh and Fish are static, so that no Python process is started on TAB, unlike click built-in completion.",
+)
+@click.option(
+    "--install",
+    is_flag=True,
+    default=False,
+    help="Setup click built-in tab completion (Bash, Zsh & Fish) again, even if it has already been done.",
+)
+@click.option(
+    "-p",
+    "--path",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),  # type: ignore
+    default=Path.cwd(),
+    help="Path where the completion script will be saved. Current directory by default.",
+)
+@click.version_option(
+    None, "--version", "-V", prog_name=__package__, message="%(prog)s v%(version)s"
+)
+@click.help_option("-h", "--help")
+def execenv_completion(shell: Optional[str], install: bool, path: Path):
+    if install:
+        for command in (execenv, execenv_echo, execenv_completion, execenv_check):
+            enable_completion(cast(str, command.name), force=True, verbose=True)
+        if shell is None:
+            return
+    elif not is_test_mode() and shell not in ("bash", "zsh", "fish"):
+        enable_completion(cast(str, execenv_completion.name))
+
+    if shell is None:
+        raise click.UsageError('Either "-s" / "--shell" or "--install" is required.')
+
+    completions_path = path / "completions"
+    if not completions_path.exists():
+        click.confirm(
+            f"Directory does not exist.\nWill create at {click.style(str(completions_path), fg='yellow', bold=True)}.\nContinue?",
+            default=True,
+            abort=True,
+            prompt_suffix=" ",
+        )
+        click.echo()
+        completions_path.mkdir()
+
+    if shell == "clink":
+        clink_completion(execenv, completions_path)
+        clink_completion(execenv_echo, completions_path)
+        clink_completion(execenv_completion, completions_path)
+        clink_completion(execenv_check, completions_path)
+
+        click.echo("\nRun following to install auto-completion:")
+        click.secho(f'\nclink installscripts "{path}"\n', fg="yellow", bold=True)
+        click.echo("Restart your shell to load the completion script.")
+    elif shell in ("bash", "zsh", "fish"):
+        from execenv.shell_completion import SHELL_COMPLETIONS
+
+        generate, file_name = SHELL_COMPLETIONS[shell]
+        for command in (execenv, execenv_echo, execenv_completion, execenv_check):
+            save_completion_script(
+                completions_path / file_name.format(name=command.name),
+                generate(command),
+            )
+            # Click built-in completion would override the static scripts
+            disable_completion(cast(str, command.name))
+
+        if shell == "bash":
+            setup = "".join(
+                f'source "{completions_path / name}"\n'
+                for name in (
+                    "execenv",
+                    "execenv-echo",
+                    "execenv-completion",
+                    "execenv-check",
+                )
+            )
+            where = "~/.bashrc"
+        elif shell == "zsh":
+            setup = f'fpath=("{completions_path}" $fpath)\n'
+            where = '~/.zshrc, before "compinit"'
+        else:
+            setup = f'set -p fish_complete_path "{completions_path}"\n'
+            where = "~/.config/fish/config.fish"
+
+        click.echo(f"\nAdd following to {where} to install auto-completion:")
+        click.secho(f"\n{setup}", fg="yellow", bold=True)
+        click.echo(
+            'Remove lines added by click built-in completion ("_EXECENV_COMPLETE") if any, and restart your shell. They will not be added again, unless "--install" is used.'
+        )
+    else:
+        raise click.BadParameter("Shell is not supported.")
+
+
+@add_help_callback(completion_callback)
+@add_flags_callback("--version", callback=completion_callback)
+@click.command(
+    cls=LazyRichCommand,
+    help="Test command to show value of given environment variables.",
+    no_args_is_help=True,
+)
+@click.argument("env", type=str, nargs=-1, required=True)
+@click.version_option(
+    None, "--version", "-V", prog_name=__package__, message="%(prog)s v%(version)s"
+)
+@click.help_option("-h", "--help")
+def execenv_echo(env: Tuple[str, ...]):
+    if not is_test_mode():
+        enable_completion(cast(str, execenv_echo.name))
+
+    for e in env:
+        click.echo(f"{e}=" + os.getenv(e, click.style("NOT FOUND", fg="red")))
+
+
+@add_help_callback(completion_callback)
+@add_flags_callback("--version", callback=completion_callback)
+@click.command(
+    cls=LazyRichCommand,
+    help="Check .env files for lines that are not parsed, quoting problems, duplicate keys and keys overridden by later files. Directories are scanned recursively for .env files (`.env`, `.env.*` and `*.env`).",
+    no_args_is_help=True,
+)
+@click.argument("paths", type=click.Path(exists=True), nargs=-1, required=True)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of processes checking files in parallel. Number of CPUs by default.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    help="Format of the report. `json` prints one object with counts and all problems.",
+)
+@click.option(
+    "--strict",
+    is_flag=True,
+    default=False,
+    help="Exit with code 1 on warnings too, not only on errors.",
+)
+@click.version_option(
+    None, "--version", "-V", prog_name=__package__, message="%(prog)s v%(version)s"
+)
+@click.help_option("-h", "--help")
+def execenv_check(
+    paths: Tuple[str, ...], jobs: Optional[int], output_format: str, strict: bool
+):
+    from execenv.check import ERROR, WARNING, check_env_files, find_env_files
+
+    if not is_test_mode():
+        enable_completion(cast(str, execenv_check.name))
+
+    try:
+        stacks = find_env_files(os.fspath(path) for path in paths)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'PATHS...'")
+
+    cache = EnvCache.from_environ(__version__)
+    report = check_env_files(
+        stacks,
+        jobs=jobs,
+        cache_dir=cache.directory.parent / "check" if cache.enabled else None,
+        max_cache_size=cache.max_size,
+        version=__version__,
+    )
+
+    if output_format == "json":
+        import json
+
+        click.echo(json.dumps(report.to_dict(), indent=2))
+    else:
+        colors = {ERROR: "red", WARNING: "yellow"}
+        for problem in report.problems:
+            click.secho(str(problem), fg=colors.get(problem.severity))
+        click.secho(
+            f"{report.files} file(s) checked, {report.count(ERROR)} error(s), {report.count(WARNING)} warning(s)",
+            err=True,
+        )
+
+    if report.count(ERROR) or (strict and report.count(WARNING)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    execenv()
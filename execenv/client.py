@@ -0,0 +1,218 @@
+# Thin client of `execenv --server`, used as the entry point of `execenv`.
+# Only the standard library is imported here, so that a call served by a running server
+# skips importing `click` and everything else the CLI needs.
+
+import os
+import signal
+import socket
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, List, NoReturn, Optional, Tuple
+
+# Marks the start of importing for `--profile`
+import execenv.profile  # noqa: F401
+from execenv import __version__
+from execenv.cache import get_cache_dir
+
+# Length of a request, followed by the request itself
+LENGTH = struct.Struct("<I")
+
+# Signal relayed by client
+SIGNAL = struct.Struct("<i")
+
+# Kind and value of the final status sent by server
+STATUS = struct.Struct("<ii")
+STATUS_EXITED = 0
+STATUS_SIGNALED = 1
+STATUS_FALLBACK = 2
+
+# Resource limits passed to the server, to be applied to the command as in a local run
+RLIMITS = (
+    "RLIMIT_AS",
+    "RLIMIT_CORE",
+    "RLIMIT_CPU",
+    "RLIMIT_DATA",
+    "RLIMIT_FSIZE",
+    "RLIMIT_MEMLOCK",
+    "RLIMIT_NOFILE",
+    "RLIMIT_NPROC",
+    "RLIMIT_STACK",
+)
+
+# Signals relayed to the command, others keep their default behavior
+RELAYED_SIGNALS = (
+    "SIGINT",
+    "SIGTERM",
+    "SIGHUP",
+    "SIGQUIT",
+    "SIGUSR1",
+    "SIGUSR2",
+    "SIGWINCH",
+)
+
+
+def get_socket_path() -> Path:
+    """
+    Get the path of Unix socket the server listens on. `EXECENV_SOCKET` takes precedence over `<cache dir>/server.sock`.
+    """
+    path = os.getenv("EXECENV_SOCKET")
+    return Path(path) if path else get_cache_dir() / "server.sock"
+
+
+def get_process_limits() -> Tuple[int, Dict[str, Tuple[int, int]]]:
+    """
+    Get the umask and resource limits (soft and hard, by name) of the current process,
+    which a command run by the server should have as well.
+    """
+    import resource
+
+    umask = os.umask(0)
+    os.umask(umask)
+    limits = {
+        name: resource.getrlimit(getattr(resource, name))
+        for name in RLIMITS
+        if hasattr(resource, name)
+    }
+    return umask, limits
+
+
+def encode_request(
+    argv: List[str],
+    cwd: str,
+    env: Dict[str, str],
+    umask: int,
+    limits: Dict[str, Tuple[int, int]],
+) -> bytes:
+    """
+    Encode a request as null-separated fields: version, working directory, umask, resource limits
+    (space-separated `NAME:soft:hard`), number of arguments, arguments and `KEY=value` pairs of environment.
+    """
+    fields = [
+        __version__,
+        cwd,
+        str(umask),
+        " ".join(f"{name}:{soft}:{hard}" for name, (soft, hard) in limits.items()),
+        str(len(argv)),
+        *argv,
+    ]
+    fields.extend(f"{key}={value}" for key, value in env.items())
+    return b"\0".join(map(os.fsencode, fields))
+
+
+def decode_request(
+    data: bytes,
+) -> Tuple[str, str, int, Dict[str, Tuple[int, int]], List[str], Dict[str, str]]:
+    """
+    Decode a request encoded by `encode_request`.
+
+    Returns:
+        Tuple[str, str, int, Dict[str, Tuple[int, int]], List[str], Dict[str, str]]: Version, working directory,
+            umask, resource limits, arguments and environment.
+
+    Raises:
+        ValueError: If the request is malformed.
+    """
+    fields = list(map(os.fsdecode, data.split(b"\0")))
+    version, cwd, umask, limit_field, argc = fields[:5]
+    limits = {}
+    for limit in limit_field.split():
+        name, soft, hard = limit.split(":")
+        limits[name] = (int(soft), int(hard))
+    argv = fields[5 : 5 + int(argc)]
+    env = dict(field.split("=", 1) for field in fields[5 + int(argc) :] if "=" in field)
+    return version, cwd, int(umask), limits, argv, env
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> Optional[bytes]:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def run_on_server(argv: List[str]) -> Optional[int]:
+    """
+    Let a running server run `execenv` with given arguments, passing stdin, stdout and stderr over the socket.
+
+    Signals received meanwhile are relayed to the command. If the command is killed by a signal,
+    the same signal is raised here so that the caller sees it as well.
+
+    Returns:
+        Optional[int]: Exit code of the command, or `None` if no server can take the request.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(os.fsencode(get_socket_path()))
+        request = encode_request(
+            argv, os.getcwd(), dict(os.environ), *get_process_limits()
+        )
+
+        # File descriptors are sent along with the first bytes
+        fds = array("i", [0, 1, 2])
+        sock.sendmsg(
+            [LENGTH.pack(len(request))],
+            [(socket.SOL_SOCKET, socket.SCM_RIGHTS, fds)],  # type: ignore
+        )
+        sock.sendall(request)
+    except OSError:
+        sock.close()
+        return None
+
+    def relay(signum: int, frame):
+        try:
+            sock.sendall(SIGNAL.pack(signum))
+        except OSError:
+            pass
+
+    for name in RELAYED_SIGNALS:
+        signal.signal(getattr(signal, name), relay)
+
+    try:
+        status = _recv_exactly(sock, STATUS.size)
+    except OSError:
+        status = None
+    finally:
+        sock.close()
+        for name in RELAYED_SIGNALS:
+            signal.signal(getattr(signal, name), signal.SIG_DFL)
+
+    if status is None:
+        sys.stderr.write("Error: Lost connection to execenv server\n")
+        return 1
+
+    kind, value = STATUS.unpack(status)
+    if kind == STATUS_FALLBACK:
+        return None
+    if kind == STATUS_SIGNALED:
+        os.kill(os.getpid(), value)
+        return 128 + value
+    return value
+
+
+def main() -> NoReturn:
+    """
+    Entry point of `execenv`, running on a server if one is available, or locally otherwise.
+
+    Set `EXECENV_NO_SERVER` to always run locally. Interactive calls (stdin being a terminal) are run locally
+    as well, as commands run by the server have no controlling terminal, e.g. for password prompts or job control.
+    """
+    argv = sys.argv[1:]
+    if (
+        sys.platform != "win32"
+        and not os.getenv("EXECENV_NO_SERVER", "")
+        and "--server" not in argv
+        and not os.isatty(0)
+    ):
+        code = run_on_server(argv)
+        if code is not None:
+            sys.exit(code)
+
+    from execenv.cli import execenv
+
+    execenv()
+    sys.exit(0)
@@ -0,0 +1,152 @@
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from execenv.cache import get_cache_dir
+
+# Shells supported by `auto_click_auto`
+SUPPORTED_SHELLS = ("bash", "zsh", "fish")
+
+# Number of .env files whose keys are kept for static completion scripts
+KEY_INDEX_SIZE = 256
+
+# Stamp written once static completion scripts are generated, turning off setup of click built-in completion
+STATIC_STAMP = "static\n"
+
+
+def detect_shell_config(program_name: str) -> Optional[Tuple[str, str]]:
+    """
+    Detect current shell and the file `auto_click_auto` writes completion configuration to,
+    without importing it.
+
+    Returns:
+        Optional[Tuple[str, str]]: Shell name and path of its configuration file, or `None` if unsupported.
+    """
+    if not (sys.platform.startswith("linux") or sys.platform == "darwin"):
+        return None
+
+    shell = os.path.basename(os.getenv("SHELL", ""))
+    if shell not in SUPPORTED_SHELLS:
+        return None
+
+    if shell == "fish":
+        rc_path = os.path.expanduser(f"~/.config/fish/completions/{program_name}.fish")
+    else:
+        rc_path = os.path.expanduser(f"~/.{shell}rc")
+    return shell, rc_path
+
+
+def get_completion_stamp_path(program_name: str) -> Path:
+    return get_cache_dir() / "completion" / f"{program_name}.stamp"
+
+
+def enable_completion(program_name: str, force: bool = False, verbose: bool = False):
+    """
+    Setup click shell completion for given program once per install.
+
+    A stamp keyed by shell, configuration file path and execenv version is written after setup,
+    so later runs only compare it and skip probing the shell and touching rc files.
+    Nothing is done unless `force` once static completion scripts are used instead, see `disable_completion`.
+
+    Args:
+        program_name (str): Name of the program to setup completion for.
+        force (bool): Setup again even if the stamp is up to date.
+        verbose (bool): Let `auto_click_auto` log out what it does.
+    """
+    from execenv import __version__
+
+    shell_config = detect_shell_config(program_name)
+    if shell_config is None:
+        return
+
+    shell, rc_path = shell_config
+    stamp = f"{shell}\n{rc_path}\n{__version__}\n"
+    stamp_path = get_completion_stamp_path(program_name)
+
+    if not force:
+        try:
+            current = stamp_path.read_text()
+        except OSError:
+            current = None
+        if current == STATIC_STAMP or (current == stamp and os.path.exists(rc_path)):
+            return
+
+    from auto_click_auto import enable_click_shell_completion  # type: ignore
+
+    enable_click_shell_completion(program_name, verbose=verbose)
+    _write_stamp(stamp_path, stamp)
+
+
+def disable_completion(program_name: str):
+    """
+    Turn off setup of click built-in shell completion by `enable_completion` for given program,
+    e.g. once static completion scripts are used instead, whose completion it would override.
+    """
+    _write_stamp(get_completion_stamp_path(program_name), STATIC_STAMP)
+
+
+def _write_stamp(stamp_path: Path, stamp: str):
+    try:
+        stamp_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first to keep concurrent runs from reading a partial stamp
+        temp_path = stamp_path.with_name(f"{stamp_path.name}.{os.getpid()}.tmp")
+        temp_path.write_text(stamp)
+        os.replace(temp_path, stamp_path)
+    except OSError:
+        # Failing to write the stamp only means setup will be redone next time
+        pass
+
+
+def get_key_index_path() -> Path:
+    return get_cache_dir() / "completion" / "keys.index"
+
+
+def update_key_index(files: Dict[str, Iterable[str]]):
+    """
+    Record keys of loaded .env files, by absolute path, for static completion scripts (see `execenv.shell_completion`)
+    to complete names of variables without running Python.
+
+    The index is a text file with a line of path and space-separated keys, separated by a tab, for each file.
+    It is only rewritten when keys of some file changed, with files updated most recently first,
+    and those updated least recently dropped beyond `KEY_INDEX_SIZE`.
+    """
+    entries = {
+        path: " ".join(key for key in keys if not any(c.isspace() for c in key))
+        for path, keys in files.items()
+        if not any(c in path for c in "\t\n\r")
+    }
+
+    index_path = get_key_index_path()
+    indexed: Dict[str, str] = {}
+    try:
+        with open(index_path, encoding="utf-8", errors="surrogateescape") as f:
+            for line in f:
+                path, sep, keys = line.rstrip("\n").partition("\t")
+                if sep:
+                    indexed[path] = keys
+    except OSError:
+        pass
+
+    if all(indexed.get(path) == keys for path, keys in entries.items()):
+        return
+
+    for path in entries:
+        indexed.pop(path, None)
+    lines = [
+        f"{path}\t{keys}\n"
+        for path, keys in [*entries.items(), *indexed.items()][:KEY_INDEX_SIZE]
+    ]
+
+    try:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first to keep shells from reading a partial index
+        temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+        with open(temp_path, "w", encoding="utf-8", errors="surrogateescape") as f:
+            f.writelines(lines)
+        os.replace(temp_path, index_path)
+    except OSError:
+        # Failing to write the index only means keys are not completed
+        pass
@@ -1,17 +1,262 @@
 import re
-from typing import Dict
+from typing import IO, Dict, Iterator, List, Optional, Tuple, cast
 
-LINE = re.compile(
-    r'^\s*(?:export\s+)?([\w.-]+)(?:\s*=\s*?|:\s+?)(\s*\'(?:\\\'|[^\'])*\'|\s*"(?:\\"|[^"])*"|\s*`(?:\\`|[^`])*`|[^#\r\n]+)?\s*(?:#.*)?$',
-    re.MULTILINE,
-)
+# Character class scanners used by the tokenizer.
+# Each of them is a single quantified class, so matching never backtracks.
+WHITESPACE = re.compile(r"\s*")
+KEY = re.compile(r"[\w.-]+")
+UNQUOTED = re.compile(r"[^#\r\n]*")
+
+QUOTES = "'\"`"
+
+# Number of characters read at once by `iter_parse`
+CHUNK_SIZE = 64 * 1024
+
+
+class _Incomplete(Exception):
+    """
+    Raised by a non-final tokenizer when the next match depends on input not read yet.
+    """
+
+
+class _Tokenizer:
+    """
+    Single-pass tokenizer for .env files, yielding raw `(key, value)` pairs.
+
+    It follows the rules of the multi-line regex used by [dotenv](https://github.com/motdotla/dotenv/blob/master/lib/main.js):
+
+        ^\\s*(?:export\\s+)?([\\w.-]+)(?:\\s*=\\s*?|:\\s+?)(\\s*'(?:\\\\'|[^'])*'|\\s*"(?:\\\\"|[^"])*"|\\s*`(?:\\\\`|[^`])*`|[^#\\r\\n]+)?\\s*(?:#.*)?$
+
+    but resolves its backtracking up front instead of trying it out, so the running time is linear in the size of input:
+
+    - Leading whitespace, keys and separators never need to backtrack, as the characters following them can not be part of them.
+    - An unquoted value always ends a match, as anything after it is either a comment, a line break or the end of input.
+    - A quoted value is closed by the first unescaped quote, or failing that by the latest escaped one followed by nothing
+      but whitespace and comments. Regions scanned for quotes of the same kind never overlap across matches.
+    - Start positions inside a whitespace run share the same result, so each run is only scanned once.
+
+    If `final` is `False`, `src` is only a prefix of the input. Whenever the end of `src` would decide a match,
+    tokenizing stops and `consumed` is set to where the unfinished match starts.
+
+    If `spans` is a list, start (after leading whitespace) and end of each match are appended to it, e.g. to find lines
+    not matched by any pair.
+    """
+
+    src: str
+    length: int
+    start: int
+    final: bool
+    consumed: int
+    spans: Optional[List[Tuple[int, int]]] = None
+    _ws_start: int
+    _ws_end: int
+
+    def __init__(self, src: str, start: int = 0, final: bool = True) -> None:
+        self.src = src
+        self.length = len(src)
+        self.start = start
+        self.final = final
+        self.consumed = start
+        self._ws_start = self._ws_end = -1
+
+    def check_end(self, pos: int):
+        if pos >= self.length and not self.final:
+            raise _Incomplete
+
+    def skip_whitespace(self, pos: int) -> int:
+        if pos < self.length and not self.src[pos].isspace():
+            return pos
+
+        # Positions inside the last scanned run share the same end
+        if self._ws_start <= pos <= self._ws_end:
+            return self._ws_end
+
+        end = WHITESPACE.match(self.src, pos).end()  # type: ignore
+        self.check_end(end)
+        self._ws_start, self._ws_end = pos, end
+        return end
+
+    def match_tail(self, pos: int) -> Optional[int]:
+        """
+        Match trailing whitespace, an optional comment and the end of line from `pos`.
+
+        Returns:
+            Optional[int]: End of the match, or `None` if there is something else left on the line.
+        """
+        src = self.src
+        end = self.skip_whitespace(pos)
+        if end < self.length and src[end] == "#":
+            line_end = src.find("\n", end)
+            if line_end == -1:
+                self.check_end(self.length)
+                return self.length
+            return line_end
+        if end == self.length:
+            return end
+
+        # Give back whitespace until the last line break
+        line_end = src.rfind("\n", pos, end)
+        return None if line_end == -1 else line_end
+
+    def match_quoted(self, quote_pos: int) -> Optional[Tuple[int, int]]:
+        """
+        Match a quoted value opened at `quote_pos`, followed by the end of line.
+
+        Returns:
+            Optional[Tuple[int, int]]: Position of the closing quote and end of the match, or `None` if not matched.
+        """
+        src = self.src
+        quote = src[quote_pos]
+
+        # Quotes preceded by a backslash are escaped, unless nothing else closes the value
+        escaped = []
+        pos = src.find(quote, quote_pos + 1)
+        while pos != -1 and src[pos - 1] == "\\":
+            escaped.append(pos)
+            pos = src.find(quote, pos + 1)
+        if pos == -1:
+            self.check_end(self.length)
+
+        if pos != -1:
+            end = self.match_tail(pos + 1)
+            if end is not None:
+                return pos, end
+
+        for pos in reversed(escaped):
+            end = self.match_tail(pos + 1)
+            if end is not None:
+                return pos, end
+
+        return None
+
+    def match_value(self, key_end: int) -> Optional[Tuple[str, int]]:
+        """
+        Match separator, value and the end of line after a key.
+
+        Returns:
+            Optional[Tuple[str, int]]: Raw value and end of the match, or `None` if not matched.
+        """
+        src = self.src
+        length = self.length
+
+        pos = self.skip_whitespace(key_end)
+        if pos < length and src[pos] == "=":
+            pos += 1
+        elif key_end + 1 >= length:
+            # A colon has to be followed by whitespace
+            self.check_end(key_end + 1)
+            return None
+        elif (
+            key_end + 1 < length and src[key_end] == ":" and src[key_end + 1].isspace()
+        ):
+            pos = key_end + 2
+        else:
+            return None
+
+        quote_pos = self.skip_whitespace(pos)
+        if quote_pos < length and src[quote_pos] in QUOTES:
+            quoted = self.match_quoted(quote_pos)
+            if quoted is not None:
+                closing, end = quoted
+                return src[pos : closing + 1], end
+
+        if pos < length and src[pos] not in "#\n":
+            value_end = UNQUOTED.match(src, pos).end()  # type: ignore
+            self.check_end(value_end)
+            return src[pos:value_end], cast(int, self.match_tail(value_end))
+
+        return "", cast(int, self.match_tail(pos))
+
+    def match_line(self, start: int) -> Tuple[Optional[Tuple[str, str, int]], int]:
+        """
+        Match a K-V pair from line start `start`.
+
+        Returns:
+            Tuple[Optional[Tuple[str, str, int]], int]: Key, raw value and end of the match if matched,
+                and the position where leading whitespace ends.
+        """
+        src = self.src
+        pos = self.skip_whitespace(start)
+
+        if "export".startswith(src[pos : pos + 6]):
+            self.check_end(pos + 6)
+        if (
+            src.startswith("export", pos)
+            and pos + 6 < self.length
+            and src[pos + 6].isspace()
+        ):
+            key_start = self.skip_whitespace(pos + 6)
+            key = KEY.match(src, key_start)
+            if key is not None:
+                self.check_end(key.end())
+                matched = self.match_value(key.end())
+                if matched is not None:
+                    return (key.group(), *matched), pos
+
+        key = KEY.match(src, pos)
+        if key is not None:
+            self.check_end(key.end())
+            matched = self.match_value(key.end())
+            if matched is not None:
+                return (key.group(), *matched), pos
+
+        return None, pos
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        src = self.src
+        pos = self.start
+        while pos <= self.length:
+            # Only line starts are tried
+            if pos > 0 and src[pos - 1] != "\n":
+                line_start = src.find("\n", pos) + 1
+                if line_start == 0:
+                    self.consumed = self.length
+                    break
+                pos = line_start
+
+            try:
+                matched, content_start = self.match_line(pos)
+            except _Incomplete:
+                self.consumed = pos
+                break
+
+            if matched is not None:
+                key, value, pos = matched
+                if self.spans is not None:
+                    self.spans.append((content_start, pos))
+                yield key, value
+            else:
+                # Any line start before `content_start` leads to the same failure
+                pos = max(pos, content_start) + 1
+
+
+def parse_value(value: str) -> str:
+    """
+    Post-process a raw value by trimming whitespace, removing surrounding quotes and expanding newlines if double quoted.
+    """
+    # Remove whitespace
+    value = value.strip()
+
+    # Check if double quoted
+    maybeQuote = value[0] if value else ""
+
+    # Remove surrounding quotes
+    if len(value) >= 2 and maybeQuote in QUOTES and value[-1] == maybeQuote:
+        value = value[1:-1]
+
+    # Expand newlines if double quoted
+    if maybeQuote == '"':
+        value = value.replace("\\n", "\n").replace("\\r", "\r")
+
+    return value
 
 
 def parse(src: str):
     """
     Parse a .env file based on the rules defined in [dotenv](https://github.com/motdotla/dotenv?tab=readme-ov-file#what-rules-does-the-parsing-engine-follow).
 
-    Ported from https://github.com/motdotla/dotenv/blob/master/lib/main.js .
+    Ported from https://github.com/motdotla/dotenv/blob/master/lib/main.js , with a single-pass tokenizer
+    in place of its regex to keep the running time linear.
 
     Args:
         src (str): Source multi-line string contains K-V pairs.
@@ -21,27 +266,51 @@ def parse(src: str):
     # Convert line breaks to same format
     src = src.replace("\r\n", "\n").replace("\r", "\n")
 
-    matches = LINE.findall(src)
-    for match in matches:
-        key = match[0]
+    for key, value in _Tokenizer(src):
+        # Add to object
+        obj[key] = parse_value(value)
 
-        # Default undefined or null to empty string
-        value = match[1] or ""
+    return obj
 
-        # Remove whitespace
-        value = value.strip()
 
-        # Check if double quoted
-        maybeQuote = value[0] if value else ""
+def iter_parse(
+    file: IO[str], chunk_size: int = CHUNK_SIZE
+) -> Iterator[Tuple[str, str]]:
+    """
+    Parse a .env file incrementally, yielding K-V pairs as soon as they are complete.
 
-        # Remove surrounding quotes
-        value = re.sub(r"^(['\"`])([\s\S]*)\1$", r"\2", value)
+    Follows the same rules as `parse`. Only the entry being parsed is kept in memory, so large files, pipes and stdin
+    are never read as a whole. The exception is an unterminated quote, which can only be told apart from a multi-line
+    value by reading on until a closing quote or the end of file.
 
-        # Expand newlines if double quoted
-        if maybeQuote == '"':
-            value = value.replace("\\n", "\n").replace("\\r", "\r")
+    Args:
+        file (IO[str]): Opened .env file in text mode.
+        chunk_size (int): Number of characters to read at once.
+    """
+    buffer = ""
+    start = 0
+    pending_cr = False
+    eof = False
 
-        # Add to object
-        obj[key] = value
+    while not eof:
+        # Read at least as much as kept, so that a long entry is re-tokenized only a logarithmic number of times
+        chunk = file.read(max(chunk_size, len(buffer)))
+        eof = not chunk
 
-    return obj
+        # Convert line breaks to same format, holding back a trailing "\r" which might be part of "\r\n"
+        if pending_cr:
+            chunk = "\r" + chunk
+        pending_cr = not eof and chunk.endswith("\r")
+        if pending_cr:
+            chunk = chunk[:-1]
+        buffer += chunk.replace("\r\n", "\n").replace("\r", "\n")
+
+        tokenizer = _Tokenizer(buffer, start, final=eof)
+        for key, value in tokenizer:
+            yield key, parse_value(value)
+
+        # Keep the character before the unfinished match to tell whether it starts at a line start
+        consumed = tokenizer.consumed
+        if consumed > 0:
+            buffer = buffer[consumed - 1 :]
+            start = 1
@@ -0,0 +1,72 @@
+import os
+from typing import Dict, List
+
+from execenv.cache import EnvCache
+
+# Number of files from which they are loaded by a pool of threads instead of one by one
+PARALLEL_THRESHOLD = 8
+
+MAX_WORKERS = 8
+
+
+def expand_env_paths(value: str) -> List[str]:
+    """
+    Expand a value of `-f` / `--file` into paths of .env files, in the order they are applied:
+
+    - a directory: `*.env` files directly in it (except hidden ones), sorted by name;
+    - a glob pattern: files it matches, sorted, unless a file of that very name exists;
+    - anything else as is, including `-` for stdin.
+
+    Raises:
+        ValueError: If a directory or glob pattern has no .env file in it.
+    """
+    if value == "-":
+        return [value]
+
+    if os.path.isdir(value):
+        with os.scandir(value) as it:
+            names = sorted(
+                entry.name
+                for entry in it
+                if entry.name.endswith(".env")
+                and not entry.name.startswith(".")
+                and entry.is_file()
+            )
+        if not names:
+            raise ValueError(f"No .env file in {value}")
+        return [os.path.join(value, name) for name in names]
+
+    import glob
+
+    # Names like `a[1].env` are taken as patterns only if no such file exists
+    if not os.path.exists(value) and glob.has_magic(value):
+        paths = sorted(path for path in glob.glob(value) if os.path.isfile(path))
+        if not paths:
+            raise ValueError(f"No .env file matches {value}")
+        return paths
+
+    return [value]
+
+
+def load_env_files(paths: List[str], cache: EnvCache) -> List[Dict[str, str]]:
+    """
+    Load .env files by path, with results in the same order.
+
+    Many files (e.g. fragments in a directory) are loaded by a pool of threads, so that reading them and looking up
+    the cache overlap. Each file is read in as few chunks as its size allows, see `execenv.dotenv.iter_parse`.
+
+    Raises:
+        OSError: If a file can not be opened, with `filename` set to its path.
+    """
+
+    def load(path: str) -> Dict[str, str]:
+        with open(path) as f:
+            return cache.load(f)
+
+    if len(paths) < PARALLEL_THRESHOLD:
+        return [load(path) for path in paths]
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(min(MAX_WORKERS, len(paths))) as executor:
+        return list(executor.map(load, paths))
@@ -0,0 +1,216 @@
+import re
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+
+# Name of a referenced variable
+NAME = re.compile(r"[A-Za-z_][\w.]*")
+
+# Tokens with special meaning in a value, i.e. escaped reference, reference and end of default
+TOKEN = re.compile(r"\\\$\{|\$\{|\}")
+
+# Tokens of arguments of commands, which also have `$NAME` references (named as in shells) and `\$` as a literal `$`
+ARGUMENT_TOKEN = re.compile(r"\\\$|\$\{|\$([A-Za-z_][A-Za-z0-9_]*)|\}")
+
+
+class Reference:
+    """
+    Reference to a variable in form of `${NAME}`, `${NAME:-default}` (default if unset or empty)
+    or `${NAME-default}` (default if unset).
+    """
+
+    __slots__ = ("name", "operator", "default")
+
+    name: str
+    operator: Optional[str]
+    default: Optional["Template"]
+
+    def __init__(
+        self, name: str, operator: Optional[str], default: Optional["Template"]
+    ) -> None:
+        self.name = name
+        self.operator = operator
+        self.default = default
+
+
+Template = List[Union[str, Reference]]
+
+
+class InterpolationError(ValueError):
+    pass
+
+
+def parse(value: str, argument: bool = False) -> Template:
+    """
+    Parse a value with references to other variables into literal parts and references.
+
+    `\\${` is a literal `${`, and so are references not closed by `}`. If `argument`, `$NAME` is a reference as well,
+    and `\\$` a literal `$`, see `expand`.
+    """
+    token_pattern = ARGUMENT_TOKEN if argument else TOKEN
+    parts: Template = []
+
+    # Enclosing parts, name and operator of each default being parsed.
+    # An explicit stack is used as defaults can be nested deeper than the recursion limit
+    stack: List[Tuple[Template, str, str]] = []
+
+    pos = 0
+    while True:
+        token = token_pattern.search(value, pos)
+        if token is None:
+            parts.append(value[pos:])
+            break
+
+        parts.append(value[pos : token.start()])
+        pos = token.end()
+        text = token.group()
+        if text == "}":
+            if stack:
+                outer, name, operator = stack.pop()
+                outer.append(Reference(name, operator, parts))
+                parts = outer
+            else:
+                parts.append(text)
+        elif text == "\\${":
+            parts.append("${")
+        elif text == "\\$":
+            parts.append("$")
+        elif token.lastindex:
+            parts.append(Reference(token.group(1), None, None))
+        else:
+            match = NAME.match(value, pos)
+            if match is None:
+                parts.append(text)
+                continue
+
+            name, name_end = match.group(), match.end()
+            if value.startswith("}", name_end):
+                parts.append(Reference(name, None, None))
+                pos = name_end + 1
+                continue
+
+            operator = ":-" if value.startswith(":-", name_end) else "-"
+            if not value.startswith(operator, name_end):
+                parts.append(text)
+                continue
+
+            stack.append((parts, name, operator))
+            parts = []
+            pos = name_end + len(operator)
+
+    # Defaults not closed until the end are literal, while everything inside them stays the same
+    if stack:
+        flattened: Template = []
+        for outer, name, operator in stack:
+            flattened.extend(outer)
+            flattened.append(f"${{{name}{operator}")
+        flattened.extend(parts)
+        parts = flattened
+
+    return parts
+
+
+def _names(template: Template) -> Iterator[str]:
+    stack = [iter(template)]
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, Reference):
+                yield part.name
+                if part.default is not None:
+                    stack.append(iter(part.default))
+                    break
+        else:
+            stack.pop()
+
+
+def render(template: Template, lookup: Callable[[str], Optional[str]]) -> str:
+    """
+    Render a parsed template, looking up values of referenced variables with `lookup` (`None` if unset).
+    """
+    chunks: List[str] = []
+    stack = [iter(template)]
+    while stack:
+        for part in stack[-1]:
+            if isinstance(part, str):
+                chunks.append(part)
+                continue
+
+            value = lookup(part.name)
+            if part.default is not None and (
+                value is None or (part.operator == ":-" and not value)
+            ):
+                # Defaults are expanded in place
+                stack.append(iter(part.default))
+                break
+            chunks.append(value or "")
+        else:
+            stack.pop()
+    return "".join(chunks)
+
+
+def interpolate(layer: Mapping[str, str], below: Mapping[str, str]) -> Dict[str, str]:
+    """
+    Expand references in values of a layer, e.g. a .env file.
+
+    A reference resolves to the variable in the same layer if defined there (and not the variable itself),
+    or to its value in the layers below (`below`) otherwise, so `PATH=${PATH}:/opt/bin` extends `PATH` from below.
+    Unset variables without defaults expand to empty strings.
+
+    Variables are resolved in dependency order with each of them resolved once, so the running time is linear
+    in the size of input and output, regardless of how deep references are chained.
+
+    Raises:
+        InterpolationError: If variables in the layer reference each other in a cycle.
+    """
+    templates: Dict[str, Template] = {}
+    resolved: Dict[str, str] = {}
+    for key, value in layer.items():
+        if "${" in value:
+            templates[key] = parse(value)
+        else:
+            resolved[key] = value
+
+    def lookup(key: str, name: str) -> Optional[str]:
+        if name != key and name in layer:
+            return resolved[name]
+        return below.get(name)
+
+    # Iterative depth-first search, as reference chains in generated files can be deeper than the recursion limit
+    visiting: Dict[str, int] = {}
+    for root in templates:
+        if root in resolved:
+            continue
+
+        stack = [(root, _names(templates[root]))]
+        visiting[root] = 0
+        while stack:
+            key, dependencies = stack[-1]
+            for name in dependencies:
+                if name == key or name not in templates or name in resolved:
+                    continue
+                if name in visiting:
+                    cycle = [entry[0] for entry in stack[visiting[name] :]]
+                    raise InterpolationError(
+                        "Cycle in variable references: " + " -> ".join([*cycle, name])
+                    )
+                visiting[name] = len(stack)
+                stack.append((name, _names(templates[name])))
+                break
+            else:
+                stack.pop()
+                del visiting[key]
+                resolved[key] = render(templates[key], partial(lookup, key))
+
+    # Keep the order of layer
+    return {key: resolved[key] for key in layer}
+
+
+def expand(value: str, env: Mapping[str, str]) -> str:
+    """
+    Expand references in an argument of a command against `env`, as shells do in double quotes but without
+    starting one: `$NAME`, `${NAME}`, `${NAME:-default}` and `${NAME-default}`. `\\$` is a literal `$`.
+    Unset variables without defaults expand to empty strings.
+    """
+    # Most arguments have no references
+    if "$" not in value:
+        return value
+    return render(parse(value, argument=True), env.get)
@@ -0,0 +1,149 @@
+import io
+import threading
+import time
+from collections import deque
+from typing import IO, BinaryIO, Deque, List, Optional
+
+import click
+
+# Size of chunks read from the command, so that long lines are written in parts instead of buffered whole
+CHUNK_SIZE = 64 * 1024
+
+
+def has_fileno(stream: IO) -> bool:
+    """
+    Check if a stream is backed by a file descriptor a child process can inherit, unlike those replaced by tests.
+    """
+    try:
+        stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return False
+    return True
+
+
+class _Tail:
+    """
+    Ring buffer keeping the last `size` bytes written to it.
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.chunks: Deque[bytes] = deque()
+        self.length = 0
+
+    def write(self, data: bytes):
+        self.chunks.append(data)
+        self.length += len(data)
+        while self.chunks and self.length - len(self.chunks[0]) >= self.size:
+            self.length -= len(self.chunks.popleft())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.chunks)[-self.size :]
+
+
+class Tee:
+    """
+    Streams stdout and stderr of a command to those of execenv as soon as they are read,
+    and optionally to a log file, with timestamps or a prefix at the start of each line.
+
+    Memory use is bounded regardless of how much the command writes: output is forwarded in chunks,
+    and only the last `tail_size` bytes are kept for `tail`.
+    """
+
+    log_file: Optional[BinaryIO]
+    timestamps: bool
+    prefix: bytes
+    lock: threading.Lock
+
+    def __init__(
+        self,
+        log_file: Optional[BinaryIO] = None,
+        timestamps: bool = False,
+        prefix: Optional[str] = None,
+        tail_size: int = 0,
+    ) -> None:
+        self.log_file = log_file
+        self.timestamps = timestamps
+        self.prefix = prefix.encode() if prefix else b""
+        self.lock = threading.Lock()
+        self._tail = _Tail(tail_size) if tail_size > 0 else None
+
+    def _line_prefix(self) -> bytes:
+        if not self.timestamps:
+            return self.prefix
+
+        now = time.time()
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now))
+        return f"{stamp}.{int(now % 1 * 1000):03d} ".encode() + self.prefix
+
+    def _forward(self, pipe: IO[bytes], stream: BinaryIO):
+        at_line_start = True
+        decorate = self.timestamps or bool(self.prefix)
+        # Rest of a line held back from the log file, so that lines of stdout and stderr do not mix in it
+        log_pending = b""
+        while True:
+            chunk = pipe.read1(CHUNK_SIZE)  # type: ignore
+            if not chunk:
+                break
+
+            if decorate:
+                parts: List[bytes] = []
+                lines = chunk.split(b"\n")
+                for line in lines[:-1]:
+                    if at_line_start:
+                        parts.append(self._line_prefix())
+                    parts.append(line + b"\n")
+                    at_line_start = True
+
+                # Rest of a line continued in the next chunk
+                if lines[-1]:
+                    if at_line_start:
+                        parts.append(self._line_prefix())
+                    parts.append(lines[-1])
+                    at_line_start = False
+                chunk = b"".join(parts)
+
+            with self.lock:
+                stream.write(chunk)
+                stream.flush()
+                if self.log_file is not None:
+                    end = chunk.rfind(b"\n") + 1
+                    if end or len(log_pending) + len(chunk) >= CHUNK_SIZE:
+                        end = end or len(chunk)
+                        self.log_file.write(log_pending + chunk[:end])
+                        log_pending = chunk[end:]
+                    else:
+                        log_pending += chunk
+                if self._tail is not None:
+                    self._tail.write(chunk)
+
+        if log_pending and self.log_file is not None:
+            with self.lock:
+                self.log_file.write(log_pending)
+
+    def stream(self, stdout: Optional[IO[bytes]], stderr: Optional[IO[bytes]]):
+        """
+        Forward given pipes of a command until both of them are closed.
+        """
+        threads = [
+            threading.Thread(
+                target=self._forward,
+                args=(pipe, click.get_binary_stream(name)),
+                daemon=True,
+            )
+            for pipe, name in ((stdout, "stdout"), (stderr, "stderr"))
+            if pipe is not None
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.log_file is not None:
+            self.log_file.flush()
+
+    def tail(self) -> bytes:
+        """
+        Get the last bytes of output, up to `tail_size`.
+        """
+        return self._tail.getvalue() if self._tail is not None else b""
@@ -0,0 +1,146 @@
+import queue
+import signal
+import subprocess
+import threading
+from typing import IO, Dict, List, Optional, Tuple
+
+from execenv.api import popen
+from execenv.output import Tee
+
+# `SIGPIPE` does not exist on Windows
+SIGPIPE = getattr(signal, "SIGPIPE", None)
+
+# Seconds to wait for stages to exit after terminating them, before killing them
+GRACE_PERIOD = 1.0
+
+
+def exit_status(returncode: int) -> int:
+    """
+    Exit status of a process as shells report it, i.e. `128 + N` if killed by signal `N`.
+    """
+    return 128 - returncode if returncode < 0 else returncode
+
+
+def _teardown(processes: List[subprocess.Popen]) -> List[subprocess.Popen]:
+    # Returns the processes terminated
+    running = [process for process in processes if process.poll() is None]
+    for process in running:
+        process.terminate()
+    for process in running:
+        try:
+            process.wait(GRACE_PERIOD)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return running
+
+
+def start_pipeline(
+    stages: List[List[str]],
+    env: Dict[str, str],
+    cwd: Optional[str] = None,
+    capture: bool = False,
+) -> List[subprocess.Popen]:
+    """
+    Start stages of a pipeline directly (without a shell), each reading output of the previous one from an OS pipe.
+
+    Ends of pipes are closed in execenv as soon as both stages using them are started, so that a stage sees
+    end of input, or gets `SIGPIPE` writing, once the stage on the other side exits. If `capture`,
+    stdout and stderr of the last stage are pipes to read from.
+
+    Raises:
+        OSError: If a stage fails to start, after stopping those already started.
+    """
+    processes: List[subprocess.Popen] = []
+    stdin: Optional[IO[bytes]] = None
+    try:
+        for index, args in enumerate(stages):
+            last = index == len(stages) - 1
+            try:
+                process = popen(
+                    args,
+                    env,
+                    cwd=cwd,
+                    stdin=stdin,
+                    stdout=subprocess.PIPE if not last or capture else None,
+                    stderr=subprocess.PIPE if last and capture else None,
+                )
+            finally:
+                if stdin is not None:
+                    stdin.close()
+            processes.append(process)
+            stdin = process.stdout
+    except BaseException:
+        _teardown(processes)
+        raise
+    return processes
+
+
+def wait_pipeline(
+    processes: List[subprocess.Popen], tee: Optional[Tee] = None
+) -> Tuple[int, List[int]]:
+    """
+    Wait for all stages of a pipeline started by `start_pipeline`, streaming output of the last one through `tee`
+    if captured.
+
+    As with shells, stages are left to end on their own when a stage after them exits: they see `SIGPIPE`
+    on their next write, and stages after it see end of input. Only if a stage dies of a signal (e.g. crashes),
+    stages before it still running are terminated (and killed after `GRACE_PERIOD` seconds).
+
+    Returns:
+        Tuple[int, List[int]]: Status of the pipeline as with `pipefail` of shells, i.e. that of the last stage
+            exiting with non-zero status, or 0 if all succeeded; and exit status of each stage.
+            Stages killed by `SIGPIPE` or terminated as above do not fail the pipeline, as their output
+            was not read anyway.
+    """
+    exited: "queue.Queue[int]" = queue.Queue()
+
+    def waiter(index: int):
+        processes[index].wait()
+        exited.put(index)
+
+    for index in range(len(processes)):
+        threading.Thread(target=waiter, args=(index,), daemon=True).start()
+
+    streaming = None
+    last = processes[-1]
+    if tee is not None and last.stdout is not None:
+        streaming = threading.Thread(
+            target=tee.stream, args=(last.stdout, last.stderr), daemon=True
+        )
+        streaming.start()
+
+    # Stages terminated after a stage after them died
+    stopped: List[subprocess.Popen] = []
+    try:
+        for _ in processes:
+            index = exited.get()
+            if processes[index].returncode < 0:
+                stopped += _teardown(processes[:index])
+        if streaming is not None:
+            streaming.join()
+    except BaseException:
+        # e.g. Ctrl-C
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        raise
+
+    def failed(index: int, process: subprocess.Popen) -> bool:
+        if process.returncode >= 0:
+            return process.returncode != 0
+        # Killed because of stages after it: terminated above, or by `SIGPIPE` writing to a stage exited
+        return process not in stopped and not (
+            index < len(processes) - 1 and -process.returncode == SIGPIPE
+        )
+
+    statuses = [exit_status(process.returncode) for process in processes]
+    status = next(
+        (
+            statuses[index]
+            for index in reversed(range(len(processes)))
+            if failed(index, processes[index])
+        ),
+        0,
+    )
+    return status, statuses
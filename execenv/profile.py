@@ -0,0 +1,121 @@
+# Phase timings of `--profile`. Only the standard library is imported here,
+# so that `execenv.client` can mark the start of importing the CLI.
+
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# When `execenv` started to be imported, close enough to the start of the `execenv` script
+STARTED = time.perf_counter_ns()
+
+# Start and end of importing the CLI, or `None` if the CLI was imported before current invocation,
+# e.g. by `execenv --server`
+imports: Optional[Tuple[int, int]] = None
+
+
+def mark_imported():
+    """
+    Mark the end of importing the CLI, which starts from `STARTED`.
+    """
+    global imports
+    imports = (STARTED, time.perf_counter_ns())
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        self.profiler.phases.append((self.name, self.start, time.perf_counter_ns()))
+
+
+class Profiler:
+    """
+    Timings of phases of an invocation, e.g. parsing .env files or waiting for the command.
+
+    Phases are always recorded, as that only takes a couple of clock reads each,
+    while formatting and writing them happens only if asked to.
+    """
+
+    phases: List[Tuple[str, int, int]]
+
+    def __init__(self) -> None:
+        self.phases = [("imports", *imports)] if imports is not None else []
+
+    def phase(self, name: str) -> _Phase:
+        """
+        Context manager recording the time spent in its body as a phase.
+        """
+        return _Phase(self, name)
+
+    def summary(self) -> str:
+        """
+        Format phases as a table of durations in milliseconds, along with their share of the total.
+        """
+        if not self.phases:
+            return "No phases recorded."
+
+        total = max(end for _, _, end in self.phases) - min(
+            start for _, start, _ in self.phases
+        )
+        width = max(len(name) for name, _, _ in self.phases + [("total", 0, 0)])
+        lines = [
+            f"{name:<{width}}  {(end - start) / 1e6:10.3f} ms  {(end - start) / max(total, 1):6.1%}"
+            for name, start, end in self.phases
+        ]
+        # Time not in any phase, e.g. parsing arguments
+        other = total - sum(end - start for _, start, end in self.phases)
+        if other > 0:
+            lines.append(
+                f"{'other':<{width}}  {other / 1e6:10.3f} ms  {other / max(total, 1):6.1%}"
+            )
+        lines.append(f"{'total':<{width}}  {total / 1e6:10.3f} ms")
+        return "\n".join(lines)
+
+    def write_trace(self, path: Path):
+        """
+        Write phases as complete events of the Chrome trace event format, to be opened in `chrome://tracing` or Perfetto.
+
+        If `path` is an existing directory, a file named after PID and time is created in it,
+        so that traces of many invocations can be collected into one place and aggregated.
+        Timestamps are in microseconds since the Unix epoch, so traces of different processes line up.
+        """
+        import json
+
+        if path.is_dir():
+            path = path / f"execenv-{os.getpid()}-{time.time_ns()}.json"
+
+        # Offset from the performance counter to wall clock
+        offset = time.time_ns() - time.perf_counter_ns()
+        pid = os.getpid()
+        events = [
+            {
+                "name": name,
+                "cat": "execenv",
+                "ph": "X",
+                "ts": (start + offset) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": pid,
+                "tid": 0,
+            }
+            for name, start, end in self.phases
+        ]
+        events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": " ".join(["execenv", *sys.argv[1:]])},
+            }
+        )
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
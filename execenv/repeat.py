@@ -0,0 +1,131 @@
+import math
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import click
+
+from execenv.api import command_line, popen
+from execenv.batch import BatchCommand
+from execenv.pipeline import exit_status
+
+
+@dataclass
+class LatencyStats:
+    """
+    Statistics of wall times of repeated runs, in seconds.
+    """
+
+    runs: int
+    min: float
+    median: float
+    p95: float
+    max: float
+    mean: float
+    stddev: float
+
+    @classmethod
+    def from_durations(cls, durations: List[float]) -> "LatencyStats":
+        ordered = sorted(durations)
+        return cls(
+            runs=len(ordered),
+            min=ordered[0],
+            median=statistics.median(ordered),
+            # Nearest-rank percentile
+            p95=ordered[math.ceil(0.95 * len(ordered)) - 1],
+            max=ordered[-1],
+            mean=statistics.fmean(ordered),
+            stddev=statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        )
+
+
+def _time_once(
+    variant: BatchCommand,
+    env: Dict[str, str],
+    cwd: Optional[str],
+    shell: bool,
+    shell_strict: bool,
+) -> float:
+    started = time.perf_counter()
+    process = popen(
+        command_line(variant.args, shell_strict) if shell else variant.args,
+        env if variant.env is None else variant.env,
+        cwd=cwd,
+        shell=shell,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    variant.returncode = exit_status(process.wait())
+    return time.perf_counter() - started
+
+
+def run_repeated(
+    variants: List[BatchCommand],
+    env: Dict[str, str],
+    cwd: Optional[str],
+    shell: bool,
+    shell_strict: bool,
+    repeat: int,
+    warmup: int,
+) -> int:
+    """
+    Run each variant `warmup` times without timing it, then `repeat` times timing each run, and show a report.
+
+    Output of the command is discarded. Each variant is run to the end before the next one starts,
+    and a failed run stops the whole benchmark.
+
+    Returns:
+        int: Exit code of the failed run (`128 + N` if killed by signal `N`), or 0 if all succeeded.
+    """
+    results: Dict[str, LatencyStats] = {}
+    for variant in variants:
+        durations: List[float] = []
+        for i in range(warmup + repeat):
+            try:
+                duration = _time_once(variant, env, cwd, shell, shell_strict)
+            except OSError as e:
+                click.secho(
+                    f"Error: Failed to execute {variant.args[0]} ({e.strerror})",
+                    fg="red",
+                    err=True,
+                )
+                return 127 if isinstance(e, FileNotFoundError) else 126
+
+            if variant.returncode:
+                click.secho(
+                    f'Error: [{variant.name}] exited with {variant.returncode} in run {i + 1}, output is discarded so run it without "--repeat" to see why',
+                    fg="red",
+                    err=True,
+                )
+                return variant.returncode
+            if i >= warmup:
+                durations.append(duration)
+
+        results[variant.name] = LatencyStats.from_durations(durations)
+
+    show_report(results)
+    return 0
+
+
+def show_report(results: Dict[str, LatencyStats]):
+    """
+    Show statistics of each variant side by side in milliseconds, with their medians relative to the fastest one.
+    """
+    name_width = max(len(name) for name in results)
+    columns = ("min", "median", "p95", "max", "stddev")
+    fastest = min(stats.median for stats in results.values())
+
+    header = f"{'':<{name_width}}  {'runs':>5}" + "".join(
+        f"  {column:>9}" for column in columns
+    )
+    click.echo(header + ("  relative" if len(results) > 1 else ""))
+    for name, stats in results.items():
+        line = f"{name:<{name_width}}  {stats.runs:>5}" + "".join(
+            f"  {getattr(stats, column) * 1000:7.2f}ms" for column in columns
+        )
+        if len(results) > 1:
+            line += f"  {stats.median / fastest if fastest else 1.0:7.2f}x"
+        click.echo(line)
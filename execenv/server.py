@@ -0,0 +1,407 @@
+import os
+import selectors
+import signal
+import socket
+import sys
+import traceback
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import click
+
+import execenv.profile
+from execenv import __version__
+from execenv.cache import EnvCache
+from execenv.client import (
+    LENGTH,
+    RELAYED_SIGNALS,
+    SIGNAL,
+    STATUS,
+    STATUS_EXITED,
+    STATUS_FALLBACK,
+    STATUS_SIGNALED,
+    decode_request,
+)
+from execenv.files import expand_env_paths, load_env_files
+
+# Maximum number of bytes of a request
+MAX_REQUEST_SIZE = 64 * 1024 * 1024
+
+
+class _Connection:
+    """
+    Connection from a client, reading its request until a worker is started for it.
+    """
+
+    sock: socket.socket
+    buffer: bytearray
+    fds: List[int]
+    pid: Optional[int]
+
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+        self.buffer = bytearray()
+        self.fds = []
+        self.pid = None
+
+    def close(self):
+        for fd in self.fds:
+            os.close(fd)
+        self.fds.clear()
+        self.sock.close()
+
+
+def iter_env_file_args(argv: List[str]):
+    """
+    Find paths given to `-f` / `--file` and `--config` in arguments of `execenv`, without parsing them fully.
+    """
+    it = iter(argv)
+    for arg in it:
+        if arg == "--":
+            break
+        if arg in ("-f", "--file", "--config"):
+            value = next(it, None)
+            if value is not None:
+                yield value
+        elif arg.startswith(("--file=", "--config=")):
+            yield arg.split("=", 1)[1]
+
+
+def _exceeds(limit: int, maximum: int) -> bool:
+    import resource
+
+    if maximum == resource.RLIM_INFINITY:
+        return False
+    return limit == resource.RLIM_INFINITY or limit > maximum
+
+
+def _can_apply_limits(limits: Dict[str, Tuple[int, int]]) -> bool:
+    """
+    Whether resource limits of a client can be applied to a worker, i.e. no hard limit is above that of the server,
+    which could not be raised without privilege.
+    """
+    import resource
+
+    for name, (_, hard) in limits.items():
+        if not hasattr(resource, name):
+            return False
+        if _exceeds(hard, resource.getrlimit(getattr(resource, name))[1]):
+            return False
+    return True
+
+
+def _apply_limits(limits: Dict[str, Tuple[int, int]]):
+    import resource
+
+    for name, limit in limits.items():
+        resource_id = getattr(resource, name)
+        if resource.getrlimit(resource_id) != limit:
+            resource.setrlimit(resource_id, limit)
+
+
+class Server:
+    """
+    Server running `execenv` on behalf of clients (`execenv.client`).
+
+    It listens on a Unix socket and, for each request, forks a worker from the warm process.
+    The worker takes over stdin, stdout and stderr of the client passed with `SCM_RIGHTS`,
+    its working directory and environment, and replaces itself with the command if possible.
+    Signals from the client are relayed to the process group of the worker, and its exit status is sent back.
+
+    Parsed .env files (including the config file) stay in memory, so workers inherit them without reading the files.
+    """
+
+    path: Path
+    env_cache: EnvCache
+    selector: selectors.BaseSelector
+    workers: Dict[int, _Connection]
+    running: bool
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        EnvCache.memory = {}
+
+        # Workers do not import the CLI, so there is no such phase for `--profile`
+        execenv.profile.imports = None
+        self.env_cache = EnvCache.from_environ(__version__)
+        self.selector = selectors.DefaultSelector()
+        self.workers = {}
+        self.running = False
+
+    def _bind(self) -> socket.socket:
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        if self.path.exists():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(os.fsencode(self.path))
+            except OSError:
+                # Left by a server not stopped properly
+                self.path.unlink()
+            else:
+                raise click.ClickException(f"Server is already running at {self.path}")
+            finally:
+                probe.close()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Only the current user can connect
+        umask = os.umask(0o177)
+        try:
+            listener.bind(os.fsencode(self.path))
+        finally:
+            os.umask(umask)
+        listener.listen()
+        listener.setblocking(False)
+        return listener
+
+    def serve_forever(self):
+        listener = self._bind()
+        wakeup_r, wakeup_w = os.pipe()
+        os.set_blocking(wakeup_r, False)
+        os.set_blocking(wakeup_w, False)
+
+        def stop(signum: int, frame):
+            self.running = False
+
+        # Signals only wake up the selector, and are handled in the loop
+        signal.set_wakeup_fd(wakeup_w)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.selector.register(listener, selectors.EVENT_READ)
+        self.selector.register(wakeup_r, selectors.EVENT_READ)
+        self.running = True
+        click.echo(f"execenv server v{__version__} listening on {self.path}", err=True)
+
+        try:
+            while self.running:
+                for key, _ in self.selector.select():
+                    if key.fileobj is listener:
+                        self._accept(listener)
+                    elif key.fileobj == wakeup_r:
+                        while True:
+                            try:
+                                if not os.read(wakeup_r, 4096):
+                                    break
+                            except BlockingIOError:
+                                break
+                        self._reap()
+                    else:
+                        self._read(key.data)
+        finally:
+            signal.set_wakeup_fd(-1)
+            self.selector.close()
+            listener.close()
+            os.close(wakeup_r)
+            os.close(wakeup_w)
+            try:
+                self.path.unlink()
+            except OSError:
+                pass
+
+            # Commands still running lose their clients
+            for pid, conn in self.workers.items():
+                self._kill(pid, signal.SIGHUP)
+                conn.close()
+
+    def _accept(self, listener: socket.socket):
+        try:
+            sock, _ = listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        conn = _Connection(sock)
+        self.selector.register(sock, selectors.EVENT_READ, conn)
+
+    def _read(self, conn: _Connection):
+        try:
+            data, ancdata, _, _ = conn.sock.recvmsg(
+                65536, socket.CMSG_SPACE(3 * array("i").itemsize)
+            )
+        except BlockingIOError:
+            return
+        except OSError:
+            data, ancdata = b"", []
+
+        for level, kind, cdata in ancdata:
+            if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                fds = array("i")
+                fds.frombytes(cdata[: len(cdata) - len(cdata) % fds.itemsize])
+                conn.fds.extend(fds)
+
+        if not data:
+            # Client is gone, and so should be its command
+            self.selector.unregister(conn.sock)
+            if conn.pid is None:
+                conn.close()
+            else:
+                self._kill(conn.pid, signal.SIGHUP)
+            return
+
+        conn.buffer += data
+        if conn.pid is None:
+            if len(conn.buffer) < LENGTH.size:
+                return
+            (length,) = LENGTH.unpack_from(conn.buffer)
+            if length > MAX_REQUEST_SIZE:
+                self._reply(conn, STATUS_FALLBACK, 0)
+            elif len(conn.buffer) >= LENGTH.size + length:
+                request = bytes(conn.buffer[LENGTH.size : LENGTH.size + length])
+                del conn.buffer[: LENGTH.size + length]
+                self._start(conn, request)
+        else:
+            while len(conn.buffer) >= SIGNAL.size:
+                (signum,) = SIGNAL.unpack_from(conn.buffer)
+                del conn.buffer[: SIGNAL.size]
+                if signum in {getattr(signal, name) for name in RELAYED_SIGNALS}:
+                    self._kill(conn.pid, signum)
+
+    def _reply(self, conn: _Connection, kind: int, value: int):
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.setblocking(True)
+            conn.sock.sendall(STATUS.pack(kind, value))
+        except OSError:
+            pass
+        conn.close()
+
+    def _kill(self, pid: int, signum: int):
+        try:
+            os.killpg(pid, signum)
+        except OSError:
+            pass
+
+    def _warm(self, cwd: str, argv: List[str]):
+        for value in iter_env_file_args(argv):
+            try:
+                paths = expand_env_paths(os.path.join(cwd, os.path.expanduser(value)))
+                load_env_files(paths, self.env_cache)
+            except Exception:
+                # Left for the worker to report
+                pass
+
+    def _start(self, conn: _Connection, request: bytes):
+        try:
+            version, cwd, umask, limits, argv, env = decode_request(request)
+        except ValueError:
+            version = ""
+
+        # Clients of another version, or with limits the server can not give, run locally
+        if (
+            version != __version__
+            or len(conn.fds) != 3
+            or not _can_apply_limits(limits)
+        ):
+            self._reply(conn, STATUS_FALLBACK, 0)
+            return
+
+        self._warm(cwd, argv)
+
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(conn, cwd, argv, env, umask, limits)
+
+        for fd in conn.fds:
+            os.close(fd)
+        conn.fds.clear()
+        conn.pid = pid
+        self.workers[pid] = conn
+
+    def _run_worker(
+        self,
+        conn: _Connection,
+        cwd: str,
+        argv: List[str],
+        env: Dict[str, str],
+        umask: int,
+        limits: Dict[str, Tuple[int, int]],
+    ):
+        code = 1
+        try:
+            # New session without controlling terminal, so that the terminal of client can be used freely
+            os.setsid()
+            signal.set_wakeup_fd(-1)
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            # Other clients are left to the server
+            for key in list(self.selector.get_map().values()):
+                if isinstance(key.data, _Connection) and key.data is not conn:
+                    key.data.close()
+            self.selector.close()
+
+            for target, fd in enumerate(conn.fds):
+                os.dup2(fd, target)
+                if fd > 2:
+                    os.close(fd)
+            conn.fds.clear()
+            conn.sock.close()
+
+            sys.stdin = os.fdopen(0, "r", closefd=False)
+            sys.stdout = os.fdopen(
+                1, "w", closefd=False, buffering=1 if os.isatty(1) else -1
+            )
+            sys.stderr = os.fdopen(2, "w", closefd=False, buffering=1)
+
+            # Files are created, and resources limited, as in a local run of the client
+            os.umask(umask)
+            _apply_limits(limits)
+
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(env)
+
+            from execenv.cli import execenv
+
+            execenv.main(args=argv, prog_name="execenv", obj={"exec": True})
+            code = 0
+        except SystemExit as e:
+            if isinstance(e.code, int):
+                code = e.code
+            elif e.code is not None:
+                sys.stderr.write(f"{e.code}\n")
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def _reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+
+            conn = self.workers.pop(pid, None)
+            if conn is None:
+                continue
+            if os.WIFSIGNALED(status):
+                self._reply(conn, STATUS_SIGNALED, os.WTERMSIG(status))
+            else:
+                self._reply(conn, STATUS_EXITED, os.WEXITSTATUS(status))
+
+
+def serve(path: Path):
+    """
+    Run server at `path` until interrupted.
+    """
+    if sys.platform == "win32":
+        raise click.UsageError('"--server" is not supported on Windows.')
+
+    # Warm up before serving
+    import execenv.cli  # noqa: F401
+
+    Server(path).serve_forever()
@@ -0,0 +1,320 @@
+from dataclasses import dataclass, field
+from typing import List
+
+import click
+
+from execenv import __version__
+
+# Static completion scripts for Bash, Zsh and Fish, generated from parameters of commands.
+#
+# Unlike click built-in completion, they run no Python process on TAB. Names of variables are completed
+# for `-e` / `-a` (and arguments of `execenv-echo`) from the current environment, and from keys of .env files
+# given with `-f` / `--file` on the command line, looked up in the index `execenv` keeps of files it loaded
+# (see `execenv.completion.update_key_index`).
+
+# Parameters taking names of variables
+KEY_PARAMS = ("env", "append_env")
+
+# Parameters taking paths, but not typed as such to support glob patterns or arguments
+FILE_PARAMS = ("matrix", "source")
+
+# Options loading .env files, whose keys are completed
+FILE_OPTIONS = ("-f", "--file")
+
+# Path of the index as `execenv.completion.get_key_index_path`, for Linux and macOS
+_INDEX = "${EXECENV_CACHE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/execenv}/completion/keys.index"
+
+
+@dataclass
+class OptionSpec:
+    """
+    What an option of a command takes, as far as completion is concerned.
+
+    `kind` is one of `file`, `dir`, `choice`, `key` and `value` (anything, not completed), for the first value.
+    """
+
+    opts: List[str]
+    help: str
+    nargs: int
+    kind: str = "value"
+    choices: List[str] = field(default_factory=list)
+    multiple: bool = False
+
+
+def _summary(help: str) -> str:
+    # First sentence only, to keep menus readable
+    help = " ".join(help.split())
+    end = help.find(". ")
+    return help[: end + 1] if end >= 0 else help
+
+
+def get_option_specs(command: click.Command) -> List[OptionSpec]:
+    specs = []
+    for param in command.params:
+        if not isinstance(param, click.Option) or param.hidden:
+            continue
+
+        spec = OptionSpec(
+            opts=[*param.opts, *param.secondary_opts],
+            help=_summary(param.help or ""),
+            nargs=0 if param.is_flag or param.count else param.nargs,
+            multiple=param.multiple or param.count,
+        )
+        if spec.nargs:
+            if param.name in KEY_PARAMS:
+                spec.kind = "key"
+            elif isinstance(param.type, click.Choice):
+                spec.kind = "choice"
+                spec.choices = list(param.type.choices)
+            elif isinstance(param.type, click.Path) and not param.type.file_okay:
+                spec.kind = "dir"
+            elif (
+                isinstance(param.type, (click.Path, click.File))
+                or param.name in FILE_PARAMS
+            ):
+                spec.kind = "file"
+        specs.append(spec)
+    return specs
+
+
+def _takes_keys(command: click.Command) -> bool:
+    # Whether arguments are names of variables, like `execenv-echo`
+    return any(
+        isinstance(param, click.Argument) and param.name in KEY_PARAMS
+        for param in command.params
+    )
+
+
+def _function_name(command: click.Command) -> str:
+    return "_" + str(command.name).replace("-", "_")
+
+
+def _header(command: click.Command, shell: str) -> str:
+    return f"# {shell} completion for {command.name}, generated by execenv-completion v{__version__}\n# Runs no Python process; regenerate after upgrading execenv\n"
+
+
+def bash_completion(command: click.Command) -> str:
+    """
+    Generate a Bash completion script, to be sourced or put in a `bash-completion` completions directory.
+    """
+    specs = get_option_specs(command)
+    name = _function_name(command)
+
+    actions = {
+        # Left to the default completion of file names
+        "file": "return",
+        "dir": 'compopt -o filenames 2>/dev/null; COMPREPLY=($(compgen -d -- "$cur")); return',
+        "key": f'COMPREPLY=($(compgen -W "$({name}_keys)" -- "$cur")); return',
+        "value": "compopt +o default 2>/dev/null; COMPREPLY=(); return",
+    }
+    cases = []
+    for spec in specs:
+        if not spec.nargs:
+            continue
+        action = (
+            f"COMPREPLY=($(compgen -W '{' '.join(spec.choices)}' -- \"$cur\")); return"
+            if spec.kind == "choice"
+            else actions[spec.kind]
+        )
+        cases.append(
+            f"        {'|'.join(spec.opts)})\n            {action}\n            ;;"
+        )
+
+    # Second values of options taking two, e.g. `-e NAME val`
+    pairs = [opt for spec in specs if spec.nargs == 2 for opt in spec.opts]
+    flags = " ".join(opt for spec in specs for opt in spec.opts)
+    positional = (
+        f'    COMPREPLY=($(compgen -W "$({name}_keys)" -- "$cur"))\n'
+        if _takes_keys(command)
+        else ""
+    )
+
+    return f"""{_header(command, "bash")}
+{name}_keys() {{
+    local index="{_INDEX}"
+    local i target file keys
+    compgen -e
+    [[ -r $index ]] || return 0
+    for ((i = 2; i < COMP_CWORD; i++)); do
+        case ${{COMP_WORDS[i - 1]}} in
+            {"|".join(FILE_OPTIONS)}) ;;
+            *) continue ;;
+        esac
+        target=${{COMP_WORDS[i]}}
+        [[ $target == /* ]] || target="$PWD/$target"
+        target=${{target%/}}
+        while IFS=$'\\t' read -r file keys; do
+            if [[ $file == "$target" || $file == "$target"/* ]]; then
+                printf '%s\\n' $keys
+            fi
+        done <"$index"
+    done
+}}
+
+{name}() {{
+    local cur=${{COMP_WORDS[COMP_CWORD]}} prev=${{COMP_WORDS[COMP_CWORD - 1]}}
+    local i
+    for ((i = 1; i < COMP_CWORD; i++)); do
+        # The rest is the command to run
+        [[ ${{COMP_WORDS[i]}} == -- ]] && return
+    done
+
+    case $prev in
+{chr(10).join(cases)}
+    esac
+    if ((COMP_CWORD > 1)); then
+        case ${{COMP_WORDS[COMP_CWORD - 2]}} in
+            {"|".join(pairs) or '""'})
+                compopt +o default 2>/dev/null
+                COMPREPLY=()
+                return
+                ;;
+        esac
+    fi
+
+    if [[ $cur == -* ]]; then
+        COMPREPLY=($(compgen -W '{flags}' -- "$cur"))
+        return
+    fi
+{positional}}}
+
+complete -o bashdefault -o default -F {name} {command.name}
+"""
+
+
+def _zsh_quote(text: str) -> str:
+    return text.replace("'", "'\\''")
+
+
+def zsh_completion(command: click.Command) -> str:
+    """
+    Generate a Zsh completion script, to be put as `_<command>` in a directory of `fpath`.
+    """
+    name = _function_name(command)
+    actions = {
+        "file": "_files",
+        "dir": "_files -/",
+        "key": f"{name}_keys",
+        "value": " ",
+    }
+
+    lines = []
+    for spec in get_option_specs(command):
+        description = spec.help.replace("[", "(").replace("]", ")").replace(":", "\\:")
+        for opt in spec.opts:
+            line = f"{'*' if spec.multiple else ''}{opt}[{description}]"
+            if spec.nargs:
+                action = (
+                    f"({' '.join(spec.choices)})"
+                    if spec.kind == "choice"
+                    else actions[spec.kind]
+                )
+                line += f":{opt.lstrip('-')}:{action}"
+                line += ":value: " * (spec.nargs - 1)
+            lines.append(f"    '{_zsh_quote(line)}'")
+
+    if _takes_keys(command):
+        lines.append(f"    '*:variable:{name}_keys'")
+    else:
+        lines.append("    '*::command:_normal'")
+
+    arguments = " \\\n".join(lines)
+    return f"""#compdef {command.name}
+{_header(command, "zsh")}
+{name}_keys() {{
+    local index="{_INDEX}"
+    local -a keys
+    local i target file rest
+    keys=(${{(k)parameters[(R)*export*]}})
+    if [[ -r $index ]]; then
+        for ((i = 2; i < CURRENT; i++)); do
+            [[ ${{words[i - 1]}} == ({"|".join(FILE_OPTIONS)}) ]] || continue
+            target=${{(Q)words[i]}}
+            [[ $target == /* ]] || target=$PWD/$target
+            target=${{target%/}}
+            while IFS=$'\\t' read -r file rest; do
+                if [[ $file == $target || $file == $target/* ]]; then
+                    keys+=(${{=rest}})
+                fi
+            done <$index
+        done
+    fi
+    compadd -a keys
+}}
+
+_arguments -s -S \\
+{arguments}
+"""
+
+
+def _fish_quote(text: str) -> str:
+    return "'" + text.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def fish_completion(command: click.Command) -> str:
+    """
+    Generate a Fish completion script, to be put as `<command>.fish` in a directory of `fish_complete_path`.
+    """
+    name = _function_name(command)
+    lines = []
+    for spec in get_option_specs(command):
+        args = [f"complete -c {command.name}"]
+        for opt in spec.opts:
+            if opt.startswith("--"):
+                args.append(f"-l {opt[2:]}")
+            elif len(opt) == 2:
+                args.append(f"-s {opt[1]}")
+            else:
+                args.append(f"-o {opt[1:]}")
+
+        if spec.nargs:
+            if spec.kind == "file":
+                args.append("-r -F")
+            elif spec.kind == "dir":
+                args.append("-x -a '(__fish_complete_directories)'")
+            elif spec.kind == "choice":
+                args.append(f"-x -a {_fish_quote(' '.join(spec.choices))}")
+            elif spec.kind == "key":
+                args.append(f"-x -a '({name}_keys)'")
+            else:
+                args.append("-x")
+        if spec.help:
+            args.append(f"-d {_fish_quote(spec.help)}")
+        lines.append(" ".join(args))
+
+    if _takes_keys(command):
+        lines.append(f"complete -c {command.name} -f -a '({name}_keys)'")
+
+    completions = "\n".join(lines)
+    return f"""{_header(command, "fish")}
+function {name}_keys
+    set -l cache_dir $HOME/.cache/execenv
+    set -q XDG_CACHE_HOME; and set cache_dir $XDG_CACHE_HOME/execenv
+    set -q EXECENV_CACHE_DIR; and set cache_dir $EXECENV_CACHE_DIR
+    set -l index $cache_dir/completion/keys.index
+    set -l tokens (commandline -opc)
+    set -xn
+    test -r $index; or return 0
+    for i in (seq 2 (count $tokens))
+        contains -- $tokens[(math $i - 1)] {" ".join(FILE_OPTIONS)}; or continue
+        set -l target $tokens[$i]
+        string match -q -- '/*' $target; or set target $PWD/$target
+        set target (string trim -r -c / -- $target)
+        while read -l -d \\t file rest
+            if test "$file" = "$target"; or string match -q -- "$target/*" $file
+                string split -n ' ' -- $rest
+            end
+        end <$index
+    end
+end
+
+{completions}
+"""
+
+
+SHELL_COMPLETIONS = {
+    # Shell: generator, file name of the script
+    "bash": (bash_completion, "{name}"),
+    "zsh": (zsh_completion, "_{name}"),
+    "fish": (fish_completion, "{name}.fish"),
+}
@@ -0,0 +1,209 @@
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+from execenv.cache import EnvCache, evict_lru
+
+# `hashlib`, `shutil`, `shlex` and `json` are imported lazily, as sourcing is rare compared to importing `execenv.api`
+
+# Variables a shell sets on its own, which are neither part of the diff nor of the cache key
+SHELL_VARIABLES = frozenset(("_", "SHLVL", "PWD", "OLDPWD", "__PYVENV_LAUNCHER__"))
+
+# Dumps the environment a script leaves behind, separated by NUL as values can contain newlines.
+# Python sets `LC_CTYPE` itself under the C locale (PEP 538), so it is restored to the state given in arguments first.
+_DUMP = (
+    "import os, sys; "
+    "os.environb.update({b'LC_CTYPE': os.fsencode(sys.argv[2])}) if sys.argv[1] else os.environb.pop(b'LC_CTYPE', None); "
+    "sys.stdout.buffer.write(b'\\0'.join(k + b'=' + v for k, v in os.environb.items()))"
+)
+
+FORMAT_VERSION = 1
+
+
+class SourceError(Exception):
+    pass
+
+
+@dataclass
+class EnvDiff:
+    """
+    Changes a sourced script makes to the environment it runs in.
+    """
+
+    changed: Dict[str, str]
+    removed: List[str]
+
+    @classmethod
+    def between(cls, before: Mapping[str, str], after: Mapping[str, str]) -> "EnvDiff":
+        return cls(
+            changed={
+                key: value
+                for key, value in after.items()
+                if key not in SHELL_VARIABLES and before.get(key) != value
+            },
+            removed=[
+                key for key in before if key not in after and key not in SHELL_VARIABLES
+            ],
+        )
+
+    def apply(self, env: Dict[str, str]):
+        env.update(self.changed)
+        for key in self.removed:
+            env.pop(key, None)
+
+
+def _shell(env: Mapping[str, str]) -> List[str]:
+    if sys.platform == "win32":
+        return ["cmd"]
+
+    import shutil
+
+    return [shutil.which("bash", path=env.get("PATH")) or "/bin/sh"]
+
+
+def _run(script: str, args: Sequence[str], env: Mapping[str, str]) -> EnvDiff:
+    # Output of the script goes to stderr, so that stdout only has the dump
+    if sys.platform == "win32":
+        line = subprocess.list2cmdline([script, *args])
+        command: Union[str, List[str]] = f'cmd /d /s /c "call {line} 1>&2 && set"'
+    else:
+        import shlex
+
+        command = [
+            *_shell(env),
+            "-c",
+            f'. "$0" "$@" 1>&2 && exec {shlex.quote(sys.executable)} -c {shlex.quote(_DUMP)} "${{LC_CTYPE+1}}" "${{LC_CTYPE-}}"',
+            script,
+            *args,
+        ]
+
+    try:
+        result = subprocess.run(
+            command, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE
+        )
+    except OSError as e:
+        raise SourceError(f"Failed to source {script} ({e.strerror})")
+    if result.returncode != 0:
+        raise SourceError(f"Failed to source {script} (exit {result.returncode})")
+
+    after: Dict[str, str] = {}
+    if sys.platform == "win32":
+        for line in result.stdout.decode(errors="replace").splitlines():
+            key, sep, value = line.partition("=")
+            # Hidden variables of cmd, like `=C:`, start with "="
+            if sep and key:
+                after[key] = value
+    else:
+        for item in result.stdout.split(b"\0"):
+            key, sep, value = item.partition(b"=")
+            if sep:
+                after[os.fsdecode(key)] = os.fsdecode(value)
+
+    return EnvDiff.between(env, after)
+
+
+def _key(
+    script: str,
+    content: bytes,
+    args: Sequence[str],
+    env: Mapping[str, str],
+    version: str,
+) -> str:
+    import hashlib
+
+    digest = hashlib.sha256()
+    for part in (str(FORMAT_VERSION), version, script, *_shell(env), *args):
+        digest.update(part.encode("utf-8", "surrogatepass") + b"\0")
+    digest.update(hashlib.sha256(content).digest())
+    for key, value in sorted(env.items()):
+        if key not in SHELL_VARIABLES:
+            digest.update(f"{key}={value}\0".encode("utf-8", "surrogatepass"))
+    return digest.hexdigest()
+
+
+def source_script(
+    script: str,
+    args: Sequence[str],
+    env: Mapping[str, str],
+    cache: Optional[EnvCache] = None,
+) -> EnvDiff:
+    """
+    Get changes a shell script makes to given environment, by sourcing it in a shell (`bash`, or `/bin/sh` if not found;
+    `cmd` with `call` on Windows).
+
+    The result is cached (in `source` next to the directory of `cache`) if the cache is enabled, keyed by path and content
+    of the script, its arguments, the shell and the environment it is sourced in, so that later calls with the same
+    inputs do not spawn a shell at all. It is thus assumed that the script only depends on these.
+
+    Raises:
+        SourceError: If the script can not be read, or exits with non-zero code.
+    """
+    script = os.path.abspath(script)
+    if cache is None or not cache.enabled:
+        return _run(script, args, env)
+
+    try:
+        content = Path(script).read_bytes()
+    except OSError as e:
+        raise SourceError(f"Failed to source {script} ({e.strerror})")
+
+    import json
+
+    directory = cache.directory.parent / "source"
+    entry_path = directory / f"{_key(script, content, args, env, cache.version)}.json"
+    try:
+        with open(entry_path, encoding="utf-8") as f:
+            entry = json.load(f)
+        diff = EnvDiff(dict(entry["changed"]), list(entry["removed"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    else:
+        cache.hits += 1
+        # Mark as recently used
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return diff
+
+    cache.misses += 1
+    diff = _run(script, args, env)
+
+    temp_path = entry_path.with_name(f"{entry_path.name}.{os.getpid()}.tmp")
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"changed": diff.changed, "removed": diff.removed}, f)
+        os.replace(temp_path, entry_path)
+    except OSError:
+        # Failing to cache only means sourcing again next time
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        return diff
+
+    evict_lru(directory, cache.max_size, ".json")
+    return diff
+
+
+class SourcedScript:
+    """
+    Layer of `execenv.api.Environment` made by sourcing a script. The diff is kept once known, for `sources`.
+    """
+
+    script: str
+    args: Sequence[str]
+    diff: Optional[EnvDiff]
+
+    def __init__(self, script: str, args: Sequence[str] = ()) -> None:
+        self.script = script
+        self.args = tuple(args)
+        self.diff = None
+
+    def apply(self, env: Dict[str, str], cache: Optional[EnvCache] = None):
+        self.diff = source_script(self.script, self.args, env, cache)
+        self.diff.apply(env)
@@ -0,0 +1,126 @@
+import os
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# `ru_maxrss` is in bytes on macOS and in KiB elsewhere
+MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+@dataclass
+class ResourceUsage:
+    """
+    Resources used by commands, like `/usr/bin/time` reports.
+
+    Only wall time is known on Windows, where the rest is `None`.
+    """
+
+    wall_seconds: float
+    user_seconds: Optional[float] = None
+    system_seconds: Optional[float] = None
+    max_rss_bytes: Optional[int] = None
+    minor_faults: Optional[int] = None
+    major_faults: Optional[int] = None
+    voluntary_context_switches: Optional[int] = None
+    involuntary_context_switches: Optional[int] = None
+
+    @classmethod
+    def from_rusage(
+        cls, wall: float, rusage: Any, before: Any = None
+    ) -> "ResourceUsage":
+        """
+        Create from `resource.struct_rusage`, as the difference from `before` if given.
+        Max RSS is the peak of all processes counted, so it is not a difference.
+        """
+
+        def counter(name: str) -> Any:
+            value = getattr(rusage, name)
+            return value - getattr(before, name) if before is not None else value
+
+        return cls(
+            wall_seconds=wall,
+            user_seconds=counter("ru_utime"),
+            system_seconds=counter("ru_stime"),
+            max_rss_bytes=rusage.ru_maxrss * MAXRSS_UNIT,
+            minor_faults=counter("ru_minflt"),
+            major_faults=counter("ru_majflt"),
+            voluntary_context_switches=counter("ru_nvcsw"),
+            involuntary_context_switches=counter("ru_nivcsw"),
+        )
+
+    def summary(self) -> str:
+        """
+        Format as human-readable lines.
+        """
+        lines = [f"wall      {self.wall_seconds:10.3f} s"]
+        if self.user_seconds is not None and self.system_seconds is not None:
+            lines.append(f"user      {self.user_seconds:10.3f} s")
+            lines.append(f"system    {self.system_seconds:10.3f} s")
+        if self.max_rss_bytes is not None:
+            lines.append(f"max rss   {self.max_rss_bytes / 1024 / 1024:10.1f} MiB")
+        if self.minor_faults is not None:
+            lines.append(
+                f"faults    {self.minor_faults:10d} minor, {self.major_faults} major"
+            )
+        if self.voluntary_context_switches is not None:
+            lines.append(
+                f"switches  {self.voluntary_context_switches:10d} voluntary, {self.involuntary_context_switches} involuntary"
+            )
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _exit_code(status: int) -> int:
+    # `os.waitstatus_to_exitcode` is only available since Python 3.9
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def wait(process: subprocess.Popen, started: float) -> ResourceUsage:
+    """
+    Wait for a process started at `started` (`time.perf_counter()`), and get resources it used.
+
+    The process is reaped with `os.wait4` where available, which reports its own usage
+    without counting other children. `process.returncode` is set as `process.wait()` does.
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return ResourceUsage(wall_seconds=time.perf_counter() - started)
+
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = _exit_code(status)
+    return ResourceUsage.from_rusage(wall, rusage)
+
+
+def children_usage() -> Tuple[float, Any]:
+    """
+    Get a snapshot of resources used by all waited children so far, see `children_usage_since`.
+    """
+    try:
+        import resource
+    except ImportError:
+        return time.perf_counter(), None
+
+    return time.perf_counter(), resource.getrusage(resource.RUSAGE_CHILDREN)
+
+
+def children_usage_since(snapshot: Tuple[float, Any]) -> ResourceUsage:
+    """
+    Get resources used by children waited since a snapshot from `children_usage`, e.g. all commands of a batch.
+    """
+    started, before = snapshot
+    wall = time.perf_counter() - started
+    if before is None:
+        return ResourceUsage(wall_seconds=wall)
+
+    import resource
+
+    return ResourceUsage.from_rusage(
+        wall, resource.getrusage(resource.RUSAGE_CHILDREN), before
+    )
@@ -1,4 +1,4 @@
-from typing import Any, Callable, Union
+from typing import Any, Callable, Optional, Union
 
 from click import Command, Context, Option, Parameter
 
@@ -47,3 +47,57 @@ def add_help_callback(
         return f
 
     return decorator
+
+
+def _rich_help_config() -> Any:
+    import rich_click  # type: ignore
+    from rich.highlighter import ReprHighlighter
+
+    return rich_click.RichHelpConfiguration(highlighter=ReprHighlighter())
+
+
+class LazyRichCommand(Command):
+    """
+    `click.Command` which only reaches for `rich_click` and package metadata when help is actually rendered.
+
+    Keeps the plain "set env and run" path free of rich, rich-click and `importlib.metadata` imports.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        help_factory: Optional[Callable[[], str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.help_factory = help_factory
+
+    def get_help(self, ctx: Context) -> str:
+        if self.help is None and self.help_factory is not None:
+            self.help = self.help_factory()
+
+        # Optional rich feature
+        try:
+            import rich_click  # type: ignore
+        except ImportError:
+            return super().get_help(ctx)
+
+        rich_command = rich_click.RichCommand(
+            name=self.name,
+            context_settings=self.context_settings,
+            params=self.params,
+            help=self.help,
+            epilog=self.epilog,
+            short_help=self.short_help,
+            options_metavar=self.options_metavar,
+            add_help_option=self.add_help_option,
+            no_args_is_help=self.no_args_is_help,
+        )
+        rich_ctx = rich_click.RichContext(
+            rich_command,
+            parent=ctx.parent,
+            info_name=ctx.info_name,
+            default_map=ctx.default_map,
+            rich_help_config=_rich_help_config(),
+        )
+        return rich_command.get_help(rich_ctx)
@@ -1,47 +1,68 @@
 import os
-from typing import Any, Dict, Optional, TypedDict
+from typing import Any, Dict, Iterator, Optional, Tuple, TypedDict
 
 import click
 
-try:
-    from rich.console import Console
-    from rich.pretty import pretty_repr
-    from rich.rule import Rule
-    from rich.theme import Theme
 
-    USE_RICH = True
+def _rich_console() -> Any:
+    """
+    Import `rich` only when verbose info is actually shown. Returns `None` if it is not installed.
+    """
+    try:
+        from rich.console import Console
+        from rich.theme import Theme
+    except ImportError:
+        return None
 
-    console = Console(theme=Theme({"rule.line": "gold3"}))
-except ImportError:
-    USE_RICH = False
+    return Console(theme=Theme({"rule.line": "gold3"}))
 
 
 class VerboseItem(TypedDict):
     data: Any
     level: int
+    lazy: bool
 
 
 class VerboseInfo:
+    """
+    Info shown in verbose mode, collected only if it would be shown and formatted only when shown.
+    """
+
     data: Dict[str, VerboseItem]
     level: Optional[int]
 
     def __init__(self, raw_data: Dict[str, Any], raw_level: Optional[int]) -> None:
         self.data = {}
         self.level = raw_level
-        for key, value in raw_data.items():
-            self.data[key] = VerboseItem(data=value, level=1)
+        if self.level and self.level > 0:
+            for key, value in raw_data.items():
+                self.data[key] = VerboseItem(data=value, level=1, lazy=False)
+
+    def add(self, key: str, data: Any, level: int, lazy: bool = False):
+        """
+        Add info shown from given level on.
 
-    def add(self, key: str, data: Any, level: int):
-        self.data[key] = VerboseItem(data=data, level=level)
+        If `lazy`, `data` is a function without arguments called only when the info is shown,
+        for info expensive to get.
+        """
+        if self.level and self.level >= level:
+            self.data[key] = VerboseItem(data=data, level=level, lazy=lazy)
+
+    def _items(self) -> Iterator[Tuple[str, Any]]:
+        for key, value in self.data.items():
+            yield key, value["data"]() if value["lazy"] else value["data"]
 
     def show(self):
         if self.level and self.level > 0:
-            if USE_RICH:
+            console = _rich_console()
+            if console is not None:
+                from rich.pretty import pretty_repr
+                from rich.rule import Rule
+
                 console.print(Rule(__package__, characters="="))
 
-                for key, value in self.data.items():
-                    if self.level >= value["level"]:
-                        console.print(f"{key}: {pretty_repr(value['data'])}")
+                for key, data in self._items():
+                    console.print(f"{key}: {pretty_repr(data)}")
 
                 console.print(Rule(characters="="))
             else:
@@ -55,7 +76,6 @@ class VerboseInfo:
                 rule_line = "=" * width_with_title
 
                 click.echo(f"{rule_line} {__package__} {rule_line}")
-                for key, value in self.data.items():
-                    if self.level >= value["level"]:
-                        click.echo(f"{key}: {value['data']}")
+                for key, data in self._items():
+                    click.echo(f"{key}: {data}")
                 click.echo("=" * width)
@@ -0,0 +1,247 @@
+import os
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple, Union
+
+import click
+
+from execenv.output import Tee
+
+# Time to wait for more changes after one is seen, so that a burst of writes (e.g. an editor saving) restarts once
+DEBOUNCE = 0.1
+
+# Interval of checking files with `stat` where inotify is not available
+POLL_INTERVAL = 0.25
+
+# Interval of checking whether the command exited, while waiting for changes
+CHECK_INTERVAL = 0.5
+
+# Constants from `<sys/inotify.h>`
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# wd, mask, cookie, len
+_EVENT = struct.Struct("iIII")
+
+
+class _StatBackend:
+    """
+    Detects changes by comparing results of `stat` of each file periodically.
+    """
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        self.signatures = {path: self._signature(path) for path in paths}
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, ...]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_dev)
+
+    def wait(self, timeout: float) -> Set[str]:
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, signature in self.signatures.items():
+                current = self._signature(path)
+                if current != signature:
+                    self.signatures[path] = current
+                    changed.add(path)
+
+            remaining = deadline - time.monotonic()
+            if changed or remaining <= 0:
+                return changed
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self):
+        pass
+
+
+class _InotifyBackend:
+    """
+    Detects changes with inotify on Linux, called via `ctypes` to avoid extra dependencies.
+
+    Directories of files are watched instead of the files themselves, so that files replaced by renaming
+    (as many editors save) are still followed.
+    """
+
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, paths: Iterable[str]) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # Absolute path of each file to the path given
+        self.paths = {os.path.abspath(path): path for path in paths}
+        self.watches: Dict[int, str] = {}
+        try:
+            for directory in {os.path.dirname(path) for path in self.paths}:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"Failed to watch {directory}")
+                self.watches[wd] = directory
+        except BaseException:
+            os.close(self.fd)
+            raise
+
+    def wait(self, timeout: float) -> Set[str]:
+        deadline = time.monotonic() + timeout
+        changed: Set[str] = set()
+        # Events of other files in the same directories are skipped, until one of watched files changes
+        while not changed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ready, _, _ = select.select([self.fd], [], [], remaining)
+            if not ready:
+                break
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                directory = self.watches.get(wd)
+                if directory is not None:
+                    path = self.paths.get(os.path.join(directory, os.fsdecode(name)))
+                    if path is not None:
+                        changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Watcher:
+    """
+    Watches files for changes, with inotify where available (Linux) and by polling `stat` otherwise.
+    """
+
+    def __init__(self, paths: Iterable[str], debounce: float = DEBOUNCE) -> None:
+        paths = list(paths)
+        self.debounce = debounce
+        self.backend: Union[_StatBackend, _InotifyBackend]
+        try:
+            if not sys.platform.startswith("linux"):
+                raise OSError("inotify is only available on Linux")
+            self.backend = _InotifyBackend(paths)
+        except (OSError, AttributeError):
+            # No inotify, or out of watches
+            self.backend = _StatBackend(paths)
+
+    def wait(self, timeout: float) -> Set[str]:
+        """
+        Wait up to `timeout` seconds for changes, and get the paths changed. Changes following within `debounce`
+        seconds of each other are reported together.
+        """
+        changed = self.backend.wait(timeout)
+        while changed:
+            more = self.backend.wait(self.debounce)
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def close(self):
+        self.backend.close()
+
+
+def stop(process: subprocess.Popen, grace_period: float):
+    """
+    Stop a process gracefully: terminate it (`SIGTERM`), and kill it if it is still alive after `grace_period` seconds.
+    """
+    if process.poll() is not None:
+        return
+
+    process.terminate()
+    try:
+        process.wait(grace_period)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_watched(
+    start: Callable[[], subprocess.Popen],
+    reload: Callable[[Set[str]], bool],
+    paths: Iterable[str],
+    grace_period: float,
+    tee: Optional[Tee] = None,
+):
+    """
+    Run the command started by `start`, and restart it whenever some of `paths` change and `reload`
+    (called with the changed paths) returns `True`, i.e. the environment actually changed.
+
+    Output of the command is streamed through `tee` if given. The command exiting on its own does not stop watching,
+    it is started again on the next change. Runs until interrupted, e.g. by Ctrl-C.
+    """
+    watcher = Watcher(paths)
+    process: Optional[subprocess.Popen] = None
+    streaming: Optional[threading.Thread] = None
+
+    def restart():
+        nonlocal process, streaming
+        if process is not None:
+            stop(process, grace_period)
+        if streaming is not None:
+            streaming.join()
+
+        process = start()
+        if tee is not None:
+            streaming = threading.Thread(
+                target=tee.stream, args=(process.stdout, process.stderr), daemon=True
+            )
+            streaming.start()
+
+    try:
+        restart()
+        reported = False
+        while True:
+            changed = watcher.wait(CHECK_INTERVAL)
+
+            assert process is not None
+            if not reported and process.poll() is not None:
+                if streaming is not None:
+                    streaming.join()
+                click.secho(
+                    f"{__package__}: command exited with {process.returncode}, waiting for changes",
+                    fg="yellow",
+                    err=True,
+                )
+                reported = True
+
+            if changed and reload(changed):
+                click.secho(
+                    f"{__package__}: {', '.join(sorted(changed))} changed, restarting",
+                    fg="yellow",
+                    err=True,
+                )
+                restart()
+                reported = False
+    finally:
+        watcher.close()
+        if process is not None:
+            stop(process, grace_period)
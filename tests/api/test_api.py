@@ -0,0 +1,126 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import Environment, arun, get_shell_env_varref_format, run
+
+ECHO_KEY = [sys.executable, "-c", "import os; print(os.environ.get('KEY', ''))"]
+
+
+def test_environment_starts_from_current():
+    os.environ["EXECENV_API_TEST"] = "VAL"
+    assert Environment().build()["EXECENV_API_TEST"] == "VAL"
+
+
+def test_environment_layers(tmp_path: Path):
+    env_file = tmp_path / "file.env"
+    env_file.write_text("KEY=file\nOTHER=file\n")
+    env = (
+        Environment()
+        .clear()
+        .load_file(env_file)
+        .set("OTHER", "set")
+        .append("KEY", "appended", ",")
+    )
+    assert env.build() == {"KEY": "file,appended", "OTHER": "set"}
+
+
+def test_environment_load_opened_file():
+    env = Environment().clear().load_file(io.StringIO("KEY=VAL\n"))
+    assert env.build() == {"KEY": "VAL"}
+
+
+def test_environment_build_is_reused_until_changed():
+    env = Environment().clear().set("KEY", "VAL")
+    built = env.build()
+    assert env.build() is built
+    env.set("KEY", "CHANGED")
+    assert env.build() == {"KEY": "CHANGED"}
+
+
+def test_environment_copy():
+    base = Environment().clear().set("KEY", "VAL")
+    copy = base.copy().set("KEY", "CHANGED")
+    assert base.build() == {"KEY": "VAL"}
+    assert copy.build() == {"KEY": "CHANGED"}
+
+
+def test_environment_copy_on_write():
+    base = Environment().set("KEY", "VAL")
+    built = base.build()
+    copies = [base.copy().set("KEY", str(i)) for i in range(3)]
+
+    assert [copy.build()["KEY"] for copy in copies] == ["0", "1", "2"]
+    assert base.build() is built
+    assert built["KEY"] == "VAL"
+
+
+def test_environment_sources(tmp_path: Path):
+    os.environ["EXECENV_API_TEST"] = "VAL"
+    env_file = tmp_path / "file.env"
+    env_file.write_text("KEY=file\nOTHER=file\n")
+    env = (
+        Environment()
+        .load_file(env_file)
+        .set("OTHER", "set")
+        .append("KEY", "appended")
+        .append("NEW", "appended", source="-a")
+    )
+    sources = env.sources()
+    assert sources["EXECENV_API_TEST"] == "os"
+    assert sources["KEY"] == f"{env_file} + append"
+    assert sources["OTHER"] == "set"
+    assert sources["NEW"] == "-a"
+    assert sources.keys() == env.build().keys()
+
+
+def test_run():
+    env = Environment().set("KEY", "VAL")
+    result = run(ECHO_KEY, env, capture_output=True, text=True)
+    assert result.returncode == 0
+    assert result.stdout.strip() == "VAL"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX shell syntax")
+def test_run_with_shell_and_varref_prefix():
+    result = run(
+        ["echo", "EXECENV_KEY"],
+        {"KEY": "VAL"},
+        shell=True,
+        env_varref_prefix="EXECENV_",
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "VAL"
+    assert get_shell_env_varref_format("KEY") == "$KEY"
+
+
+def test_arun_concurrently():
+    env = Environment()
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                arun(ECHO_KEY, env.copy().set("KEY", str(i)), capture_output=True)
+                for i in range(32)
+            )
+        )
+
+    results = asyncio.run(main())
+    assert [result.stdout.strip() for result in results] == [
+        str(i).encode() for i in range(32)
+    ]
+
+
+def test_arun_input_and_check():
+    cat = [sys.executable, "-c", "import sys; sys.stdout.write(sys.stdin.read())"]
+    result = asyncio.run(arun(cat, input=b"hello", capture_output=True))
+    assert result.stdout == b"hello"
+
+    with pytest.raises(subprocess.CalledProcessError):
+        asyncio.run(arun([sys.executable, "-c", "exit(3)"], check=True))
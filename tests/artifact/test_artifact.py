@@ -0,0 +1,302 @@
+import os
+import re
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import Environment, execenv
+from execenv.artifact import (
+    FORMAT_VERSION,
+    PREFIX,
+    ArtifactError,
+    CompiledEnv,
+    Recipe,
+    read_artifact,
+    write_artifact,
+)
+from execenv.cache import EnvCache
+from tests.conftest import CliTester
+
+PRINT_ENV = "import os; print(os.environ.get('HOST'), os.environ.get('URL'), os.environ['PATH'].split(os.pathsep)[-1])"
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    return EnvCache(tmp_path / "cache" / "env", version="test")
+
+
+@pytest.fixture
+def env_file(tmp_path: Path):
+    path = tmp_path / "app.env"
+    path.write_text("HOST=db\nURL=pg://${HOST}:5432\n")
+    return path
+
+
+def compile_to(
+    path: Path, env_file: Path, cache: EnvCache, clear: bool = False
+) -> Environment:
+    environment = Environment(cache, interpolate=True)
+    if clear:
+        environment.clear()
+    environment.load_file(env_file).set("HOST", "cache").append("PATH", "/opt/bin")
+    recipe = Recipe(
+        clear=clear,
+        files=[str(env_file)],
+        env={"HOST": "cache"},
+        append=[("PATH", "/opt/bin", os.pathsep)],
+    )
+    write_artifact(path, recipe, environment.compile())
+    return environment
+
+
+def test_compile_appends_to_current_environment(
+    tmp_path: Path, env_file: Path, cache: EnvCache, monkeypatch: pytest.MonkeyPatch
+):
+    compiled = compile_to(tmp_path / "env.bin", env_file, cache).compile()
+    assert compiled == CompiledEnv(
+        changed={"HOST": "cache", "URL": "pg://db:5432"},
+        appends=[("PATH", "/opt/bin", os.pathsep)],
+    )
+
+    # Appends apply to the environment the artifact is loaded into
+    monkeypatch.setenv("PATH", "/runtime/bin")
+    env = Environment(cache, interpolate=True).load_compiled(tmp_path / "env.bin")
+    merged = env.build()
+    assert merged["PATH"] == f"/runtime/bin{os.pathsep}/opt/bin"
+    assert merged["URL"] == "pg://db:5432"
+    assert env.sources()["HOST"] == str(tmp_path / "env.bin")
+    assert env.sources()["PATH"] == f"os + {tmp_path / 'env.bin'}"
+
+
+def test_compile_cleared(tmp_path: Path, env_file: Path, cache: EnvCache):
+    compile_to(tmp_path / "env.bin", env_file, cache, clear=True)
+    artifact = read_artifact(tmp_path / "env.bin")
+    assert artifact.clear
+    assert artifact.stale is None
+    assert artifact.compiled is not None
+    assert artifact.compiled.appends == []
+
+    merged = (
+        Environment(cache, interpolate=True)
+        .set("DROPPED", "1")
+        .load_compiled(artifact)
+        .build()
+    )
+    assert merged == {"HOST": "cache", "URL": "pg://db:5432", "PATH": "/opt/bin"}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Script is a POSIX shell script")
+def test_compile_removed_then_appended(
+    tmp_path: Path, cache: EnvCache, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("EXECENV_TEST_REMOVED", "1")
+    script = tmp_path / "unset.sh"
+    script.write_text("unset EXECENV_TEST_REMOVED\n")
+
+    environment = Environment(cache, interpolate=True).source(script)
+    assert environment.compile().removed == ["EXECENV_TEST_REMOVED"]
+
+    # Appending to a removed variable sets it, whatever the environment loaded into has
+    environment.append("EXECENV_TEST_REMOVED", "new")
+    compiled = environment.compile()
+    assert compiled.changed == {"EXECENV_TEST_REMOVED": "new"}
+    assert compiled.removed == []
+    assert compiled.appends == []
+
+
+def test_compile_keeps_values_equal_to_current_environment(
+    tmp_path: Path, cache: EnvCache, monkeypatch: pytest.MonkeyPatch
+):
+    env_file = tmp_path / "lang.env"
+    env_file.write_text("LANG=C.UTF-8\n")
+    monkeypatch.setenv("LANG", "C.UTF-8")
+    monkeypatch.setenv("HOME", "/home/build")
+    environment = (
+        Environment(cache, interpolate=True)
+        .load_file(env_file)
+        .set("HOME", "/home/build")
+    )
+    write_artifact(
+        tmp_path / "env.bin",
+        Recipe(files=[str(env_file)], env={"HOME": "/home/build"}),
+        environment.compile(),
+    )
+
+    # Loaded on a host with other values, as if loading the inputs there
+    monkeypatch.setenv("LANG", "en_US.UTF-8")
+    monkeypatch.setenv("HOME", "/home/run")
+    merged = (
+        Environment(cache, interpolate=True).load_compiled(tmp_path / "env.bin").build()
+    )
+    assert merged["LANG"] == "C.UTF-8"
+    assert merged["HOME"] == "/home/build"
+
+
+def test_stale_artifact_falls_back(tmp_path: Path, env_file: Path, cache: EnvCache):
+    compile_to(tmp_path / "env.bin", env_file, cache)
+
+    # Touched only, with the same content
+    os.utime(env_file, ns=(0, 0))
+    assert read_artifact(tmp_path / "env.bin").stale is None
+
+    env_file.write_text("HOST=other\nURL=pg://${HOST}\n")
+    artifact = read_artifact(tmp_path / "env.bin")
+    assert artifact.stale == f"{env_file} changed"
+    assert artifact.compiled is None
+
+    merged = Environment(cache, interpolate=True).load_compiled(artifact).build()
+    assert merged["URL"] == "pg://other"
+    assert merged["HOST"] == "cache"
+
+
+def test_stale_artifact_with_missing_input(tmp_path: Path, cache: EnvCache):
+    a, b = tmp_path / "a.env", tmp_path / "b.env"
+    a.write_text("A=1\n")
+    b.write_text("B=1\n")
+    environment = Environment(cache).load_file(a).load_file(b)
+    write_artifact(
+        tmp_path / "env.bin",
+        Recipe(files=[str(a), str(b)]),
+        environment.compile(),
+    )
+
+    a.write_text("A=2\n")
+    b.unlink()
+    with pytest.raises(ArtifactError, match=f"as {re.escape(str(b))} is missing"):
+        Environment(cache).load_compiled(tmp_path / "env.bin")
+
+
+def test_stale_once_referenced_variable_changes(
+    tmp_path: Path, cache: EnvCache, monkeypatch: pytest.MonkeyPatch
+):
+    env_file = tmp_path / "path.env"
+    env_file.write_text("MYPATH=${MYPATH}:/opt/bin\nOTHER=${UNSET_AT_BUILD:-x}\n")
+    monkeypatch.setenv("MYPATH", "/build/host")
+    monkeypatch.delenv("UNSET_AT_BUILD", raising=False)
+    environment = Environment(cache, interpolate=True).load_file(env_file)
+    compiled = environment.compile()
+    assert compiled.host == {"MYPATH": "/build/host", "UNSET_AT_BUILD": None}
+    write_artifact(tmp_path / "env.bin", Recipe(files=[str(env_file)]), compiled)
+    assert read_artifact(tmp_path / "env.bin").stale is None
+
+    # Built from inputs instead, the same as loading them
+    monkeypatch.setenv("MYPATH", "/runtime")
+    artifact = read_artifact(tmp_path / "env.bin")
+    assert artifact.stale == "$MYPATH changed"
+    merged = Environment(cache, interpolate=True).load_compiled(artifact).build()
+    assert merged["MYPATH"] == "/runtime:/opt/bin"
+
+    monkeypatch.setenv("MYPATH", "/build/host")
+    monkeypatch.setenv("UNSET_AT_BUILD", "")
+    assert read_artifact(tmp_path / "env.bin").stale == "$UNSET_AT_BUILD changed"
+
+
+def test_missing_inputs_are_not_stale(tmp_path: Path, env_file: Path, cache: EnvCache):
+    compile_to(tmp_path / "env.bin", env_file, cache)
+    env_file.unlink()
+    assert read_artifact(tmp_path / "env.bin").compiled is not None
+
+
+def test_other_format_version_falls_back(
+    tmp_path: Path, env_file: Path, cache: EnvCache, monkeypatch: pytest.MonkeyPatch
+):
+    import execenv.artifact
+
+    monkeypatch.setattr(execenv.artifact, "FORMAT_VERSION", 99)
+    compile_to(tmp_path / "env.bin", env_file, cache)
+    monkeypatch.undo()
+
+    artifact = read_artifact(tmp_path / "env.bin")
+    assert artifact.stale == f"format version 99, expected {FORMAT_VERSION}"
+    assert (
+        Environment(cache, interpolate=True).load_compiled(artifact).build()["HOST"]
+        == "cache"
+    )
+
+
+def test_corrupted_artifact(tmp_path: Path, env_file: Path, cache: EnvCache):
+    path = tmp_path / "env.bin"
+    compile_to(path, env_file, cache)
+    data = bytearray(path.read_bytes())
+    data[PREFIX.size] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(ArtifactError, match="checksum mismatch"):
+        read_artifact(path)
+
+    path.write_bytes(b"HOST=db\n")
+    with pytest.raises(ArtifactError, match="not a valid artifact"):
+        read_artifact(path)
+    with pytest.raises(ArtifactError, match="Failed to open"):
+        read_artifact(tmp_path / "missing.bin")
+
+
+def test_compile_option(tester: CliTester, tmp_path: Path, env_file: Path):
+    artifact = tmp_path / "env.bin"
+    (
+        tester.run_command(execenv)
+        .with_option("--compile", str(artifact))
+        .with_option("--interpolate")
+        .with_option("-f", str(env_file))
+        .with_option("-e", "HOST", "cache")
+        .with_option("-a", "PATH", "/opt/bin")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("")
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("-F", str(artifact))
+        .with_option("--interpolate")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", PRINT_ENV)
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("cache pg://db:5432 /opt/bin\n")
+    )
+
+    env_file.write_text("HOST=db\nURL=changed\n")
+    (
+        tester.run_command(execenv)
+        .with_option("-F", str(artifact))
+        .with_option("--interpolate")
+        .with_option("-e", "HOST", "override")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", PRINT_ENV)
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout("override changed /opt/bin\n")
+        .should_have_stderr_contains("is stale")
+    )
+
+
+def test_compile_option_conflicts(tester: CliTester, tmp_path: Path):
+    (
+        tester.run_command(execenv)
+        .with_option("--compile", str(tmp_path / "env.bin"))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("COMMAND can not be used with")
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--compile", str(tmp_path / "env.bin"))
+        .with_option("-f", "-")
+        .execute_and_its_result(input="KEY=VAL\n")
+        .should_fail(2)
+        .should_have_stderr_contains('can not be used with "-f -"')
+    )
+
+
+def test_artifact_option_invalid(tester: CliTester, env_file: Path):
+    (
+        tester.run_command(execenv)
+        .with_option("-F", str(env_file))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("not a valid artifact")
+    )
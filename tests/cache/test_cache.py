@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.cache import EnvCache
+from tests.conftest import CliTester
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    return EnvCache(tmp_path / "cache", version="test")
+
+
+@pytest.fixture
+def env_file(tmp_path: Path):
+    path = tmp_path / "test.env"
+    path.write_text('KEY=VAL\nQUOTED="multi\\nline"\nUNICODE=值\n')
+    return path
+
+
+def _load(cache: EnvCache, path: Path):
+    with open(path) as f:
+        return cache.load(f)
+
+
+def test_cache_hit(cache: EnvCache, env_file: Path):
+    expected = {"KEY": "VAL", "QUOTED": "multi\nline", "UNICODE": "值"}
+    assert _load(cache, env_file) == expected
+    assert _load(cache, env_file) == expected
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_cache_invalidated_on_change(cache: EnvCache, env_file: Path):
+    _load(cache, env_file)
+    env_file.write_text("KEY=CHANGED\n")
+    assert _load(cache, env_file) == {"KEY": "CHANGED"}
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_cache_invalidated_on_version(tmp_path: Path, env_file: Path):
+    _load(EnvCache(tmp_path / "cache", version="old"), env_file)
+    cache = EnvCache(tmp_path / "cache", version="new")
+    _load(cache, env_file)
+    assert cache.stats() == {"hits": 0, "misses": 1}
+
+
+def test_cache_corrupted_entry(cache: EnvCache, env_file: Path):
+    _load(cache, env_file)
+    for entry in cache.directory.iterdir():
+        entry.write_bytes(entry.read_bytes()[:-3])
+    assert _load(cache, env_file)["KEY"] == "VAL"
+    assert cache.stats() == {"hits": 0, "misses": 2}
+
+
+def test_cache_disabled(tmp_path: Path, env_file: Path):
+    cache = EnvCache(tmp_path / "cache", enabled=False)
+    _load(cache, env_file)
+    assert cache.stats() == {"hits": 0, "misses": 0}
+    assert not cache.directory.exists()
+
+
+def test_cache_eviction(tmp_path: Path):
+    cache = EnvCache(tmp_path / "cache", max_size=256)
+    for i in range(8):
+        path = tmp_path / f"{i}.env"
+        path.write_text(f"KEY_{i}={'x' * 64}\n")
+        _load(cache, path)
+        # Make sure every entry has a distinct access time
+        os.utime(next(cache.directory.glob("*.bin")), ns=(i, i))
+
+    entries = list(cache.directory.glob("*.bin"))
+    assert sum(entry.stat().st_size for entry in entries) <= 256
+    assert len(entries) < 8
+
+
+def test_cache_stats_in_verbose(tester: CliTester, env_file: Path):
+    for _ in range(2):
+        result = (
+            tester.run_command(execenv)
+            .with_option("-f", str(env_file))
+            .with_option("-vv")
+            .with_end_of_options()
+            .with_arguments("python", "-c", "")
+            .execute_and_its_result()
+            .should_pass()
+        )
+    result.should_have_stdout_contains("'misses': 0")
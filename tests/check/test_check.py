@@ -0,0 +1,172 @@
+import json
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv_check
+from execenv.check import (
+    PARALLEL_THRESHOLD,
+    check_env_files,
+    check_file,
+    check_source,
+    find_env_files,
+)
+from tests.conftest import CliTester
+
+
+def codes(src: str):
+    return [(line, code) for line, _, code, _ in check_source(src)["problems"]]
+
+
+def test_clean():
+    assert codes("# comment\n\nKEY=VAL\nexport OTHER='a # b'\nMULTI=\"x\ny\"\n") == []
+
+
+def test_unparsed_lines():
+    assert codes("KEY=VAL\nPORT 8080\n  # comment\n= nothing\n") == [
+        (2, "unparsed-line"),
+        (4, "unparsed-line"),
+    ]
+
+
+def test_multiline_value_covers_lines():
+    # Lines inside a quoted value are part of the pair, not unparsed
+    assert codes("KEY='first\nsecond line\nthird'\nAFTER=1\n") == []
+
+
+def test_quoting_problems():
+    assert codes("A=\"open\nB=foo#bar\nC=foo #comment\nD='ok'\n") == [
+        (1, "unterminated-quote"),
+        (2, "truncated-value"),
+    ]
+
+
+def test_duplicate_keys():
+    result = check_source("KEY=1\nOTHER=2\r\nKEY=3\n")
+    assert result["keys"] == [("KEY", 1), ("OTHER", 2), ("KEY", 3)]
+    assert [problem[:3] for problem in result["problems"]] == [
+        (3, "warning", "duplicate-key")
+    ]
+
+
+def test_find_stacks(tmp_path: Path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "20-prod.env").write_text("")
+    (tmp_path / "app" / "10-base.env").write_text("")
+    (tmp_path / "app" / ".env").write_text("")
+    (tmp_path / "app" / ".env.local").write_text("")
+    (tmp_path / "app" / "README.md").write_text("")
+    (tmp_path / ".git").mkdir()
+    (tmp_path / ".git" / "x.env").write_text("")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "x.env").write_text("")
+    (tmp_path / "one.env").write_text("")
+
+    app = tmp_path / "app"
+    assert find_env_files([str(tmp_path), "given.env"]) == [
+        ["given.env"],
+        [str(tmp_path / "one.env")],
+        [str(app / "10-base.env"), str(app / "20-prod.env")],
+        [str(app / ".env")],
+        [str(app / ".env.local")],
+    ]
+    assert find_env_files([str(app / "*-*.env")]) == [
+        [str(app / "10-base.env"), str(app / "20-prod.env")]
+    ]
+    with pytest.raises(ValueError, match="No .env file matches"):
+        find_env_files([str(tmp_path / "*.missing")])
+
+    literal = tmp_path / "a[1].env"
+    literal.write_text("KEY=VAL\n")
+    assert find_env_files([str(literal)]) == [[str(literal)]]
+
+
+def test_overridden_keys(tmp_path: Path):
+    (tmp_path / "a.env").write_text("HOST=a\nPORT=1\n")
+    (tmp_path / "b.env").write_text("HOST=b\n")
+    report = check_env_files(find_env_files([str(tmp_path)]), jobs=1)
+    assert [(p.path, p.line, p.code) for p in report.problems] == [
+        (str(tmp_path / "b.env"), 1, "overridden-key")
+    ]
+    assert str(tmp_path / "a.env:1") in report.problems[0].message
+
+
+def test_cache_by_content(tmp_path: Path):
+    path = tmp_path / "a.env"
+    path.write_text("BAD LINE\n")
+    cache_dir = str(tmp_path / "cache")
+    first, cached = check_file(str(path), cache_dir, "test")
+    assert not cached
+    second, cached = check_file(str(path), cache_dir, "test")
+    assert cached
+    assert json.loads(json.dumps(first)) == second
+
+    path.write_text("GOOD=1\n")
+    third, cached = check_file(str(path), cache_dir, "test")
+    assert not cached
+    assert third["problems"] == []
+
+
+def test_unreadable(tmp_path: Path):
+    path = tmp_path / "a.env"
+    path.write_bytes(b"KEY=\xff\n")
+    result, _ = check_file(str(path))
+    assert result["problems"][0][2] == "unreadable"
+
+
+def test_parallel(tmp_path: Path):
+    for i in range(PARALLEL_THRESHOLD + 1):
+        (tmp_path / f"{i:03d}.env").write_text(f"KEY={i}\nBROKEN {i}\n")
+    report = check_env_files(
+        find_env_files([str(tmp_path)]), jobs=2, cache_dir=tmp_path / "cache"
+    )
+    assert report.files == PARALLEL_THRESHOLD + 1
+    assert report.count("error") == PARALLEL_THRESHOLD + 1
+    # Every file but the first overrides KEY
+    assert report.count("note") == PARALLEL_THRESHOLD
+
+
+def test_check_text(tester: CliTester, tmp_path: Path):
+    path = tmp_path / "a.env"
+    path.write_text("KEY=1\nKEY=2\n")
+    (
+        tester.run_command(execenv_check)
+        .with_arguments(str(path))
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout(
+            f"{path}:2: warning: KEY is already set in line 1, which is overridden [duplicate-key]\n"
+        )
+        .should_have_stderr_contains("1 file(s) checked, 0 error(s), 1 warning(s)")
+    )
+    (
+        tester.run_command(execenv_check)
+        .with_option("--strict")
+        .with_arguments(str(path))
+        .execute_and_its_result()
+        .should_fail()
+    )
+
+
+def test_check_json(tester: CliTester, tmp_path: Path):
+    path = tmp_path / "a.env"
+    path.write_text("KEY=1\nnot a pair\n")
+    result = (
+        tester.run_command(execenv_check)
+        .with_option("--format", "json")
+        .with_arguments(str(tmp_path))
+        .execute_and_its_result()
+        .should_fail()
+    )
+    report = json.loads(result.result.stdout)
+    assert report["files"] == 1
+    assert report["errors"] == 1
+    assert report["problems"] == [
+        {
+            "path": str(path),
+            "line": 2,
+            "severity": "error",
+            "code": "unparsed-line",
+            "message": "Line is not a K-V pair and is skipped: 'not a pair'",
+        }
+    ]
@@ -45,6 +45,10 @@ class CliTestResult:
         assert expected not in self.result.stdout
         return self
 
+    def should_have_stderr_contains(self, expected: str):
+        assert expected in self.result.stderr
+        return self
+
 
 @dataclass
 class CliTester:
@@ -135,5 +139,6 @@ def tester():
 
 
 @pytest.fixture(scope="session", autouse=True)
-def test_mode():
+def test_mode(tmp_path_factory: pytest.TempPathFactory):
     os.environ["EXECENV_TEST"] = "1"
+    os.environ["EXECENV_CACHE_DIR"] = str(tmp_path_factory.mktemp("cache"))
@@ -1,10 +1,11 @@
+import io
 import json
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import pytest  # type: ignore
 
-from execenv.dotenv import parse
+from execenv.dotenv import iter_parse, parse
 
 
 def _test_parse_from_file_data():
@@ -66,3 +67,56 @@ def test_parse_with_data_from_file(input_file: Path, output_file: Path):
 def test_parse_with_data_from_string(input: str):
     expected = {"SERVER": "localhost", "PASSWORD": "password", "DB": "tests"}
     assert parse(input) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 4096])
+@pytest.mark.parametrize(**_test_parse_from_file_data())
+def test_iter_parse_with_data_from_file(
+    input_file: Path, output_file: Path, chunk_size: int
+):
+    with open(input_file) as f:
+        parsed_data = dict(iter_parse(f, chunk_size))
+    expected_output: Dict[str, str] = json.loads(output_file.read_text())
+    assert parsed_data == expected_output
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 4096])
+@pytest.mark.parametrize(**_test_parse_from_string_data())
+def test_iter_parse_with_data_from_string(input: str, chunk_size: int):
+    expected = {"SERVER": "localhost", "PASSWORD": "password", "DB": "tests"}
+    assert dict(iter_parse(io.StringIO(input, newline=""), chunk_size)) == expected
+
+
+class _Stream(io.StringIO):
+    """
+    Endless generated .env stream which records how much has been read.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lines: Iterator[str] = (
+            f'KEY_{i}="multi\nline {i}"\n' if i % 2 else f"KEY_{i}=value_{i}\n"
+            for i in range(10**9)
+        )
+        self.read_size = 0
+
+    def read(self, size: Optional[int] = -1) -> str:
+        data = ""
+        while len(data) < (size or 0):
+            data += next(self.lines)
+        self.read_size += len(data)
+        return data
+
+
+def test_iter_parse_is_incremental():
+    stream = _Stream()
+    pairs = iter_parse(stream, chunk_size=1024)
+    parsed_size = 0
+    for i in range(10000):
+        key, value = next(pairs)
+        assert key == f"KEY_{i}"
+        assert value == (f"multi\nline {i}" if i % 2 else f"value_{i}")
+        parsed_size += len(f'{key}="{value}"\n' if i % 2 else f"{key}={value}\n")
+
+    # Only about a chunk ahead of what has been parsed is read
+    assert stream.read_size - parsed_size < 2 * 1024
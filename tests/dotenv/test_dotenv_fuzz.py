@@ -0,0 +1,101 @@
+import random
+import re
+from typing import Dict
+
+import pytest  # type: ignore
+
+from execenv.dotenv import parse
+
+# Regex based implementation replaced by the tokenizer, kept as the reference
+LEGACY_LINE = re.compile(
+    r'^\s*(?:export\s+)?([\w.-]+)(?:\s*=\s*?|:\s+?)(\s*\'(?:\\\'|[^\'])*\'|\s*"(?:\\"|[^"])*"|\s*`(?:\\`|[^`])*`|[^#\r\n]+)?\s*(?:#.*)?$',
+    re.MULTILINE,
+)
+
+# Fragments with special meaning to the parser, mixed to generate inputs
+FRAGMENTS = [
+    "KEY",
+    "k.e-y_1",
+    "export",
+    "export ",
+    "=",
+    ":",
+    ": ",
+    " ",
+    "\t",
+    "\n",
+    "\r",
+    "\r\n",
+    "\x0b",
+    "\x1c",
+    "　",
+    "'",
+    '"',
+    "`",
+    "\\",
+    "\\'",
+    '\\"',
+    "\\`",
+    "\\n",
+    "#",
+    " # comment",
+    "value",
+    "a b",
+    "值",
+    "=",
+    "\n\n",
+]
+
+
+def legacy_parse(src: str) -> Dict[str, str]:
+    obj: Dict[str, str] = {}
+
+    src = src.replace("\r\n", "\n").replace("\r", "\n")
+
+    for match in LEGACY_LINE.findall(src):
+        key = match[0]
+        value = (match[1] or "").strip()
+        maybeQuote = value[0] if value else ""
+        value = re.sub(r"^(['\"`])([\s\S]*)\1$", r"\2", value)
+        if maybeQuote == '"':
+            value = value.replace("\\n", "\n").replace("\\r", "\r")
+        obj[key] = value
+
+    return obj
+
+
+def _random_line(rng: random.Random) -> str:
+    line = rng.choice(["", " ", "export ", "  export\t"])
+    line += rng.choice(["KEY", "k.e-y_1", "export", "A"])
+    line += rng.choice(["=", " = ", ":", ": ", ":\t", " ", "\n="])
+    return line + "".join(rng.choices(FRAGMENTS, k=rng.randint(0, 6)))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parse_matches_legacy_on_fragments(seed: int):
+    rng = random.Random(seed)
+    for _ in range(500):
+        src = "".join(rng.choices(FRAGMENTS, k=rng.randint(0, 20)))
+        assert list(parse(src).items()) == list(legacy_parse(src).items()), repr(src)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_parse_matches_legacy_on_lines(seed: int):
+    rng = random.Random(seed)
+    for _ in range(200):
+        src = "\n".join(_random_line(rng) for _ in range(rng.randint(1, 8)))
+        assert list(parse(src).items()) == list(legacy_parse(src).items()), repr(src)
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        " \n" * 2000 + "x",
+        "K='" + "\\'" * 5000 + "x",
+        "\n".join(f'K{i}="unterminated {i}' for i in range(2000)),
+        "K=" + " " * 5000 + "v",
+    ],
+    ids=["blank-lines", "escaped-quotes", "unterminated-quotes", "spaces"],
+)
+def test_parse_pathological(src: str):
+    assert parse(src) == legacy_parse(src)
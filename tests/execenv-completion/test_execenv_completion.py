@@ -0,0 +1,84 @@
+import sys
+from pathlib import Path
+
+import auto_click_auto  # type: ignore
+import pytest  # type: ignore
+
+from execenv import execenv_completion
+from execenv.completion import enable_completion, get_completion_stamp_path
+from tests.conftest import CliTester
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Click built-in completion is not supported on Windows",
+)
+
+
+@pytest.fixture
+def home(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("SHELL", "/bin/bash")
+    monkeypatch.setenv("EXECENV_CACHE_DIR", str(tmp_path / "cache"))
+    (tmp_path / ".bashrc").touch()
+    return tmp_path
+
+
+def _fail(*args, **kwargs):
+    raise AssertionError("Completion setup should be skipped")
+
+
+def test_install_option(tester: CliTester, home: Path):
+    (
+        tester.run_command(execenv_completion)
+        .with_option("--install")
+        .execute_and_its_result()
+        .should_pass()
+    )
+    assert "_EXECENV_COMPLETE" in (home / ".bashrc").read_text()
+    assert get_completion_stamp_path("execenv").exists()
+
+
+def test_stamp_skips_setup(home: Path, monkeypatch: pytest.MonkeyPatch):
+    enable_completion("execenv")
+    monkeypatch.setattr(auto_click_auto, "enable_click_shell_completion", _fail)
+    enable_completion("execenv")
+
+    with pytest.raises(AssertionError):
+        enable_completion("execenv", force=True)
+
+
+def test_stamp_keyed_by_shell(home: Path, monkeypatch: pytest.MonkeyPatch):
+    enable_completion("execenv")
+    monkeypatch.setenv("SHELL", "/bin/zsh")
+    (home / ".zshrc").touch()
+    enable_completion("execenv")
+    assert "_EXECENV_COMPLETE" in (home / ".zshrc").read_text()
+
+
+def test_static_scripts_turn_off_setup(
+    tester: CliTester, home: Path, monkeypatch: pytest.MonkeyPatch
+):
+    (
+        tester.run_command(execenv_completion)
+        .with_option("-s", "bash")
+        .with_option("-p", str(home))
+        .execute_and_its_result(input="y\n")
+        .should_pass()
+    )
+    assert "_EXECENV_COMPLETE" not in (home / ".bashrc").read_text()
+
+    # Not even after upgrading, unless installed again
+    monkeypatch.setattr(auto_click_auto, "enable_click_shell_completion", _fail)
+    monkeypatch.setattr("execenv.__version__", "0.0.0")
+    enable_completion("execenv")
+    with pytest.raises(AssertionError):
+        enable_completion("execenv", force=True)
+
+
+def test_without_shell_or_install(tester: CliTester):
+    (
+        tester.run_command(execenv_completion)
+        .with_option("-p", ".")
+        .execute_and_its_result()
+        .should_fail(2)
+    )
@@ -0,0 +1,141 @@
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv, execenv_completion
+from execenv.completion import KEY_INDEX_SIZE, get_key_index_path, update_key_index
+from execenv.shell_completion import bash_completion, fish_completion, zsh_completion
+from tests.conftest import CliTester
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32",
+    reason="Bash, Zsh and Fish completion is not supported on Windows",
+)
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setenv("EXECENV_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def _index() -> str:
+    return get_key_index_path().read_text()
+
+
+def test_key_index_updated_by_file_option(
+    tester: CliTester, cache_dir: Path, tmp_path: Path
+):
+    env_file = tmp_path / "test.env"
+    env_file.write_text("ALPHA=1\nBETA=2\n")
+    (
+        tester.run_command(execenv)
+        .with_option("-f", str(env_file))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_pass()
+    )
+    assert _index() == f"{env_file}\tALPHA BETA\n"
+
+    # Loaded from cache, so keys are known not to have changed
+    get_key_index_path().unlink()
+    (
+        tester.run_command(execenv)
+        .with_option("-f", str(env_file))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_pass()
+    )
+    assert not get_key_index_path().exists()
+
+
+def test_key_index_only_rewritten_on_change(cache_dir: Path):
+    update_key_index({"/a.env": ["A"], "/b.env": ["B"]})
+    os.utime(get_key_index_path(), ns=(0, 0))
+    update_key_index({"/b.env": ["B"]})
+    assert get_key_index_path().stat().st_mtime_ns == 0
+
+    # Most recently updated first
+    update_key_index({"/b.env": ["B", "C"]})
+    assert get_key_index_path().stat().st_mtime_ns != 0
+    assert _index() == "/b.env\tB C\n/a.env\tA\n"
+
+
+def test_key_index_bounded(cache_dir: Path):
+    for i in range(KEY_INDEX_SIZE + 10):
+        update_key_index({f"/{i}.env": ["KEY"]})
+    lines = _index().splitlines()
+    assert len(lines) == KEY_INDEX_SIZE
+    assert lines[0] == f"/{KEY_INDEX_SIZE + 9}.env\tKEY"
+
+
+@pytest.mark.skipif(shutil.which("bash") is None, reason="Bash is not installed")
+def test_bash_completion(cache_dir: Path, tmp_path: Path):
+    script = tmp_path / "execenv.bash"
+    script.write_text(bash_completion(execenv))
+    (tmp_path / "test.env").write_text("ALPHA=1\n")
+    update_key_index({str(tmp_path / "test.env"): ["ALPHA", "ALSO"]})
+
+    def complete(*words: str) -> str:
+        result = subprocess.run(
+            [
+                "bash",
+                "-c",
+                'source "$0"; COMP_WORDS=("$@"); COMP_CWORD=$(($# - 1)); _execenv; echo "${COMPREPLY[*]}"',
+                str(script),
+                "execenv",
+                *words,
+            ],
+            cwd=tmp_path,
+            env=dict(os.environ, ALIEN="1"),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return result.stdout.strip()
+
+    assert complete("--out") == "--output"
+    assert complete("--output", "g") == "grouped"
+    assert sorted(complete("-f", "test.env", "-e", "AL").split()) == [
+        "ALIEN",
+        "ALPHA",
+        "ALSO",
+    ]
+    assert complete("-e", "ALPHA", "") == ""
+
+
+def test_zsh_and_fish_completion():
+    zsh = zsh_completion(execenv)
+    assert zsh.startswith("#compdef execenv\n")
+    assert (
+        "'*-e[Set environment variable to given value.]:e:_execenv_keys:value: '" in zsh
+    )
+    assert "'--output[" in zsh and ":output:(prefix grouped)'" in zsh
+
+    fish = fish_completion(execenv)
+    assert (
+        "complete -c execenv -s C -l cwd -x -a '(__fish_complete_directories)'" in fish
+    )
+    assert "complete -c execenv -l fail-fast -l keep-going" in fish
+
+
+@pytest.mark.parametrize(
+    "shell, name", [("bash", "execenv"), ("zsh", "_execenv"), ("fish", "execenv.fish")]
+)
+def test_shell_option_static(
+    tester: CliTester, cache_dir: Path, tmp_path: Path, shell: str, name: str
+):
+    (
+        tester.run_command(execenv_completion)
+        .with_option("-s", shell)
+        .with_option("-p", str(tmp_path))
+        .execute_and_its_result(input="y\n")
+        .should_pass()
+    )
+    assert "no Python process" in (tmp_path / "completions" / name).read_text()
@@ -0,0 +1,170 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.batch import parse_manifest_line
+from tests.conftest import CliTester
+
+
+def _python(code: str) -> str:
+    return json.dumps([sys.executable, "-c", code])
+
+
+@pytest.mark.parametrize(
+    "line, name, args",
+    [
+        ("echo a 'b c'", "3", ["echo", "a", "b c"]),
+        ('["echo", "a b"]', "3", ["echo", "a b"]),
+        ('"echo a"', "3", ["echo", "a"]),
+        ('{"name": "x", "command": ["echo"]}', "x", ["echo"]),
+        ('{"name": "y", "command": "echo a"}', "y", ["echo", "a"]),
+    ],
+)
+def test_parse_manifest_line(line: str, name: str, args: list):
+    command = parse_manifest_line(line, 3)
+    assert command is not None
+    assert (command.name, command.args) == (name, args)
+
+
+@pytest.mark.parametrize("line", ["", "   ", "# comment"])
+def test_parse_manifest_line_skipped(line: str):
+    assert parse_manifest_line(line, 1) is None
+
+
+def test_batch_option(tester: CliTester, tmp_path: Path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(
+        "execenv-echo KEY\n# comment\n\n"
+        + '{"name": "other", "command": ["execenv-echo", "OTHER"]}\n'
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", str(manifest))
+        .with_option("-e", "KEY", "VAL")
+        .with_option("-e", "OTHER", "VAL2")
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout("[1] KEY=VAL\n[other] OTHER=VAL2\n")
+        .should_have_stderr_contains("exit 0")
+        .should_have_stderr_contains("Ran 2 of 2 commands, 0 failed.")
+    )
+
+
+def test_batch_option_from_stdin(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .with_option("-e", "KEY", "VAL")
+        .execute_and_its_result(input="execenv-echo KEY\n")
+        .should_pass(no_stderr=False)
+        .should_have_stdout("[1] KEY=VAL\n")
+    )
+
+
+def test_batch_option_keep_going(tester: CliTester):
+    manifest = "\n".join(
+        [
+            _python("import sys; print('a'); sys.exit(3)"),
+            _python("import sys; sys.exit(4)"),
+            _python("print('c')"),
+        ]
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .with_option("-j", "3")
+        .execute_and_its_result(input=manifest)
+        .should_fail(3)
+        .should_have_stdout_contains("[1] a\n")
+        .should_have_stdout_contains("[3] c\n")
+        .should_have_stderr_contains("exit 4")
+        .should_have_stderr_contains("Ran 3 of 3 commands, 2 failed.")
+    )
+
+
+def test_batch_option_fail_fast(tester: CliTester):
+    manifest = "\n".join(
+        [
+            _python("import sys; sys.exit(5)"),
+            _python("print('never')"),
+        ]
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .with_option("--fail-fast")
+        .execute_and_its_result(input=manifest)
+        .should_fail(5)
+        .should_have_stdout_not_contains("never")
+        .should_have_stderr_contains("skipped")
+        .should_have_stderr_contains("Ran 1 of 2 commands, 1 failed.")
+    )
+
+
+def test_batch_option_fail_fast_terminates_running(tester: CliTester):
+    manifest = "\n".join(
+        [
+            _python("import time; time.sleep(30)"),
+            _python("import time, sys; time.sleep(0.5); sys.exit(3)"),
+        ]
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .with_option("-j", "2")
+        .with_option("--fail-fast")
+        .execute_and_its_result(input=manifest)
+        .should_fail(3)
+        .should_have_stderr_contains("terminated")
+        .should_have_stderr_contains("Ran 2 of 2 commands, 1 failed, 1 terminated.")
+    )
+
+
+def test_batch_option_grouped_output(tester: CliTester):
+    code = "import time; [print(i, flush=True) or time.sleep(0.05) for i in range(3)]"
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .with_option("-j", "2")
+        .with_option("--output", "grouped")
+        .execute_and_its_result(input=_python(code) + "\n" + _python(code))
+        .should_pass(no_stderr=False)
+        .should_have_stdout_contains("=====\n0\n1\n2\n")
+        .should_have_stdout_not_contains("[1] 0")
+    )
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["--batch", "-", "echo"], ["--batch", "-", "--exec"]],
+    ids=["command", "exec"],
+)
+def test_batch_option_conflicts(tester: CliTester, args: list):
+    (
+        tester.run_command(execenv)
+        .with_arguments(*args)
+        .execute_and_its_result(input="echo\n")
+        .should_fail(2)
+    )
+
+
+def test_batch_option_invalid_manifest(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .execute_and_its_result(input='{"command": 1}\n')
+        .should_fail(2)
+    )
+
+
+def test_batch_option_missing_command(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--batch", "-")
+        .execute_and_its_result(input="execenv-command-that-does-not-exist\n")
+        .should_fail(127)
+        .should_have_stderr_contains("Failed to execute")
+    )
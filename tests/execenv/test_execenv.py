@@ -1,5 +1,7 @@
 import os
 import platform
+import subprocess
+import sys
 from pathlib import Path
 
 import pytest  # type: ignore
@@ -37,6 +39,18 @@ def test_file_option(tester: CliTester, option: str):
     )
 
 
+def test_file_option_from_stdin(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-f", "-")
+        .with_end_of_options()
+        .with_poetry_run("execenv-echo", "KEY", "MULTILINE")
+        .execute_and_its_result(input='KEY=VAL\nMULTILINE="A\nB"\n')
+        .should_pass()
+        .should_have_stdout("KEY=VAL\nMULTILINE=A\nB\n")
+    )
+
+
 @pytest.mark.parametrize("option", ["-c", "--clear"])
 def test_clear_option(tester: CliTester, option: str):
     system = platform.system()
@@ -141,6 +155,27 @@ def test_verbose_option(tester: CliTester, level: int):
         .should_pass()
         .should_have_stdout_contains("KEY=VAL\n")
         .should_have_stdout_contains("= execenv =")
+        .should_have_stdout_contains("command: ")
+        .should_have_stdout_not_contains("profiler: ")
+        .should_have_stdout_not_contains("resolve_args: ")
+    )
+
+
+def test_verbose_option_shows_env_sources(tester: CliTester):
+    env_file = CURRENT_DIR / "file.env"
+    (
+        tester.run_command(execenv)
+        .with_option("-f", env_file)
+        .with_option("-e", "EXECENV_SOURCE_TEST", "VAL")
+        .with_option("-a", "PATH", "test")
+        .with_option("-vv")
+        .with_end_of_options()
+        .with_arguments("python", "-c", "")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout_contains("env_sources:")
+        .should_have_stdout_contains("'EXECENV_SOURCE_TEST': '-e'")
+        .should_have_stdout_contains("'PATH': 'os + -a'")
     )
 
 
@@ -161,3 +196,143 @@ def test_config_option(tester: CliTester):
         .should_pass()
         .should_have_stdout_contains(config["append_separator"] + TEST_PATH)
     )
+
+
+def _run_execenv(*args: str) -> subprocess.CompletedProcess:
+    """
+    Run execenv in a new process, as `--exec` replaces the process it runs in.
+    """
+    return subprocess.run(
+        [sys.executable, "-c", "from execenv import execenv; execenv()", *args],
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Not supported on Windows")
+def test_exec_option():
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from execenv import execenv; execenv()",
+            "--exec",
+            "-c",
+            "-e",
+            "KEY",
+            "VAL",
+            "-C",
+            str(CURRENT_DIR / "cwd"),
+            "--",
+            sys.executable,
+            "-c",
+            "import os, sys; print(os.getpid(), os.getcwd(), os.getenv('KEY'), os.getenv('EXECENV_TEST')); sys.exit(3)",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    stdout, _ = process.communicate()
+
+    # Same process, with given environment and working directory
+    assert stdout == f"{process.pid} {CURRENT_DIR / 'cwd'} VAL None\n"
+    assert process.returncode == 3
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Not supported on Windows")
+def test_exec_option_with_shell():
+    result = _run_execenv("--exec", "-s", "-e", "KEY", "VAL", "--", "echo", "$KEY")
+    assert result.stdout == "VAL\n"
+    assert result.returncode == 0
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Not supported on Windows")
+def test_exec_option_with_verbose():
+    result = _run_execenv("--exec", "-v", "--", "echo", "done")
+    assert result.stdout.startswith("=")
+    assert result.stdout.endswith("done\n")
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Not supported on Windows")
+def test_exec_option_with_missing_command():
+    result = _run_execenv("--exec", "--", "execenv-command-that-does-not-exist")
+    assert "Failed to execute" in result.stderr
+    assert result.returncode == 127
+
+
+def test_interpolate_option(tester: CliTester, tmp_path: Path):
+    (tmp_path / "base.env").write_text("HOST=db\nPORT=5432\n")
+    (tmp_path / "url.env").write_text("URL=pg://${HOST}:${PORT}/${NAME:-app}\n")
+    (
+        tester.run_command(execenv)
+        .with_option("--interpolate")
+        .with_option("-f", str(tmp_path / "base.env"))
+        .with_option("-f", str(tmp_path / "url.env"))
+        .with_option("-e", "KEY", "${URL}?ssl=1")
+        .with_end_of_options()
+        .with_poetry_run("execenv-echo", "URL", "KEY")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("URL=pg://db:5432/app\nKEY=pg://db:5432/app?ssl=1\n")
+    )
+
+
+def test_no_interpolate_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--no-interpolate")
+        .with_option("-e", "KEY", "${HOME}")
+        .with_end_of_options()
+        .with_poetry_run("execenv-echo", "KEY")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("KEY=${HOME}\n")
+    )
+
+
+def test_interpolate_off_by_default(tester: CliTester):
+    # Values are kept as they are unless "--interpolate" is given, including self references
+    (
+        tester.run_command(execenv)
+        .with_option("-e", "A", "${HOME}/x")
+        .with_option("-e", "B", "${B}")
+        .with_end_of_options()
+        .with_poetry_run("execenv-echo", "A", "B")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("A=${HOME}/x\nB=${B}\n")
+    )
+
+
+def test_interpolate_option_cycle(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--interpolate")
+        .with_option("-e", "A", "${B}")
+        .with_option("-e", "B", "${A}")
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "A")
+        .execute_and_its_result()
+        .should_fail(1)
+    )
+
+
+def test_expand_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--expand")
+        .with_option("-e", "PATH", "overwritten")
+        .with_option("-e", "KEY", "VAL")
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable,
+            "-c",
+            "import sys; print(' '.join(sys.argv[1:]))",
+            "EXECENV_PATH",
+            "$KEY",
+            "${NO:-default}",
+            "\\$KEY",
+        )
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("overwritten VAL default $KEY\n")
+    )
@@ -0,0 +1,95 @@
+import sys
+from pathlib import Path
+
+from execenv import execenv
+from tests.conftest import CliTester
+
+CURRENT_DIR = Path(__file__).parent
+MATRIX_DIR = CURRENT_DIR / "matrix"
+
+
+def test_matrix_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-m", str(MATRIX_DIR / "staging.env"))
+        .with_option("--matrix", str(MATRIX_DIR / "prod.env"))
+        .with_option("-j", "2")
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "KEY")
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout_contains(f"[{MATRIX_DIR / 'staging.env'}] KEY=staging\n")
+        .should_have_stdout_contains(f"[{MATRIX_DIR / 'prod.env'}] KEY=prod\n")
+        .should_have_stderr_contains("Ran 2 of 2 commands, 0 failed.")
+    )
+
+
+def test_matrix_option_glob(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-m", str(MATRIX_DIR / "*.env"))
+        .with_option("--output", "grouped")
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "KEY")
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout_contains("KEY=prod\n")
+        .should_have_stdout_contains("KEY=staging\n")
+    )
+
+
+def test_matrix_option_with_shared_layers(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-f", str(CURRENT_DIR / "file.env"))
+        .with_option("-m", str(MATRIX_DIR / "prod.env"))
+        .with_option("-e", "OTHER", "overwritten")
+        .with_option("-a", "KEY", "appended")
+        .with_option("--append-separator", ",")
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "KEY", "OTHER")
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout_contains("] KEY=prod,appended\n")
+        .should_have_stdout_contains("] OTHER=overwritten\n")
+    )
+
+
+def test_matrix_option_exit_code(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-m", str(MATRIX_DIR / "*.env"))
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable,
+            "-c",
+            "import os, sys; sys.exit(3 if os.environ['KEY'] == 'staging' else 0)",
+        )
+        .execute_and_its_result()
+        .should_fail(3)
+        .should_have_stderr_contains("exit 3")
+        .should_have_stderr_contains("Ran 2 of 2 commands, 1 failed.")
+    )
+
+
+def test_matrix_option_no_match(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-m", str(MATRIX_DIR / "*.missing"))
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "KEY")
+        .execute_and_its_result()
+        .should_fail(2)
+    )
+
+
+def test_matrix_option_with_exec(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-m", str(MATRIX_DIR / "prod.env"))
+        .with_option("--exec")
+        .with_end_of_options()
+        .with_arguments("execenv-echo", "KEY")
+        .execute_and_its_result()
+        .should_fail(2)
+    )
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+from typing import Dict
+
+import pytest  # type: ignore
+
+# Modules only imported when needed, which make up most of the startup time otherwise.
+# Their absence is checked rather than wall time, which is too noisy with tests running in parallel;
+# see `benchmarks/` for startup latency.
+LAZY_MODULES = (
+    "rich",
+    "rich_click",
+    "auto_click_auto",
+    "importlib.metadata",
+    "platform",
+    "shlex",
+)
+
+
+def _import_times() -> Dict[str, int]:
+    """
+    Import `execenv.cli` in a fresh interpreter with `-X importtime`, as running `execenv` does.
+    `execenv` itself resolves its attributes lazily, so importing only it would check nothing.
+
+    Returns:
+        Dict[str, int]: Cumulative import time in microseconds of each imported module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import execenv.cli"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", LAZY_MODULES)
+def test_startup_skips_lazy_module(module: str):
+    assert module not in _import_times()
+
+
+@pytest.mark.parametrize("module", ["execenv.client", "execenv.api"])
+def test_module_skips_click(module: str):
+    # The thin client and the Python API only need the standard library
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; print('click' in sys.modules)",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == "False\n"
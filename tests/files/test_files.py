@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.cache import EnvCache
+from execenv.files import PARALLEL_THRESHOLD, expand_env_paths, load_env_files
+from tests.conftest import CliTester
+
+
+@pytest.fixture
+def env_dir(tmp_path: Path) -> Path:
+    directory = tmp_path / "env.d"
+    directory.mkdir()
+    (directory / "20-region.env").write_text("REGION=eu\nLEVEL=region\n")
+    (directory / "10-base.env").write_text("REGION=us\nLEVEL=base\nBASE=1\n")
+    (directory / ".30-hidden.env").write_text("LEVEL=hidden\n")
+    (directory / "README.md").write_text("LEVEL=readme\n")
+    (directory / "nested.env").mkdir()
+    return directory
+
+
+def test_expand_directory(env_dir: Path):
+    assert expand_env_paths(str(env_dir)) == [
+        str(env_dir / "10-base.env"),
+        str(env_dir / "20-region.env"),
+    ]
+
+
+def test_expand_glob(env_dir: Path):
+    assert expand_env_paths(str(env_dir / "*0-*")) == [
+        str(env_dir / "10-base.env"),
+        str(env_dir / "20-region.env"),
+    ]
+
+
+def test_expand_as_is(tmp_path: Path):
+    assert expand_env_paths("-") == ["-"]
+    assert expand_env_paths(str(tmp_path / "missing.env")) == [
+        str(tmp_path / "missing.env")
+    ]
+
+
+def test_expand_existing_file_with_magic(tmp_path: Path):
+    path = tmp_path / "a[1].env"
+    path.write_text("KEY=VAL\n")
+    assert expand_env_paths(str(path)) == [str(path)]
+
+
+def test_expand_nothing(tmp_path: Path):
+    with pytest.raises(ValueError, match="No .env file in"):
+        expand_env_paths(str(tmp_path))
+    with pytest.raises(ValueError, match="No .env file matches"):
+        expand_env_paths(str(tmp_path / "*.env"))
+
+
+def test_load_many_in_order(tmp_path: Path):
+    paths = []
+    for i in range(PARALLEL_THRESHOLD * 4):
+        path = tmp_path / f"{i:03d}.env"
+        path.write_text(f"INDEX={i}\nKEY_{i}=VAL\n")
+        paths.append(str(path))
+
+    cache = EnvCache(tmp_path / "cache", version="test")
+    for _ in range(2):
+        loaded = load_env_files(paths, cache)
+        assert [env["INDEX"] for env in loaded] == [str(i) for i in range(len(paths))]
+    assert cache.stats() == {"hits": len(paths), "misses": len(paths)}
+
+
+def test_file_option_directory(
+    tester: CliTester, env_dir: Path, monkeypatch: pytest.MonkeyPatch
+):
+    # Relative paths keep lines of verbose output short
+    monkeypatch.chdir(env_dir.parent)
+    (
+        tester.run_command(execenv)
+        .with_option("-f", "env.d")
+        .with_option("-vv")
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable,
+            "-c",
+            "import os; print(os.environ['REGION'], os.environ['LEVEL'], os.environ['BASE'])",
+        )
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout_contains("eu region 1\n")
+        .should_have_stdout_contains(f"'REGION': '{Path('env.d', '20-region.env')}'")
+        .should_have_stdout_contains(f"'BASE': '{Path('env.d', '10-base.env')}'")
+    )
+
+
+def test_file_option_glob_then_file(tester: CliTester, env_dir: Path, tmp_path: Path):
+    override = tmp_path / "override.env"
+    override.write_text("LEVEL=override\n")
+    (
+        tester.run_command(execenv)
+        .with_option("-f", str(env_dir / "*.env"))
+        .with_option("-f", str(override))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "import os; print(os.environ['LEVEL'])")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("override\n")
+    )
+
+
+def test_file_option_missing(tester: CliTester, tmp_path: Path):
+    (
+        tester.run_command(execenv)
+        .with_option("-f", str(tmp_path / "missing.env"))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("Failed to open")
+    )
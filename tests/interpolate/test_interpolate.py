@@ -0,0 +1,105 @@
+import time
+from typing import Dict
+
+import pytest  # type: ignore
+
+from execenv.api import expand_args
+from execenv.interpolate import InterpolationError, expand, interpolate
+
+
+@pytest.mark.parametrize(
+    "layer, below, expected",
+    [
+        ({"A": "${B}"}, {"B": "b"}, {"A": "b"}),
+        ({"A": "x${B}y${C}z"}, {"B": "b"}, {"A": "xbyz"}),
+        ({"A": "${B:-default}"}, {"B": ""}, {"A": "default"}),
+        ({"A": "${B-default}"}, {"B": ""}, {"A": ""}),
+        ({"A": "${B-default}"}, {}, {"A": "default"}),
+        ({"A": "${B:-${C:-c}}"}, {}, {"A": "c"}),
+        ({"A": "${B}", "B": "${C}", "C": "c"}, {}, {"A": "c", "B": "c", "C": "c"}),
+        ({"PATH": "${PATH}:/opt"}, {"PATH": "/bin"}, {"PATH": "/bin:/opt"}),
+        ({"A": "\\${B}"}, {"B": "b"}, {"A": "${B}"}),
+        ({"A": "${B"}, {"B": "b"}, {"A": "${B"}),
+        ({"A": "${B:-${C}"}, {"C": "c"}, {"A": "${B:-c"}),
+        ({"A": "${}${1}${B x}"}, {}, {"A": "${}${1}${B x}"}),
+        ({"A": "}{$"}, {}, {"A": "}{$"}),
+        ({"A": "${b.c}"}, {"b.c": "d"}, {"A": "d"}),
+    ],
+)
+def test_interpolate(
+    layer: Dict[str, str], below: Dict[str, str], expected: Dict[str, str]
+):
+    assert interpolate(layer, below) == expected
+
+
+def test_interpolate_keeps_order():
+    assert list(interpolate({"A": "${C}", "B": "b", "C": "c"}, {})) == ["A", "B", "C"]
+
+
+@pytest.mark.parametrize(
+    "layer, message",
+    [
+        ({"A": "${B}", "B": "${A}"}, "A -> B -> A"),
+        ({"A": "${B}", "B": "${C}", "C": "${B}"}, "B -> C -> B"),
+        ({"A": "${B:-${A}}", "B": "${A}"}, "A -> B -> A"),
+    ],
+)
+def test_interpolate_cycle(layer: Dict[str, str], message: str):
+    with pytest.raises(InterpolationError, match=message):
+        interpolate(layer, {})
+
+
+def test_interpolate_deep_chain():
+    count = 100_000
+    layer = {f"K{i}": f"${{K{i + 1}}}" for i in range(count)}
+    layer[f"K{count}"] = "end"
+
+    start = time.perf_counter()
+    assert interpolate(layer, {})["K0"] == "end"
+    assert time.perf_counter() - start < 10
+
+
+def test_interpolate_unclosed_nested_defaults():
+    value = "${A:-" * 50_000
+
+    start = time.perf_counter()
+    assert interpolate({"K": value}, {}) == {"K": value}
+    assert time.perf_counter() - start < 10
+
+
+def test_interpolate_nested_defaults():
+    depth = 50_000
+    value = "${A:-" * depth + "x" + "}" * depth
+
+    start = time.perf_counter()
+    assert interpolate({"K": value}, {}) == {"K": "x"}
+    assert time.perf_counter() - start < 10
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("plain", "plain"),
+        ("$B", "b"),
+        ("x$B-${B}y", "xb-by"),
+        ("${C:-default}", "default"),
+        ("${E-default}", ""),
+        ("$C.txt", ".txt"),
+        ("\\$B", "$B"),
+        ("\\${B}", "${B}"),
+        ("$1 $ }{ ${B", "$1 $ }{ ${B"),
+    ],
+)
+def test_expand(value: str, expected: str):
+    assert expand(value, {"B": "b", "E": ""}) == expected
+
+
+def test_expand_args():
+    env = {"KEY": "VAL"}
+    assert expand_args(["a", "$KEY", "EXECENV_KEY", "${NO:-$KEY}"], env) == [
+        "a",
+        "VAL",
+        "EXECENV_KEY",
+        "VAL",
+    ]
+    assert expand_args(["EXECENV_KEY/x", "$KEY"], env, "EXECENV_") == ["VAL/x", "VAL"]
@@ -0,0 +1,148 @@
+import re
+import sys
+from pathlib import Path
+
+from execenv import execenv
+from execenv.output import _Tail
+from tests.conftest import CliTester
+
+PRINT_LINES = (
+    "import sys; print('out 1'); print('err', file=sys.stderr); print('out 2')"
+)
+
+
+def test_output_streams_separately(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", PRINT_LINES)
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout("out 1\nout 2\n")
+        .should_have_stderr_contains("err\n")
+    )
+
+
+def test_log_file_option(tester: CliTester, tmp_path: Path):
+    log_file = tmp_path / "output.log"
+    (
+        tester.run_command(execenv)
+        .with_option("--log-file", str(log_file))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", PRINT_LINES)
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout("out 1\nout 2\n")
+    )
+    assert sorted(log_file.read_text().splitlines()) == ["err", "out 1", "out 2"]
+
+
+def test_log_file_keeps_lines_whole(tester: CliTester, tmp_path: Path):
+    log_file = tmp_path / "output.log"
+    code = (
+        "import sys, time; sys.stdout.write('out'); sys.stdout.flush(); time.sleep(0.2); "
+        "print('err', file=sys.stderr, flush=True); time.sleep(0.2); print(' 1')"
+    )
+    (
+        tester.run_command(execenv)
+        .with_option("--log-file", str(log_file))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", code)
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stdout("out 1\n")
+    )
+    assert log_file.read_text() == "err\nout 1\n"
+
+
+def test_line_prefix_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--line-prefix", "[app] ")
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable,
+            "-c",
+            "import sys; sys.stdout.write('a\\nb'); sys.stdout.flush(); print('c')",
+        )
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("[app] a\n[app] bc\n")
+    )
+
+
+def test_timestamps_option(tester: CliTester):
+    result = (
+        tester.run_command(execenv)
+        .with_option("--timestamps")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "print('a'); print('b')")
+        .execute_and_its_result()
+        .should_pass()
+    )
+    lines = result.result.stdout.splitlines()
+    assert len(lines) == 2
+    for line, text in zip(lines, "ab"):
+        assert re.fullmatch(rf"\d{{4}}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{{3}} {text}", line)
+
+
+def test_tail_on_failure_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--tail-on-failure", "1")
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable, "-c", "print('x' * 4096); print('the error'); exit(2)"
+        )
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("Last 1 KiB of output (exit 2):")
+        .should_have_stderr_contains("the error")
+    )
+
+
+def test_tail_on_failure_not_shown_on_success(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--tail-on-failure", "1")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "print('ok')")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("ok\n")
+    )
+
+
+def test_output_options_with_exec(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--exec")
+        .with_option("--timestamps")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("can not be used with")
+    )
+
+
+def test_large_output(tester: CliTester):
+    size = 8 * 1024 * 1024
+    result = (
+        tester.run_command(execenv)
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable, "-c", f"import sys; sys.stdout.write('x' * {size})"
+        )
+        .execute_and_its_result()
+        .should_pass()
+    )
+    assert len(result.result.stdout) == size
+
+
+def test_tail_is_bounded():
+    tail = _Tail(10)
+    for i in range(1000):
+        tail.write(f"{i:04d}".encode())
+    assert tail.getvalue() == b"9709980999"
+    assert tail.length < 20
@@ -0,0 +1,133 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.pipeline import exit_status, start_pipeline, wait_pipeline
+from tests.conftest import CliTester
+
+UPPER = f'{sys.executable} -c "import sys; sys.stdout.write(sys.stdin.read().upper())"'
+
+
+def python(code: str):
+    return [sys.executable, "-c", code]
+
+
+def test_exit_status():
+    assert exit_status(0) == 0
+    assert exit_status(3) == 3
+    assert exit_status(-9) == 137
+
+
+def test_pipefail_status():
+    processes = start_pipeline(
+        [
+            python("import sys; sys.exit(2)"),
+            python("import sys; sys.stdin.read(); sys.exit(3)"),
+            python("import sys; sys.stdin.read()"),
+        ],
+        {},
+    )
+    assert wait_pipeline(processes) == (3, [2, 3, 0])
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGKILL is POSIX only")
+def test_upstream_torn_down_when_stage_dies():
+    # The producer never writes, so it would never get SIGPIPE on its own
+    started = time.perf_counter()
+    processes = start_pipeline(
+        [
+            python("import time; time.sleep(30)"),
+            python("import os, signal; os.kill(os.getpid(), signal.SIGKILL)"),
+        ],
+        {},
+    )
+    status, statuses = wait_pipeline(processes)
+    assert time.perf_counter() - started < 10
+    assert status == 137
+    assert statuses[0] > 128
+
+
+def test_upstream_not_torn_down_when_stage_exits(tmp_path: Path):
+    # As with shells, the producer finishes its work after the consumer exited, and its status counts
+    done = tmp_path / "done"
+    processes = start_pipeline(
+        [
+            python(
+                "import sys, time; print('data', flush=True); sys.stdout.close(); "
+                f"time.sleep(0.3); open({str(done)!r}, 'w').close(); sys.exit(2)"
+            ),
+            python("import sys; sys.stdin.readline()"),
+        ],
+        {},
+    )
+    assert wait_pipeline(processes) == (2, [2, 0])
+    assert done.exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGPIPE is POSIX only")
+def test_sigpipe_does_not_fail():
+    processes = start_pipeline(
+        [
+            ["yes"],
+            python("import sys; sys.stdin.readline()"),
+        ],
+        {},
+    )
+    assert wait_pipeline(processes)[0] == 0
+
+
+def test_pipe_option(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("-e", "KEY", "val")
+        .with_option("--pipe", UPPER)
+        .with_option(
+            "--pipe",
+            f"{sys.executable} -c \"import sys; print(sys.stdin.read().strip() + '!')\"",
+        )
+        .with_end_of_options()
+        .with_arguments(*python("import os; print(os.environ['KEY'])"))
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("VAL!\n")
+    )
+
+
+def test_pipe_option_failure(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--pipe", UPPER)
+        .with_end_of_options()
+        .with_arguments(*python("import sys; print('partial'); sys.exit(5)"))
+        .execute_and_its_result()
+        .should_fail(5)
+        .should_have_stdout("PARTIAL\n")
+    )
+
+
+def test_pipe_option_missing_stage(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--pipe", "command-that-does-not-exist")
+        .with_end_of_options()
+        .with_arguments(*python("print(1)"))
+        .execute_and_its_result()
+        .should_fail(127)
+        .should_have_stderr_contains("Failed to execute command-that-does-not-exist")
+    )
+
+
+def test_pipe_option_conflicts(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--pipe", "cat")
+        .with_option("-s")
+        .with_end_of_options()
+        .with_arguments("echo")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains('"--pipe" can not be used with')
+    )
@@ -0,0 +1,88 @@
+import json
+from pathlib import Path
+
+from execenv import execenv
+from execenv.profile import Profiler
+from tests.conftest import CliTester
+
+CURRENT_DIR = Path(__file__).parent
+ENV_FILE = CURRENT_DIR.parent / "execenv" / "file.env"
+
+
+def test_profile_option(tester: CliTester):
+    result = (
+        tester.run_command(execenv)
+        .with_option("--profile")
+        .with_option("-f", str(ENV_FILE))
+        .with_end_of_options()
+        .with_arguments("python", "-c", "")
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stderr_contains("execenv profile:")
+    )
+    for phase in ("config", "parse_env_files", "merge_env", "spawn", "wait", "total"):
+        result.should_have_stderr_contains(phase)
+
+
+def test_profile_env_var(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_end_of_options()
+        .with_arguments("python", "-c", "")
+        .execute_and_its_result(env={"EXECENV_PROFILE": "1"})
+        .should_pass(no_stderr=False)
+        .should_have_stderr_contains("execenv profile:")
+    )
+
+
+def test_profile_disabled(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_end_of_options()
+        .with_arguments("python", "-c", "")
+        .execute_and_its_result()
+        .should_pass()
+    )
+
+
+def test_profile_trace_to_directory(tester: CliTester, tmp_path: Path):
+    for _ in range(2):
+        (
+            tester.run_command(execenv)
+            .with_option("--profile-trace", str(tmp_path))
+            .with_end_of_options()
+            .with_arguments("python", "-c", "")
+            .execute_and_its_result()
+            .should_pass()
+        )
+
+    traces = list(tmp_path.glob("execenv-*.json"))
+    assert len(traces) == 2
+
+    events = json.loads(traces[0].read_text())["traceEvents"]
+    phases = [event for event in events if event["ph"] == "X"]
+    assert {"merge_env", "spawn", "wait"} <= {event["name"] for event in phases}
+    assert all(event["dur"] >= 0 for event in phases)
+
+
+def test_profile_trace_exit_code(tester: CliTester, tmp_path: Path):
+    trace = tmp_path / "trace.json"
+    (
+        tester.run_command(execenv)
+        .with_option("--profile-trace", str(trace))
+        .with_end_of_options()
+        .with_arguments("python", "-c", "exit(3)")
+        .execute_and_its_result()
+        .should_fail(3)
+    )
+    assert json.loads(trace.read_text())["traceEvents"]
+
+
+def test_profiler_summary():
+    profiler = Profiler()
+    profiler.phases = [("a", 0, 1_000_000), ("b", 2_000_000, 4_000_000)]
+    lines = profiler.summary().splitlines()
+    assert lines[0].split() == ["a", "1.000", "ms", "25.0%"]
+    assert lines[1].split() == ["b", "2.000", "ms", "50.0%"]
+    assert lines[2].split() == ["other", "1.000", "ms", "25.0%"]
+    assert lines[3].split() == ["total", "4.000", "ms"]
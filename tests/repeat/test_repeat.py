@@ -0,0 +1,120 @@
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.repeat import LatencyStats
+from tests.conftest import CliTester
+
+MATRIX_DIR = Path(__file__).parent.parent / "execenv" / "matrix"
+
+
+def test_repeat_option(tester: CliTester):
+    result = (
+        tester.run_command(execenv)
+        .with_option("--repeat", "3")
+        .with_option("--warmup", "1")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "print('x' * 3)")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout_not_contains("xxx")
+    )
+    header, line = result.result.stdout.splitlines()
+    assert header.split() == ["runs", "min", "median", "p95", "max", "stddev"]
+    assert line.split()[-6] == "3"
+
+
+def test_repeat_with_variants(tester: CliTester, tmp_path: Path):
+    record = tmp_path / "record.txt"
+    script = f"import os; open({str(record)!r}, 'a').write(os.environ['KEY'] + os.environ['SHARED'] + '\\n')"
+    result = (
+        tester.run_command(execenv)
+        .with_option("--repeat", "2")
+        .with_option("--warmup", "1")
+        .with_option("-e", "SHARED", "s")
+        .with_option("--variant", "KEY=a")
+        .with_option("--variant", "KEY=b SHARED=o")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", script)
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout_contains("relative")
+    )
+    lines = result.result.stdout.splitlines()
+    assert lines[1].startswith("KEY=a ")
+    assert lines[2].startswith("KEY=b SHARED=o ")
+    assert record.read_text().split() == ["as"] * 3 + ["bo"] * 3
+
+
+def test_repeat_with_matrix(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--repeat", "1")
+        .with_option("-m", str(MATRIX_DIR / "*.env"))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout_contains("prod.env")
+        .should_have_stdout_contains("staging.env")
+    )
+
+
+def test_repeat_stops_on_failure(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--repeat", "3")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "exit(4)")
+        .execute_and_its_result()
+        .should_fail(4)
+        .should_have_stderr_contains("exited with 4 in run 1")
+    )
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGKILL is POSIX only")
+def test_repeat_killed_by_signal(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--repeat", "3")
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable,
+            "-c",
+            "import os, signal; os.kill(os.getpid(), signal.SIGKILL)",
+        )
+        .execute_and_its_result()
+        .should_fail(137)
+        .should_have_stderr_contains("exited with 137 in run 1")
+    )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        ["--variant", "KEY=a"],
+        ["--warmup", "1"],
+        ["--repeat", "2", "--exec"],
+        ["--repeat", "2", "--time"],
+        ["--repeat", "2", "--variant", "KEY"],
+    ],
+)
+def test_repeat_invalid_usage(tester: CliTester, options):
+    tester.run_command(execenv)
+    for option in options:
+        tester.with_arguments(option)
+    (
+        tester.with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+    )
+
+
+def test_latency_stats():
+    stats = LatencyStats.from_durations([float(i) for i in range(1, 101)])
+    assert (stats.min, stats.median, stats.p95, stats.max) == (1, 50.5, 95, 100)
+    assert stats.runs == 100
+    assert LatencyStats.from_durations([1.0]).stddev == 0
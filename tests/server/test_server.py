@@ -0,0 +1,185 @@
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator
+
+import pytest  # type: ignore
+
+from execenv.server import _can_apply_limits, iter_env_file_args
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Server is not supported on Windows"
+)
+
+CLIENT = [sys.executable, "-c", "from execenv.client import main; main()"]
+
+
+@pytest.fixture
+def server_env(tmp_path: Path) -> Iterator[Dict[str, str]]:
+    env = dict(os.environ, EXECENV_SOCKET=str(tmp_path / "server.sock"))
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from execenv import execenv; execenv()", "--server"],
+        env=env,
+        stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + 10
+    while not (tmp_path / "server.sock").exists():
+        assert server.poll() is None, server.stderr.read()  # type: ignore
+        assert time.monotonic() < deadline, "Server did not start in time"
+        time.sleep(0.05)
+
+    env["EXECENV_SERVER_PID"] = str(server.pid)
+    yield env
+
+    server.terminate()
+    server.wait(10)
+    assert not (tmp_path / "server.sock").exists()
+
+
+def _run_client(
+    env: Dict[str, str], *args: str, **kwargs
+) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [*CLIENT, *args], env=env, capture_output=True, text=True, timeout=30, **kwargs
+    )
+
+
+def test_server_runs_command(server_env: Dict[str, str]):
+    result = _run_client(
+        server_env,
+        "-e",
+        "KEY",
+        "VAL",
+        "--",
+        "sh",
+        "-c",
+        "echo $KEY $PPID",
+    )
+    assert result.returncode == 0, result.stderr
+    # Workers of server replace themselves with the command
+    assert result.stdout == f"VAL {server_env['EXECENV_SERVER_PID']}\n"
+
+
+def test_server_passes_stdin_and_cwd(server_env: Dict[str, str], tmp_path: Path):
+    result = _run_client(
+        server_env, "--", "sh", "-c", "cat; pwd", input="hello\n", cwd=tmp_path
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == f"hello\n{tmp_path}\n"
+
+
+def test_server_loads_env_file(server_env: Dict[str, str], tmp_path: Path):
+    (tmp_path / "file.env").write_text("KEY=VAL\n")
+    for _ in range(2):
+        result = _run_client(
+            server_env, "-f", "file.env", "--", "execenv-echo", "KEY", cwd=tmp_path
+        )
+        assert result.stdout == "KEY=VAL\n"
+
+
+def test_server_relays_exit_code(server_env: Dict[str, str]):
+    result = _run_client(server_env, "--", "sh", "-c", "exit 7")
+    assert result.returncode == 7
+
+
+def test_server_relays_exit_signal(server_env: Dict[str, str]):
+    result = _run_client(server_env, "--", "sh", "-c", "kill -TERM $$")
+    assert result.returncode == -signal.SIGTERM
+
+
+def test_server_relays_signal_to_command(server_env: Dict[str, str]):
+    client = subprocess.Popen(
+        [
+            *CLIENT,
+            "--",
+            "sh",
+            "-c",
+            "trap 'exit 42' INT; echo ready; while :; do sleep 0.1; done",
+        ],
+        env=server_env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    assert client.stdout.readline() == "ready\n"  # type: ignore
+    client.send_signal(signal.SIGINT)
+    assert client.wait(10) == 42
+
+
+def test_server_applies_umask_and_limits(server_env: Dict[str, str]):
+    import resource
+
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+
+    def restrict():
+        os.umask(0o077)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, hard))
+
+    result = _run_client(
+        server_env,
+        "--",
+        "sh",
+        "-c",
+        "umask; ulimit -n; echo $PPID",
+        preexec_fn=restrict,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == f"0077\n64\n{server_env['EXECENV_SERVER_PID']}\n"
+
+
+def test_server_usage_error(server_env: Dict[str, str]):
+    result = _run_client(server_env, "--batch", "-", "echo")
+    assert result.returncode == 2
+    assert "COMMAND can not be used" in result.stderr
+
+
+def test_client_without_server(tmp_path: Path):
+    env = dict(os.environ, EXECENV_SOCKET=str(tmp_path / "missing.sock"))
+    result = _run_client(env, "-e", "KEY", "VAL", "--", "execenv-echo", "KEY")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == "KEY=VAL\n"
+
+
+def test_client_with_terminal_runs_locally(server_env: Dict[str, str]):
+    import pty
+
+    master, slave = pty.openpty()
+    try:
+        result = _run_client(
+            server_env, "--", "sh", "-c", "test -t 0 && echo $PPID", stdin=slave
+        )
+    finally:
+        os.close(slave)
+        os.close(master)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout != f"{server_env['EXECENV_SERVER_PID']}\n"
+
+
+def test_iter_env_file_args():
+    argv = [
+        "-f",
+        "a.env",
+        "--file=b.env",
+        "--config",
+        "c.env",
+        "-e",
+        "K",
+        "V",
+        "--",
+        "-f",
+        "d.env",
+    ]
+    assert list(iter_env_file_args(argv)) == ["a.env", "b.env", "c.env"]
+
+
+def test_can_apply_limits():
+    import resource
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    assert _can_apply_limits({"RLIMIT_NOFILE": (soft, hard)})
+    if hard != resource.RLIM_INFINITY:
+        assert not _can_apply_limits({"RLIMIT_NOFILE": (soft, hard + 1)})
+        assert not _can_apply_limits({"RLIMIT_NOFILE": (soft, resource.RLIM_INFINITY)})
+    assert not _can_apply_limits({"RLIMIT_UNKNOWN": (0, 0)})
@@ -0,0 +1,135 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import Environment, execenv
+from execenv.cache import EnvCache
+from execenv.source import EnvDiff, SourceError, source_script
+from tests.conftest import CliTester
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="Scripts in tests are POSIX shell scripts"
+)
+
+
+@pytest.fixture
+def cache(tmp_path: Path):
+    return EnvCache(tmp_path / "cache" / "env", version="test")
+
+
+@pytest.fixture
+def script(tmp_path: Path):
+    path = tmp_path / "activate.sh"
+    path.write_text(
+        'echo activating\nexport TOOL_HOME=/opt/tool\nexport PATH="/opt/tool/bin:$PATH"\nunset DROPPED\n'
+    )
+    return path
+
+
+def test_source_diff(script: Path):
+    env = {"PATH": "/usr/bin", "DROPPED": "1", "KEPT": "x y"}
+    diff = source_script(str(script), (), env)
+    assert diff == EnvDiff(
+        {"TOOL_HOME": "/opt/tool", "PATH": "/opt/tool/bin:/usr/bin"}, ["DROPPED"]
+    )
+
+
+def test_source_arguments(tmp_path: Path):
+    path = tmp_path / "args.sh"
+    path.write_text('export ARGS="$*"\n')
+    diff = source_script(str(path), ("a", "b c"), {"PATH": os.environ["PATH"]})
+    assert diff.changed == {"ARGS": "a b c"}
+
+
+def test_source_multiline_value(tmp_path: Path):
+    path = tmp_path / "multiline.sh"
+    path.write_text("export MULTI='line 1\nline 2=x'\n")
+    diff = source_script(str(path), (), {"PATH": os.environ["PATH"]})
+    assert diff.changed == {"MULTI": "line 1\nline 2=x"}
+
+
+def test_source_cached(script: Path, cache: EnvCache):
+    env = {"PATH": "/usr/bin"}
+    first = source_script(str(script), (), env, cache)
+    assert source_script(str(script), (), env, cache) == first
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+def test_source_cache_invalidated(script: Path, cache: EnvCache):
+    env = {"PATH": "/usr/bin"}
+    source_script(str(script), (), env, cache)
+
+    # Arguments, environment and content of the script are all inputs
+    source_script(str(script), ("arg",), env, cache)
+    source_script(str(script), (), {"PATH": "/usr/local/bin"}, cache)
+    script.write_text("export TOOL_HOME=/opt/other\n")
+    assert source_script(str(script), (), env, cache).changed == {
+        "TOOL_HOME": "/opt/other"
+    }
+    assert cache.stats() == {"hits": 0, "misses": 4}
+
+
+def test_source_failure(tmp_path: Path):
+    path = tmp_path / "fail.sh"
+    path.write_text("return 3\n")
+    with pytest.raises(SourceError, match="exit"):
+        source_script(str(path), (), {"PATH": os.environ["PATH"]})
+
+
+def test_environment_source(script: Path, cache: EnvCache):
+    env = (
+        Environment(cache, interpolate=True)
+        .update({"DROPPED": "1"}, source="file")
+        .source(script)
+    )
+    env.set("TOOL_HOME", "${TOOL_HOME}/v2", source="-e")
+    merged = env.build()
+    assert merged["TOOL_HOME"] == "/opt/tool/v2"
+    assert "DROPPED" not in merged
+
+    sources = env.sources()
+    assert sources["PATH"] == str(script)
+    assert sources["TOOL_HOME"] == "-e"
+    assert "DROPPED" not in sources
+
+
+def test_source_option(tester: CliTester, script: Path):
+    (
+        tester.run_command(execenv)
+        .with_option("--source", str(script))
+        .with_end_of_options()
+        .with_arguments(
+            sys.executable, "-c", "import os; print(os.environ['TOOL_HOME'])"
+        )
+        .execute_and_its_result()
+        .should_pass()
+        .should_have_stdout("/opt/tool\n")
+    )
+
+
+def test_source_option_missing_script(tester: CliTester, tmp_path: Path):
+    (
+        tester.run_command(execenv)
+        .with_option("--source", str(tmp_path / "missing.sh"))
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("does not exist")
+    )
+
+
+def test_source_option_failure(tester: CliTester, tmp_path: Path):
+    path = tmp_path / "fail.sh"
+    path.write_text("false\n")
+    (
+        tester.run_command(execenv)
+        .with_option("--source", f"{path} arg")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(1)
+        .should_have_stderr_contains("Failed to source")
+    )
@@ -0,0 +1,94 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.usage import ResourceUsage
+from tests.conftest import CliTester
+
+ALLOCATE = "x = bytearray(32 * 1024 * 1024)"
+
+
+def test_time_option(tester: CliTester):
+    result = (
+        tester.run_command(execenv)
+        .with_option("--time")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", ALLOCATE)
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stderr_contains("execenv time:")
+        .should_have_stderr_contains("wall")
+    )
+    if sys.platform != "win32":
+        result.should_have_stderr_contains("max rss")
+        result.should_have_stderr_contains("switches")
+
+
+def test_time_file_option(tester: CliTester, tmp_path: Path):
+    time_file = tmp_path / "usage.jsonl"
+    for code in (0, 3):
+        (
+            tester.run_command(execenv)
+            .with_option("--time-file", str(time_file))
+            .with_end_of_options()
+            .with_arguments(sys.executable, "-c", f"{ALLOCATE}; exit({code})")
+            .execute_and_its_result()
+            .should_fail(code)
+        )
+
+    records = [json.loads(line) for line in time_file.read_text().splitlines()]
+    assert [record["exit_code"] for record in records] == [0, 3]
+    assert records[0]["command"] == [sys.executable, "-c", f"{ALLOCATE}; exit(0)"]
+    assert records[0]["wall_seconds"] > 0
+    if sys.platform != "win32":
+        assert records[0]["max_rss_bytes"] >= 32 * 1024 * 1024
+        assert records[0]["user_seconds"] >= 0
+
+
+def test_time_option_with_batch(tester: CliTester, tmp_path: Path):
+    manifest = tmp_path / "manifest.txt"
+    manifest.write_text(f'["{sys.executable}", "-c", "{ALLOCATE}"]\n' * 2)
+    (
+        tester.run_command(execenv)
+        .with_option("--time")
+        .with_option("--batch", str(manifest))
+        .execute_and_its_result()
+        .should_pass(no_stderr=False)
+        .should_have_stderr_contains("execenv time:")
+    )
+
+
+def test_time_option_with_exec(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--time")
+        .with_option("--exec")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains("can not be used with")
+    )
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX signals")
+def test_time_option_keeps_signal_exit_code(tester: CliTester):
+    kill_self = "import os, signal; os.kill(os.getpid(), signal.SIGTERM)"
+    codes = []
+    for options in ([], ["--time"]):
+        tester.run_command(execenv).with_arguments(*options).with_end_of_options()
+        result = (
+            tester.with_arguments(sys.executable, "-c", kill_self)
+            .execute_and_its_result()
+            .result
+        )
+        codes.append(result.exit_code)
+    assert codes[0] == codes[1] != 0
+
+
+def test_resource_usage_summary():
+    usage = ResourceUsage(wall_seconds=1.5)
+    assert usage.summary().split() == ["wall", "1.500", "s"]
@@ -0,0 +1,113 @@
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest  # type: ignore
+
+from execenv import execenv
+from execenv.watch import Watcher, _StatBackend
+from tests.conftest import CliTester
+
+PRINT_A = "import os, time; print('A', os.environ['A'], flush=True); time.sleep(60)"
+
+
+def test_stat_backend(tmp_path: Path):
+    path = tmp_path / "test.env"
+    path.write_text("A=1\n")
+    backend = _StatBackend([str(path)])
+    assert backend.wait(0) == set()
+
+    path.write_text("A=22\n")
+    assert backend.wait(1) == {str(path)}
+    assert backend.wait(0) == set()
+
+
+def test_watcher_debounce(tmp_path: Path):
+    path = tmp_path / "test.env"
+    other = tmp_path / "other.env"
+    path.write_text("A=1\n")
+    watcher = Watcher([str(path)], debounce=0.3)
+
+    def write():
+        for i in range(5):
+            path.write_text(f"A={i}{'0' * i}\n")
+            other.write_text("ignored\n")
+            time.sleep(0.05)
+
+    try:
+        assert watcher.wait(0.1) == set()
+        thread = threading.Thread(target=write)
+        thread.start()
+        assert watcher.wait(5) == {str(path)}
+        thread.join()
+        # The whole burst is reported once
+        assert watcher.wait(0.5) == set()
+    finally:
+        watcher.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Relies on SIGINT")
+def test_watch_restarts_on_change(tmp_path: Path):
+    env_file = tmp_path / "test.env"
+    env_file.write_text("A=1\n")
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from execenv import execenv; execenv()",
+            "--config",
+            str(tmp_path / "config.env"),
+            "--watch",
+            "--watch-grace",
+            "1",
+            "-f",
+            str(env_file),
+            "--",
+            sys.executable,
+            "-c",
+            PRINT_A,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    lines: "queue.Queue[str]" = queue.Queue()
+    threading.Thread(
+        target=lambda: [lines.put(line) for line in process.stdout],  # type: ignore
+        daemon=True,
+    ).start()
+
+    try:
+        assert lines.get(timeout=10) == "A 1\n"
+
+        # Touched or rewritten with the same content
+        os.utime(env_file)
+        env_file.write_text("A=1\n# comment\n")
+        with pytest.raises(queue.Empty):
+            lines.get(timeout=1.5)
+
+        env_file.write_text("A=2\n")
+        assert lines.get(timeout=10) == "A 2\n"
+    finally:
+        process.send_signal(signal.SIGINT)
+        _, stderr = process.communicate(timeout=10)
+
+    assert stderr.count("changed, restarting") == 1
+
+
+def test_watch_with_exec(tester: CliTester):
+    (
+        tester.run_command(execenv)
+        .with_option("--watch")
+        .with_option("--exec")
+        .with_end_of_options()
+        .with_arguments(sys.executable, "-c", "")
+        .execute_and_its_result()
+        .should_fail(2)
+        .should_have_stderr_contains('"--watch" can not be used with')
+    )